@@ -1,18 +1,114 @@
 #!/usr/bin/env python3
 
 import argparse
-from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
-from geoelectricalSurveyTools.src.point import Point3D
-from src.conversion import convert_relative_to_utm
+import csv
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from geoelectricalSurveyTools.src.DigitalElevationModel import INTERPOLATION_MODES
+from geoelectricalSurveyTools.src.DEMMosaic import DEFAULT_CACHE_BYTES, open_dem
+from geoelectricalSurveyTools.src.DEMCache import DEMCache
+from geoelectricalSurveyTools.src.profiling import NULL_PROFILER, Profiler
+from geoelectricalSurveyTools.src.projection import ProfileLine
+from geoelectricalSurveyTools.src.utils import get_file_ending
 
+# distance in m around the electrode arrays that is read from the DEM up front,
+# other parts are read when they are needed
+CORRIDOR_BUFFER = 25.0
 
-def create_model(dem_file):
+
+def create_model(dem_file, interpolation='ball', line_points=None, cache_bytes=DEFAULT_CACHE_BYTES, dem_cache=None,
+                 profiler=None):
+    """
+    :param dem_file: raster file, .vrt file or directory of tiles
+    :param line_points: UTM coordinates of start and end points of all
+    electrode arrays. If given, only the DEM around them is read.
+    :type line_points: list of tuples of floats
+    :param cache_bytes: size limit of the cache of decoded tiles of a mosaic
+    :param dem_cache: on-disk cache of DEM models
+    :type dem_cache: DEMCache
+    :param profiler: records opening the model, see src.profiling
+    :type profiler: Profiler
+    """
+    profiler = profiler or NULL_PROFILER
     print("Creating DEM Model")
-    dem_model = DEM(dem_file)
+    with profiler.stage('dem_construction'):
+        dem_model = open_dem(dem_file, line_points, CORRIDOR_BUFFER, interpolation, cache_bytes=cache_bytes,
+                             dem_cache=dem_cache)
     print("DEM Model creation finished")
     return dem_model
 
 
+def corridor_model_opener(dem_file, interpolation='ball'):
+    """
+    Return a function opening the model of a single raster file for one line
+    of electrode arrays, reading only the corridor around it. Lines spread
+    over a region then read their own corridors instead of one box around all
+    of them, see append_heights_to_ohm_files.
+    :param dem_file: raster file
+    :rtype: callable
+    """
+    def open_corridor(start, end):
+        return open_dem(dem_file, [start, end], CORRIDOR_BUFFER, interpolation)
+    return open_corridor
+
+
+def read_ohm_electrodes(ohm_file):
+    """
+    Read an ohm file without the topography block it may already contain
+    :param ohm_file: filepath to the ohm file
+    :return: lines of the file up to the topography block and relative x
+    coordinates of the electrodes
+    :rtype: tuple of list of str and list of floats
+    """
+    with open(ohm_file, 'r') as ohm:
+        lines = ohm.readlines()
+    num_electrodes = int(lines[0].split('#')[0])
+    index_firstline = lines.index('# x z\n') + 1
+    index_lastline = index_firstline + num_electrodes
+    x_electrodes = [float(line.split()[0]) for line in lines[index_firstline:index_lastline]]
+
+    # search for old top values in file and delete them
+    try:
+        index = lines.index('# x h for each topo point\n')
+        # file contains old values, delete them
+        lines = lines[:index-1]
+    except ValueError:
+        # no old values found in file
+        pass
+    return lines, x_electrodes
+
+
+def write_ohm_topography(ohm_file, lines, x_electrodes, heights):
+    """
+    Write an ohm file with a topography block appended to lines. The file is
+    written to a temporary file first that replaces the ohm file once it is
+    complete, so the ohm file is never left half written.
+    :param lines: lines of the ohm file without topography, see read_ohm_electrodes
+    :param x_electrodes: relative x coordinates of the electrodes
+    :param heights: elevation of every electrode
+    """
+    content = ''.join(lines)
+    content += '{} # Number of topo points\n'.format(len(x_electrodes))
+    content += '# x h for each topo point\n'
+    content += ''.join('{}\t{}\n'.format(x, height) for x, height in zip(x_electrodes, heights))
+    directory, filename = os.path.split(os.path.abspath(ohm_file))
+    file_descriptor, temporary_file = tempfile.mkstemp(dir=directory, prefix='.' + filename, suffix='.tmp')
+    try:
+        with os.fdopen(file_descriptor, 'w') as ohm:
+            ohm.write(content)
+        shutil.copymode(ohm_file, temporary_file)
+        os.replace(temporary_file, ohm_file)
+    except BaseException:
+        os.remove(temporary_file)
+        raise
+
+
 def append_height_to_ohm(ohm_file, dem_model, start, end):
     """
     Take elevation from digital elevation model for the electrode coordinates
@@ -29,59 +125,189 @@ def append_height_to_ohm(ohm_file, dem_model, start, end):
     (north, east)
     :type end: tuple of floats
     """
-    with open(ohm_file, 'r') as ohm:
-        lines = ohm.readlines()
-    num_electrodes = int(lines[0].split('#')[0])
-    index_firstline = lines.index('# x z\n') + 1
-    index_lastline = index_firstline + num_electrodes
-    values = lines[index_firstline:index_lastline]
-    values = [[float(val) for val in value.split()] for value in values]
+    error = append_heights_to_ohm_files([(ohm_file, start, end)], dem_model, workers=1)[0]
+    if error is not None:
+        raise error
 
 
-    # search for old top values in file and delete them
-    try:
-        index = lines.index('# x h for each topo point\n')
-        # file contains old values, delete them
-        lines = lines[:index-1]
-    except ValueError:
-        # no old values found in file
-        pass
+def _batched_heights(dem_model, indices, utm_coordinates, radii):
+    """
+    Query the model once for all electrodes of the given arrays that are
+    averaged over the same radius, usually all of them
+    :return: heights of the electrodes of every array by its index
+    :rtype: dict
+    """
+    heights = {}
+    for radius in set(radii[index] for index in indices):
+        same_radius = [index for index in indices if radii[index] == radius]
+        all_heights = dem_model.get_heights(np.concatenate([utm_coordinates[index] for index in same_radius]), radius)
+        split = np.cumsum([len(utm_coordinates[index]) for index in same_radius])[:-1]
+        heights.update(zip(same_radius, np.split(all_heights, split)))
+    return heights
+
+
+def append_heights_to_ohm_files(ohm_arrays, dem_model, workers=None, profiler=None):
+    """
+    Take elevation for the electrodes of many ohm files from the digital
+    elevation model and save the ohm files with topography. Elevation of all
+    electrodes of all files is queried at once, files are read and written
+    concurrently. A file that can not be updated does not stop the others.
+    :param ohm_arrays: filepath to the ohm file and UTM coordinates of start and
+    end point (north, east) of every electrode array
+    :type ohm_arrays: list of tuples
+    :param dem_model: Digital elevation model from which elevation can be read
+    for arbitrary UTM coordinates, or a function returning the model for the
+    start and end point of an electrode array, see corridor_model_opener. The
+    function is called once per distinct line, all arrays on that line are
+    queried at once.
+    :param workers: number of threads reading and writing files, defaults to the executor's default
+    :type workers: int
+    :param profiler: records reading, projecting, querying and writing and the
+    numbers of files, electrodes and DEM pixels, see src.profiling
+    :type profiler: Profiler
+    :return: error of every file, None for updated files
+    :rtype: list
+    """
+    profiler = profiler or NULL_PROFILER
+    errors = [None] * len(ohm_arrays)
+    with ThreadPoolExecutor(workers) as executor:
+        print("Reading {} ohm files".format(len(ohm_arrays)))
+        with profiler.stage('read_ohm_files'):
+            futures = [executor.submit(read_ohm_electrodes, ohm_file) for ohm_file, _, _ in ohm_arrays]
+            electrodes = {}
+            for index, future in enumerate(futures):
+                try:
+                    electrodes[index] = future.result()
+                except Exception as error:
+                    errors[index] = error
+        profiler.count('ohm_files', len(electrodes))
+
+        # convert relative coordinates of all files to utm
+        utm_coordinates = {}
+        radii = {}
+        with profiler.stage('projection'):
+            for index, (lines, x_electrodes) in electrodes.items():
+                _, start, end = ohm_arrays[index]
+                line = ProfileLine([start, end])
+                utm_coordinates[index] = line.to_utm(x_electrodes)
+                radii[index] = abs(x_electrodes[0] - x_electrodes[1]) / 2 if len(x_electrodes) > 1 else 0.
+        profiler.count('electrodes', sum(len(coordinates) for coordinates in utm_coordinates.values()))
+
+        print("Getting elevation from DEM model")
+        heights = {}
+        with profiler.stage('topography'):
+            if callable(dem_model):
+                # model of the corridor of every line, shared by all arrays on it such as the files of a glob pattern
+                arrays_on_line = {}
+                for index in utm_coordinates:
+                    _, start, end = ohm_arrays[index]
+                    arrays_on_line.setdefault((tuple(start), tuple(end)), []).append(index)
+                num_pixels = 0
+                for (start, end), indices in arrays_on_line.items():
+                    try:
+                        model = dem_model(list(start), list(end))
+                        heights.update(_batched_heights(model, indices, utm_coordinates, radii))
+                    except Exception as error:
+                        for index in indices:
+                            errors[index] = error
+                        continue
+                    num_pixels += model.num_pixels
+            else:
+                heights.update(_batched_heights(dem_model, list(utm_coordinates), utm_coordinates, radii))
+                num_pixels = dem_model.num_pixels
+        profiler.count('dem_pixels', num_pixels)
+
+        print("Writing output ohm files")
+        with profiler.stage('write_ohm_files'):
+            futures = {index: executor.submit(write_ohm_topography, ohm_arrays[index][0], lines, x_electrodes,
+                                              heights[index].tolist())
+                       for index, (lines, x_electrodes) in electrodes.items() if index in heights}
+            for index, future in futures.items():
+                try:
+                    future.result()
+                except Exception as error:
+                    errors[index] = error
+    return errors
+
+
+def read_ohm_manifest(manifest_file):
+    """
+    Read ohm files and their start and end points from a CSV file with the
+    columns ohm, start_north, start_east, end_north, end_east or a JSON file
+    with a list of objects with the keys ohm, start and end. ohm may be a glob
+    pattern, relative paths are relative to the directory of the manifest.
+    :return: ohm file pattern and start and end point of every line of the manifest
+    :rtype: list of tuples
+    """
+    directory = os.path.dirname(os.path.abspath(manifest_file))
+    with open(manifest_file, newline='') as manifest:
+        if manifest_file.lower().endswith('.json'):
+            rows = [(row['ohm'], row['start'], row['end']) for row in json.load(manifest)]
+        else:
+            rows = [(row['ohm'], [row['start_north'], row['start_east']], [row['end_north'], row['end_east']])
+                    for row in csv.DictReader(manifest)]
+    return [(os.path.join(directory, ohm_file), [float(value) for value in start], [float(value) for value in end])
+            for ohm_file, start, end in rows]
+
 
-    # convert relative coordinates to utm
-    start = Point3D(*start, z=0)
-    end = Point3D(*end, z=0)
-    electrode_distance = abs(values[0][0] - values[1][0])
-    print("Getting elevation from DEM model")
-    for value in values:
-        utm_point = convert_relative_to_utm(start, end, value[0])
-        value[1] = dem_model.get_height((utm_point.x, utm_point.y), electrode_distance/2)
-
-    print("Writing output ohm file")
-    with open(ohm_file, 'w') as ohm:
-        # write old data
-        for line in lines:
-            ohm.write(line)
-        # append header to ohm file
-        ohm.write('{} # Number of topo points\n'.format(num_electrodes))
-        ohm.write('# x h for each topo point\n')
-        # append converted values to ohm file
-        for value_pair in values:
-            ohm.write('{}\t{}\n'.format(*value_pair))
+def expand_ohm_patterns(ohm_arrays):
+    """Replace glob patterns of ohm files by all matching files, sharing start and end point"""
+    expanded = []
+    for ohm_pattern, start, end in ohm_arrays:
+        ohm_files = sorted(glob.glob(ohm_pattern)) if glob.has_magic(ohm_pattern) else [ohm_pattern]
+        expanded += [(ohm_file, start, end) for ohm_file in ohm_files]
+    return expanded
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Load topography from tif file and append topography to .ohm file')
-    parser.add_argument('dem_file', help='DEM file to read for elevation data')
+    parser.add_argument('dem_file', help='DEM file to read for elevation data, or a directory or .vrt file of DEM tiles')
     parser.add_argument('-i', '--input_ohm', nargs=5, action='append',
-                        help='Path to ohm file and UTM coordinates of start/end point'
+                        help='Path to ohm file or glob pattern of ohm files and UTM coordinates of start/end point'
                              '/path/to/ohm/file.ohm start_utm_north start_utm_east end_utm_north end_utm_east')
+    parser.add_argument('--tile_cache_bytes', type=int, default=DEFAULT_CACHE_BYTES,
+                        help='Size limit in bytes of the cache of decoded DEM tiles')
+    parser.add_argument('--interpolation', choices=INTERPOLATION_MODES, default='ball',
+                        help="How elevation is interpolated: 'ball' averages all points within a circle around an "
+                             "electrode, 'box' averages all pixels within a square window")
+    parser.add_argument('--cache', action='store_true',
+                        help='Cache the whole DEM between runs in $GEOELECTRICAL_CACHE_DIR or '
+                             '~/.cache/geoelectricalSurveyTools. Without a cache only the corridors of the electrode '
+                             'arrays are read from the DEM file')
+    parser.add_argument('--cache_dir', help='Directory in which DEM models are cached between runs, enables the cache')
+    parser.add_argument('--clear_cache', action='store_true', help='Delete all cached DEM models first')
+    parser.add_argument('-m', '--manifest', action='append', default=[],
+                        help='CSV file with the columns ohm, start_north, start_east, end_north, end_east or JSON '
+                             'file with a list of objects with the keys ohm, start and end. Can be given several times')
+    parser.add_argument('-w', '--workers', type=int, help='Number of threads reading and writing ohm files')
+    parser.add_argument('--profile', nargs='?', const='-', metavar='FILE',
+                        help='Write a JSON report of the time and memory of every stage and the numbers of ohm files, '
+                             'electrodes and DEM pixels to FILE, or to standard output if no FILE is given')
     args = parser.parse_args()
     # TODO: print help w/o other arguments
-    model = create_model(args.dem_file)
-    for ohm_arguments in args.input_ohm:
-        # ohm_arguments is a list of the ohm file, then north east coordinate of start point,
-        # the north east coordinate of end point
-        start_point = [float(ohm_arguments[1]), float(ohm_arguments[2])]
-        end_point = [float(ohm_arguments[3]), float(ohm_arguments[4])]
-        print(ohm_arguments[0], start_point, end_point)
-        append_height_to_ohm(ohm_arguments[0], model, start_point, end_point)
+    # every ohm argument is the ohm file or a glob pattern, then north east coordinate of start point,
+    # the north east coordinate of end point
+    ohm_arrays = [(ohm_arguments[0], [float(coordinate) for coordinate in ohm_arguments[1:3]],
+                   [float(coordinate) for coordinate in ohm_arguments[3:5]]) for ohm_arguments in args.input_ohm or []]
+    for manifest_file in args.manifest:
+        ohm_arrays += read_ohm_manifest(manifest_file)
+    ohm_arrays = expand_ohm_patterns(ohm_arrays)
+    if args.clear_cache:
+        DEMCache(args.cache_dir).clear()
+    dem_cache = DEMCache(args.cache_dir) if args.cache or args.cache_dir is not None else None
+    profiler = Profiler() if args.profile is not None else NULL_PROFILER
+    if dem_cache is None and os.path.isfile(args.dem_file) and get_file_ending(args.dem_file).lower() != 'vrt':
+        model = corridor_model_opener(args.dem_file, args.interpolation)
+    else:
+        # tiles of a mosaic are read when an array needs them, a cached raster is memory mapped
+        model = create_model(args.dem_file, args.interpolation, None, args.tile_cache_bytes, dem_cache, profiler)
+    errors = append_heights_to_ohm_files(ohm_arrays, model, args.workers, profiler)
+    if args.profile is not None:
+        profiler.write_report(args.profile)
+    for (ohm_file, start_point, end_point), error in zip(ohm_arrays, errors):
+        if error is None:
+            print(ohm_file, start_point, end_point)
+        else:
+            print('FAILED {}: {}'.format(ohm_file, error), file=sys.stderr)
+    if any(error is not None for error in errors):
+        sys.exit(1)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+"""
+Compare the throughput of the NumPy-backed .mod and .ohm readers with the
+former readers that built nested lists of floats from all lines of a file,
+and check that both return the same numbers.
+
+    python3 -m geoelectricalSurveyTools.benchmarks.bench_read --rows 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from geoelectricalSurveyTools.benchmarks.synthetic import write_synthetic_mod_file, write_synthetic_ohm_file
+from geoelectricalSurveyTools.src.io.read import read_mod_file, read_ohm_file
+
+
+def read_mod_file_lines(mod_filename):
+    """Former .mod reader, kept as reference"""
+    with open(mod_filename, 'r') as inp:
+        lines = inp.readlines()
+    del lines[0]
+    lines = [[float(number) for number in line.split()] for line in lines]
+    x = [[line[0], line[1]] for line in lines]
+    z = [[-line[2], -line[3]] for line in lines]
+    rho = [line[4] for line in lines]
+    coverage = [line[5] for line in lines]
+    return x, z, rho, coverage
+
+
+def read_ohm_file_lines(ohm_filename):
+    """Former .ohm reader, kept as reference"""
+    with open(ohm_filename, 'r') as ohm:
+        lines = ohm.readlines()
+    index = lines.index('# x h for each topo point\n')
+    lines = [[float(number) for number in line.split()] for line in lines[index + 1:]]
+    return dict(zip([line[0] for line in lines], [line[1] for line in lines]))
+
+
+def benchmark(name, reader, filename):
+    start = time.perf_counter()
+    result = reader(filename)
+    seconds = time.perf_counter() - start
+    print('{:>12}: {:.2f} s, {:.1f} MB/s'.format(name, seconds, os.path.getsize(filename) / seconds / 1e6))
+    return result, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the .mod and .ohm readers.")
+    parser.add_argument("--rows", type=int, default=1000000, help="Number of lines of the synthetic files.")
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    mod_filename = os.path.join(directory, 'synthetic.mod')
+    ohm_filename = os.path.join(directory, 'synthetic.ohm')
+    write_synthetic_mod_file(mod_filename, args.rows)
+    write_synthetic_ohm_file(ohm_filename, args.rows)
+    identical = True
+
+    reference, reference_seconds = benchmark('mod lines', read_mod_file_lines, mod_filename)
+    result, seconds = benchmark('mod numpy', read_mod_file, mod_filename)
+    print('speedup: {:.1f}x'.format(reference_seconds / seconds))
+    identical &= all(np.array_equal(np.asarray(old), new) for old, new in zip(reference, result))
+
+    reference, reference_seconds = benchmark('ohm lines', read_ohm_file_lines, ohm_filename)
+    result, seconds = benchmark('ohm numpy', read_ohm_file, ohm_filename)
+    print('speedup: {:.1f}x'.format(reference_seconds / seconds))
+    identical &= reference == dict(zip(*(column.tolist() for column in result)))
+
+    print('identical: {}'.format(identical))
+    os.remove(mod_filename)
+    os.remove(ohm_filename)
+    os.rmdir(directory)
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
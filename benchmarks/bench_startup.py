@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+
+"""
+Measure the cold-start latency of convertmod2vtk.py for a small .mod file
+without topography and with topography from an .ohm file, and check that
+neither loads gdal or scipy. Exits with status 1 if a heavy backend is loaded
+or the median time above the bare interpreter start exceeds --max-overhead.
+
+    python3 -m geoelectricalSurveyTools.benchmarks.bench_startup --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from geoelectricalSurveyTools.benchmarks.synthetic import write_synthetic_mod_file, write_synthetic_ohm_file
+
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# modules that must only be imported if topography is read from a raster
+HEAVY_MODULES = ('gdal', 'osgeo', 'scipy')
+# runs the CLI in the current process, then prints the heavy modules it imported
+LOADED_MODULES_SCRIPT = """\
+import runpy, sys
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name='__main__')
+print(' '.join(sorted({{name.split('.')[0] for name in sys.modules}} & set({!r}))))
+""".format(HEAVY_MODULES)
+
+
+def median_seconds(command, runs):
+    """Return the median wall time of running a command in a new process"""
+    seconds = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=REPOSITORY_DIR, check=True, stdout=subprocess.DEVNULL)
+        seconds.append(time.perf_counter() - start)
+    return statistics.median(seconds)
+
+
+def loaded_heavy_modules(arguments):
+    """Return the heavy modules imported by a run of the CLI"""
+    output = subprocess.run([sys.executable, '-c', LOADED_MODULES_SCRIPT] + arguments, cwd=REPOSITORY_DIR,
+                            check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return output.split()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the cold start of convertmod2vtk.py.")
+    parser.add_argument("--runs", type=int, default=10, help="Number of runs of every command.")
+    parser.add_argument("--max-overhead", type=float, default=None,
+                        help="Fail if the median seconds above the bare interpreter start exceed this.")
+    args = parser.parse_args()
+    directory = tempfile.mkdtemp()
+    mod_filename = os.path.join(directory, 'small.mod')
+    ohm_filename = os.path.join(directory, 'small.ohm')
+    vtk_filename = os.path.join(directory, 'small.vtk')
+    write_synthetic_mod_file(mod_filename, 200)
+    write_synthetic_ohm_file(ohm_filename, 20)
+    script = os.path.join(REPOSITORY_DIR, 'convertmod2vtk.py')
+    cases = [('no topography', [script, vtk_filename, mod_filename]),
+             ('ohm topography', [script, vtk_filename, mod_filename, '-s', '0', '0', '-e', '0', '80',
+                                 '-t', ohm_filename])]
+    passed = True
+
+    interpreter_seconds = median_seconds([sys.executable, '-c', 'pass'], args.runs)
+    print('{:>16}: {:.3f} s'.format('interpreter', interpreter_seconds))
+    for name, arguments in cases:
+        seconds = median_seconds([sys.executable] + arguments, args.runs)
+        heavy_modules = loaded_heavy_modules(arguments)
+        print('{:>16}: {:.3f} s, overhead {:.3f} s, heavy modules: {}'.format(
+            name, seconds, seconds - interpreter_seconds, ', '.join(heavy_modules) or 'none'))
+        passed &= not heavy_modules
+        if args.max_overhead is not None:
+            passed &= seconds - interpreter_seconds <= args.max_overhead
+
+    print('passed: {}'.format(passed))
+    for filename in (mod_filename, ohm_filename, vtk_filename):
+        os.remove(filename)
+    os.rmdir(directory)
+    if not passed:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
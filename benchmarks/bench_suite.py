@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+
+"""
+Time and memory profile every stage of the conversion of a .mod file and the
+whole convertmod2vtk for synthetic profiles and DEMs of growing size, and
+store the results as JSON. Results of two commits are compared with --compare.
+
+    python3 -m geoelectricalSurveyTools.benchmarks.bench_suite --sizes 1000 100000 10000000 -o new.json
+    python3 -m geoelectricalSurveyTools.benchmarks.bench_suite -o new.json --compare old.json
+
+A size is the number of cells of the .mod file and the number of pixels of
+the DEM. Every stage is timed --repeat times and the fastest run is kept. The
+peak memory of a stage is measured by tracemalloc in a separate run, so
+tracing does not slow down the timed runs. max_rss_bytes is the high-water
+mark of the resident memory of the whole process after the stage.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from geoelectricalSurveyTools.benchmarks.synthetic import (START_POINT, num_mesh_columns, profile_end_point,
+                                                           write_synthetic_dem_file, write_synthetic_mod_file,
+                                                           write_synthetic_ohm_file)
+from geoelectricalSurveyTools.src import __version__
+from geoelectricalSurveyTools.src.conversion import convertmod2vtk
+from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
+from geoelectricalSurveyTools.src.geometry import create_geometry, topography_from_dem, topography_from_ohm
+from geoelectricalSurveyTools.src.io.read import read_mod_file
+from geoelectricalSurveyTools.src.io.write import write_mesh_file
+from geoelectricalSurveyTools.src.profiling import max_rss_bytes
+from geoelectricalSurveyTools.src.projection import ProfileLine
+
+REPOSITORY_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+# relative change of the time of a stage reported as regression or speedup by --compare
+DEFAULT_THRESHOLD = 0.1
+
+
+def measure(stage, setup=tuple, repeat=3):
+    """
+    Time a stage and measure the peak of the memory it allocates
+    :param stage: function to measure, called with the arguments returned by setup
+    :type stage: callable
+    :param setup: returns a fresh tuple of arguments for every run of stage, not measured
+    :type setup: callable
+    :param repeat: number of timed runs
+    :return: fastest time in seconds, peak of the traced memory in bytes and
+    the result of the last run
+    :rtype: tuple
+    """
+    seconds = float('inf')
+    for _ in range(repeat):
+        arguments = setup()
+        start = time.perf_counter()
+        stage(*arguments)
+        seconds = min(seconds, time.perf_counter() - start)
+    arguments = setup()
+    tracemalloc.start()
+    try:
+        result = stage(*arguments)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return seconds, peak_bytes, result
+
+
+def benchmark_size(size, directory, repeat, log=print):
+    """
+    Generate the input files of a size and measure all stages
+    :return: one result per stage
+    :rtype: list of dict
+    """
+    mod_file = os.path.join(directory, 'synthetic.mod')
+    ohm_file = os.path.join(directory, 'synthetic.ohm')
+    dem_file = os.path.join(directory, 'synthetic.tif')
+    out_file = os.path.join(directory, 'synthetic.out')
+    start_point = list(START_POINT)
+    end_point = list(profile_end_point(size))
+    write_synthetic_mod_file(mod_file, size)
+    write_synthetic_ohm_file(ohm_file, num_mesh_columns(size) + 1)
+    num_pixels = write_synthetic_dem_file(dem_file, size, end_point[0] - start_point[0])
+    results = []
+
+    def run(name, stage, setup=tuple, items=None):
+        seconds, peak_bytes, result = measure(stage, setup, repeat)
+        results.append({'stage': name, 'size': size, 'items': items, 'seconds': seconds,
+                        'peak_bytes': peak_bytes, 'max_rss_bytes': max_rss_bytes()})
+        log('{:>8} {:>22}: {:9.4f} s, peak {:8.1f} MB'.format(size, name, seconds, peak_bytes / 1e6))
+        return result
+
+    x_pair, z_pair, rho, coverage = run('read_mod_file', read_mod_file, lambda: (mod_file,), size)
+    points, cells = run('create_geometry', create_geometry, lambda: (x_pair, z_pair), size)
+    line = ProfileLine([start_point, end_point])
+    utm_coordinates = run('projection', line.to_utm, lambda: (points[:, 0],), len(points))
+    utm_points = np.column_stack((utm_coordinates, points[:, 2]))
+    run('topography_from_ohm', topography_from_ohm, lambda: (ohm_file, points.copy(), 'linear'), len(points))
+    dem = run('dem_construction', DEM, lambda: (dem_file,), num_pixels)
+    run('topography_from_dem', topography_from_dem, lambda: (dem, utm_points.copy()), len(points))
+    cell_data = {'rho': rho, 'coverage': coverage}
+    for output_format in ('ascii', 'binary', 'vtu'):
+        run('write_' + output_format, write_mesh_file,
+            lambda: (out_file, 'benchmark', utm_points, cells, cell_data, output_format), size)
+    for topo_name, topo_file in (('none', None), ('ohm', ohm_file), ('dem', dem_file)):
+        run('convertmod2vtk_' + topo_name, convertmod2vtk,
+            lambda: (out_file, mod_file, start_point, end_point, topo_file), size)
+    return results
+
+
+def git_commit():
+    """Return the hash of the checked out commit, None outside of a git repository"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPOSITORY_DIR, check=True, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, universal_newlines=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare the times of the stages of two result files
+    :param baseline: results loaded from the JSON file of the earlier run
+    :type baseline: dict
+    :param current: results of the later run
+    :type current: dict
+    :param threshold: relative change of time from which a stage is reported as regression or speedup
+    :return: (stage, size, baseline seconds, current seconds, verdict) of every
+    stage and size measured in both runs, verdict is 'regression', 'speedup' or ''
+    :rtype: list of tuples
+    """
+    baseline_seconds = {(result['stage'], result['size']): result['seconds'] for result in baseline['results']}
+    comparison = []
+    for result in current['results']:
+        key = (result['stage'], result['size'])
+        if key not in baseline_seconds:
+            continue
+        ratio = result['seconds'] / baseline_seconds[key]
+        verdict = 'regression' if ratio > 1 + threshold else 'speedup' if ratio < 1 - threshold else ''
+        comparison.append(key + (baseline_seconds[key], result['seconds'], verdict))
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark suite of all stages of the conversion.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="Numbers of cells of the .mod files and pixels of the DEMs.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of timed runs of every stage.")
+    parser.add_argument("-o", "--output", default='bench_suite.json', help="JSON file to write the results to.")
+    parser.add_argument("--compare", default=None, help="JSON file of an earlier run to compare the results with.")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative change of time reported as regression or speedup.")
+    args = parser.parse_args()
+
+    report = {'commit': git_commit(), 'version': __version__, 'python': platform.python_version(),
+              'numpy': np.__version__, 'platform': platform.platform(), 'repeat': args.repeat, 'results': []}
+    directory = tempfile.mkdtemp()
+    try:
+        for size in args.sizes:
+            report['results'] += benchmark_size(size, directory, args.repeat)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    with open(args.output, 'w') as output:
+        json.dump(report, output, indent=2)
+    print('results written to {}'.format(args.output))
+
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        print('compared with {} of commit {}'.format(args.compare, baseline.get('commit')))
+        regressions = 0
+        for stage, size, baseline_seconds, seconds, verdict in compare_results(baseline, report, args.threshold):
+            print('{:>8} {:>22}: {:9.4f} s -> {:9.4f} s, {:6.2f}x {}'.format(
+                size, stage, baseline_seconds, seconds, baseline_seconds / seconds, verdict))
+            regressions += verdict == 'regression'
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
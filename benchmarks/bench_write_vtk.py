@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+"""
+Compare the throughput of the chunked ASCII vtk writer with the former writer
+that formatted and wrote every line on its own, and check that both write
+the same bytes.
+
+    python3 -m geoelectricalSurveyTools.benchmarks.bench_write_vtk --cells 2000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from geoelectricalSurveyTools.src.io.write import write_vtk_file_general
+
+
+def write_vtk_file_per_line(vtk_filename, title, points, cells, values, value_descriptors):
+    """Former writer formatting every line on its own, kept as reference"""
+    points = np.asarray(points, dtype=np.float64)
+    cells = np.asarray(cells, dtype=np.int64)
+    num_cells = len(cells)
+    with open(vtk_filename, 'w', newline='\n') as out:
+        out.write('# vtk DataFile Version 3.0\n')
+        out.write(title + '\n')
+        out.write('ASCII\n')
+        out.write('DATASET UNSTRUCTURED_GRID\n')
+        out.write('POINTS {0:d} float\n'.format(len(points)))
+        for point in points.tolist():
+            out.write(' '.join(str(x) for x in point) + '\n')
+        out.write('CELLS {0:d} {1:d}\n'.format(num_cells, num_cells * 5))
+        for cell in cells.tolist():
+            out.write('4 ' + ' '.join(str(i) for i in cell) + '\n')
+        out.write('CELL_TYPES {0:d}\n'.format(num_cells))
+        for cell in cells:
+            out.write('9\n')
+        out.write('\n')
+        out.write('CELL_DATA ' + str(num_cells) + '\n')
+        for value_set, value_set_description in zip(values, value_descriptors):
+            out.write('SCALARS {} 1\n'.format(value_set_description))
+            out.write('LOOKUP_TABLE default\n')
+            for value in value_set:
+                out.write('{0}\n'.format(value))
+
+
+def synthetic_mesh(num_cells, num_layers=20):
+    """Return points, cells and two cell data sets of a profile with num_cells cells in num_layers layers"""
+    num_columns = max(num_cells // num_layers, 1)
+    x = 356933.125 + np.arange(num_columns + 1) * 2.5
+    z = 140. - np.arange(num_layers + 1) * 1.25
+    points = np.zeros(((num_columns + 1) * (num_layers + 1), 3))
+    points[:, 0] = np.repeat(x, num_layers + 1)
+    points[:, 1] = 5686395.5
+    points[:, 2] = np.tile(z, num_columns + 1)
+    column, layer = np.divmod(np.arange(num_columns * num_layers), num_layers)
+    first = column * (num_layers + 1) + layer
+    cells = np.column_stack((first, first + 1, first + num_layers + 2, first + num_layers + 1))
+    rng = np.random.default_rng(0)
+    rho = rng.lognormal(4., 1., len(cells)).tolist()
+    coverage = rng.uniform(-3., 0., len(cells)).tolist()
+    return points, cells, [rho, coverage], ['rho float', 'coverage float']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark of the ASCII vtk writer.")
+    parser.add_argument("--cells", type=int, default=1000000, help="Number of cells of the synthetic mesh.")
+    args = parser.parse_args()
+    mesh = synthetic_mesh(args.cells)
+    directory = tempfile.mkdtemp()
+    reference_file = os.path.join(directory, 'per_line.vtk')
+    chunked_file = os.path.join(directory, 'chunked.vtk')
+    timings = {}
+    for name, writer, filename in (('per line', write_vtk_file_per_line, reference_file),
+                                   ('chunked', write_vtk_file_general, chunked_file)):
+        start = time.perf_counter()
+        writer(filename, 'benchmark', *mesh)
+        timings[name] = time.perf_counter() - start
+        size = os.path.getsize(filename)
+        print('{:>8}: {:.2f} s, {:.1f} MB/s'.format(name, timings[name], size / timings[name] / 1e6))
+    print('speedup: {:.1f}x'.format(timings['per line'] / timings['chunked']))
+    with open(reference_file, 'rb') as reference, open(chunked_file, 'rb') as chunked:
+        identical = reference.read() == chunked.read()
+    print('byte-identical: {}'.format(identical))
+    os.remove(reference_file)
+    os.remove(chunked_file)
+    os.rmdir(directory)
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
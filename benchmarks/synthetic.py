@@ -0,0 +1,86 @@
+"""
+Generators of synthetic input files of any size for the benchmarks: GeoTom
+.mod meshes, .ohm files with topography and GeoTIFF digital elevation models
+covering the line of a synthetic profile.
+"""
+
+import numpy as np
+
+# UTM coordinates of the start point of every synthetic profile
+START_POINT = (356933., 5686395.)
+# width of the columns of a synthetic mesh and spacing of its electrodes in m
+COLUMN_WIDTH = 4.
+# thickness of the layers of a synthetic mesh in m
+LAYER_THICKNESS = 1.11
+# margin of a synthetic DEM around the line of a profile in m
+DEM_MARGIN = 2 * COLUMN_WIDTH
+
+
+def num_mesh_columns(num_cells, num_layers=20):
+    """Return number of columns of a synthetic mesh with about num_cells cells"""
+    return max(num_cells // num_layers, 1)
+
+
+def profile_end_point(num_cells, num_layers=20):
+    """
+    Return the UTM coordinates of the end point of the straight east-west line
+    of a synthetic profile starting at START_POINT, so that the line is as long
+    as its mesh
+    """
+    return START_POINT[0] + (num_mesh_columns(num_cells, num_layers) - 1) * COLUMN_WIDTH, START_POINT[1]
+
+
+def write_synthetic_mod_file(filename, num_cells, num_layers=20):
+    """Write a .mod file with CRLF line endings like the files of GeoTom"""
+    num_columns = num_mesh_columns(num_cells, num_layers)
+    column, layer = np.divmod(np.arange(num_columns * num_layers), num_layers)
+    rng = np.random.default_rng(0)
+    table = np.column_stack(((column - 1) * COLUMN_WIDTH, column * COLUMN_WIDTH, layer * LAYER_THICKNESS,
+                             (layer + 1) * LAYER_THICKNESS, rng.lognormal(4., 1., len(column)),
+                             rng.uniform(0., 30., len(column))))
+    with open(filename, 'w', newline='\r\n') as mod_file:
+        mod_file.write('#x1/m\tx2/m\tz1/m\tz2/m\trho/Ohmm coverage\n')
+        np.savetxt(mod_file, table, fmt='%.2f\t%.2f\t%.2f\t%.2f\t%.2f\t%.3f')
+
+
+def write_synthetic_ohm_file(filename, num_rows):
+    """Write an ohm file with num_rows electrodes, data and topography points"""
+    x = np.arange(num_rows) * COLUMN_WIDTH
+    rng = np.random.default_rng(0)
+    with open(filename, 'w') as ohm_file:
+        ohm_file.write('{} # Number of electrodes\n# x z\n'.format(num_rows))
+        np.savetxt(ohm_file, np.column_stack((x, np.zeros(num_rows))), fmt='%.1f\t%d')
+        ohm_file.write('{} # Number of data\n# a b m n rhoa\n'.format(num_rows))
+        np.savetxt(ohm_file, np.column_stack((np.arange(num_rows).repeat(4).reshape(-1, 4) + [1, 2, 3, 4],
+                                              rng.lognormal(4., 1., num_rows))), fmt='%d\t%d\t%d\t%d\t%.3f')
+        ohm_file.write('{} # Number of topo points\n# x h for each topo point\n'.format(num_rows))
+        np.savetxt(ohm_file, np.column_stack((x, rng.uniform(100., 200., num_rows))), fmt='%.1f\t%.2f')
+
+
+def write_synthetic_dem_file(filename, num_pixels, line_length, pixel_size=1.):
+    """
+    Write a GeoTIFF with a smooth, slightly noisy surface of about num_pixels
+    pixels. Its columns cover the east-west line of line_length m starting at
+    START_POINT, its rows grow with num_pixels to both sides of the line.
+    :return: number of pixels of the written raster
+    :rtype: int
+    """
+    import gdal
+    cols = int(np.ceil((line_length + 2 * DEM_MARGIN) / pixel_size))
+    # at least enough rows for a window of DEM_MARGIN to both sides of the line
+    rows = max(num_pixels // cols, int(np.ceil(2 * DEM_MARGIN / pixel_size)))
+    x_origin = START_POINT[0] - DEM_MARGIN
+    y_origin = START_POINT[1] + rows / 2 * pixel_size
+    x = np.arange(cols) * pixel_size
+    y = np.arange(rows)[:, np.newaxis] * pixel_size
+    rng = np.random.default_rng(0)
+    data = (150. + 20. * np.sin(x / 250.) + 5. * np.cos(y / 40.)
+            + rng.normal(0., .1, (rows, cols))).astype(np.float32)
+    dataset = gdal.GetDriverByName('GTiff').Create(filename, cols, rows, 1, gdal.GDT_Float32,
+                                                   ['TILED=YES', 'COMPRESS=NONE'])
+    dataset.SetGeoTransform((x_origin, pixel_size, 0., y_origin, 0., -pixel_size))
+    dataset.GetRasterBand(1).WriteArray(data)
+    dataset.FlushCache()
+    # closes the file
+    del dataset
+    return rows * cols
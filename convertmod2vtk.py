@@ -1,8 +1,16 @@
 #!/usr/bin/env python3
 
 import argparse
+import os
 import sys
 from src.conversion import convertmod2vtk
+from src.DigitalElevationModel import INTERPOLATION_MODES
+from src.DEMMosaic import DEFAULT_CACHE_BYTES, is_dem_source, open_dem
+from src.DEMCache import DEMCache
+from src.io.write import OUTPUT_FORMATS, VTU_ENCODINGS
+from src.geometry import TOPOGRAPHY_MODES
+from src.incremental import convert_if_changed, watch
+from src.profiling import NULL_PROFILER, Profiler
 
 
 def main():
@@ -24,16 +32,67 @@ def main():
                                      epilog=epilog_string)
     parser.add_argument("output_vtk", help="Filepath/filename of .vtk file in which the results are saved.")
     parser.add_argument("input_mod", help="Filepath/filename of .mod file from which inputs are read.")
-    parser.add_argument("-t", "--input_topo", nargs='?', help="Filepath/filename of dem model or ohm file used for elevation")
+    parser.add_argument("-t", "--input_topo", nargs='?', help="Filepath/filename of dem model or ohm file used for elevation. A directory or .vrt file of dem tiles can be used as dem model.")
     parser.add_argument("-s", "--start_point", nargs=2, type=float, help="UTM north east coordinate of start point of array. If no start and end point is given, the relative coordinates from the .mod file will be kept.")
     parser.add_argument("-e", "--end_point", nargs=2, type=float, help="UTM north east coordinate of end point of array")
+    parser.add_argument("-v", "--via_point", nargs=2, type=float, action='append', help="UTM north east coordinate of a bend of the array between start and end point. Can be given several times, in order from start to end point.")
+    parser.add_argument("--tile_cache_bytes", type=int, default=DEFAULT_CACHE_BYTES, help="Size limit in bytes of the cache of decoded tiles if the dem model is a directory or .vrt file of tiles.")
+    parser.add_argument("--interpolation", choices=INTERPOLATION_MODES, default='ball', help="How elevation is interpolated from a dem model: 'ball' averages all points within a circle around a point, 'box' averages all pixels within a square window and is faster for large electrode spacings.")
+    parser.add_argument("--topography_mode", choices=TOPOGRAPHY_MODES, default='nearest', help="How elevation is interpolated between the topography points of an ohm file: 'nearest' takes the nearest point, 'linear' interpolates linearly and 'pchip' with a smooth monotone spline.")
+    parser.add_argument("-f", "--output_format", choices=OUTPUT_FORMATS, default='ascii', help="Format of the output file: legacy vtk file with 'ascii' or 'binary' data or XML 'vtu' file. Use the file ending .vtu for the latter.")
+    parser.add_argument("--vtu_encoding", choices=VTU_ENCODINGS, default='raw', help="Encoding of the appended data of a .vtu file.")
+    parser.add_argument("--compress", action='store_true', help="Compress the data of a .vtu file with zlib.")
+    parser.add_argument("--structured", action='store_true', help="Write a structured grid if the cells of the .mod file form a rectilinear grid of columns and layers, which gives smaller files. Use the file ending .vts for output format vtu. Other meshes are written as unstructured grid.")
+    parser.add_argument("--cache", action='store_true', help="Cache the whole dem model between runs in $GEOELECTRICAL_CACHE_DIR or ~/.cache/geoelectricalSurveyTools. Without a cache only the corridor of the profile is read from the dem file.")
+    parser.add_argument("--cache_dir", help="Directory in which dem models are cached between runs, enables the cache.")
+    parser.add_argument("--clear_cache", action='store_true', help="Delete all cached dem models before the conversion.")
+    parser.add_argument("--incremental", action='store_true', help="Only convert if the .mod file, topography, coordinates or options changed since the output was written, as recorded in a manifest next to the output.")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="Convert incrementally, then check for changes every SECONDS seconds until interrupted.")
+    parser.add_argument("--profile", nargs='?', const='-', metavar="FILE", help="Write a JSON report of the time and memory of every stage of the conversion and the numbers of points, cells and dem pixels to FILE, or to standard output if no FILE is given.")
     if len(sys.argv) < 2:
         # if no options were used, print help.
         parser.print_help()
         sys.exit(1)
     else:
         args = parser.parse_args()
-        convertmod2vtk(args.output_vtk, args.input_mod, args.start_point, args.end_point, args.input_topo)
+        if args.profile is not None and args.watch is not None:
+            parser.error("--profile can not be combined with --watch")
+        profiler = Profiler() if args.profile is not None else NULL_PROFILER
+        if args.clear_cache:
+            DEMCache(args.cache_dir).clear()
+        dem_cache = DEMCache(args.cache_dir) if args.cache or args.cache_dir is not None else None
+        topo = args.input_topo
+        open_topography = None
+        if topo is not None and is_dem_source(topo) and (dem_cache is not None or os.path.isdir(topo)
+                                                         or topo.lower().endswith('.vrt')):
+            # open dem model here to pass cache and the size of the tile cache of a mosaic,
+            # a single uncached dem file is opened during conversion to only read the profile corridor
+            def open_topography():
+                with profiler.stage('dem_construction'):
+                    return open_dem(args.input_topo, interpolation=args.interpolation,
+                                    cache_bytes=args.tile_cache_bytes, dem_cache=dem_cache)
+        options = {'interpolation': args.interpolation, 'output_format': args.output_format,
+                   'vtu_encoding': args.vtu_encoding, 'compress': args.compress, 'structured': args.structured,
+                   'topography_mode': args.topography_mode}
+        if args.incremental or args.watch is not None:
+            def convert():
+                if convert_if_changed(args.output_vtk, args.input_mod, args.start_point, args.end_point,
+                                      args.input_topo, args.via_point, open_topography, profiler, **options):
+                    print("converted {} -> {}".format(args.input_mod, args.output_vtk))
+                elif args.watch is None:
+                    print("{} is up to date".format(args.output_vtk))
+
+            if args.watch is not None:
+                watch(convert, args.watch)
+            else:
+                convert()
+        else:
+            if open_topography is not None:
+                topo = open_topography()
+            convertmod2vtk(args.output_vtk, args.input_mod, args.start_point, args.end_point, topo,
+                           via_points=args.via_point, profiler=profiler, **options)
+        if args.profile is not None:
+            profiler.write_report(args.profile)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+import argparse
+import sys
+from src.batch import convert_batch, expand_profiles, read_manifest
+from src.DigitalElevationModel import INTERPOLATION_MODES
+from src.DEMMosaic import DEFAULT_CACHE_BYTES
+from src.DEMCache import DEMCache
+from src.geometry import TOPOGRAPHY_MODES
+from src.io.write import OUTPUT_FORMATS, VTU_ENCODINGS
+from src.incremental import watch
+
+
+def main():
+    epilog_string = """\
+    Manifest:
+        A CSV file with the columns output, mod, start_north, start_east, end_north, end_east, topo, via
+        or a JSON file with a list of objects with the keys output, mod, start, end, topo, via.
+        topo and via are optional. via holds the bends of the line, in a CSV file as 'north east'
+        pairs separated by ';'. Relative filepaths are relative to the directory of the manifest.
+        mod may be a glob pattern such as inversions/*.mod, then output is formatted with the name of
+        every .mod file without ending, such as vtk/{stem}.vtk.
+
+    Example call:
+        convertmod2vtk_batch.py campaign.csv --workers 8
+        Convert all profiles listed in campaign.csv on 8 processes.
+
+        convertmod2vtk_batch.py campaign.csv --watch 10
+        Convert all profiles whose inputs changed since they were last converted,
+        then look for new or changed inversions every 10 seconds until Ctrl+C is pressed."""
+
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description="Converts many .mod files listed in a manifest to .vtk files in parallel.",
+                                     epilog=epilog_string)
+    parser.add_argument("manifest", help="CSV or JSON file listing the profiles to convert.")
+    parser.add_argument("-w", "--workers", type=int, help="Number of processes. Defaults to the number of CPUs.")
+    parser.add_argument("--tile_cache_bytes", type=int, default=DEFAULT_CACHE_BYTES, help="Size limit in bytes of the cache of decoded tiles of every process if a dem model is a directory or .vrt file of tiles.")
+    parser.add_argument("--interpolation", choices=INTERPOLATION_MODES, default='ball', help="How elevation is interpolated from a dem model, see convertmod2vtk.py.")
+    parser.add_argument("--topography_mode", choices=TOPOGRAPHY_MODES, default='nearest', help="How elevation is interpolated between the topography points of an ohm file, see convertmod2vtk.py.")
+    parser.add_argument("-f", "--output_format", choices=OUTPUT_FORMATS, default='ascii', help="Format of the output files, see convertmod2vtk.py.")
+    parser.add_argument("--vtu_encoding", choices=VTU_ENCODINGS, default='raw', help="Encoding of the appended data of .vtu files.")
+    parser.add_argument("--compress", action='store_true', help="Compress the data of .vtu files with zlib.")
+    parser.add_argument("--structured", action='store_true', help="Write structured grids where possible, see convertmod2vtk.py.")
+    parser.add_argument("--cache", action='store_true', help="Keep the cache through which dem models are shared with the processes between runs, in $GEOELECTRICAL_CACHE_DIR or ~/.cache/geoelectricalSurveyTools. Without a cache every profile reads only the corridor of its line from the dem model.")
+    parser.add_argument("--cache_dir", help="Directory in which dem models are cached between runs, enables the cache.")
+    parser.add_argument("--incremental", action='store_true', help="Only convert profiles whose .mod file, topography, coordinates or options changed since their output was written, as recorded in a manifest next to the outputs.")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="Convert incrementally, then poll for new or changed inversions every SECONDS seconds until interrupted.")
+    if len(sys.argv) < 2:
+        # if no options were used, print help.
+        parser.print_help()
+        sys.exit(1)
+    args = parser.parse_args()
+    dem_cache = DEMCache(args.cache_dir) if args.cache or args.cache_dir is not None else None
+    options = {'interpolation': args.interpolation, 'topography_mode': args.topography_mode,
+               'output_format': args.output_format, 'vtu_encoding': args.vtu_encoding,
+               'compress': args.compress, 'structured': args.structured}
+
+    def convert():
+        # the manifest is read again on every poll of watch mode
+        profiles = expand_profiles(read_manifest(args.manifest))
+        reported = []
+
+        def report(index, error):
+            reported.append(error)
+            if error is None:
+                print("converted {} -> {}".format(profiles[index]['mod'], profiles[index]['output']))
+            else:
+                print("FAILED {}: {}".format(profiles[index]['mod'], error), file=sys.stderr)
+
+        errors = convert_batch(profiles, args.workers, dem_cache, args.tile_cache_bytes, report,
+                               args.incremental or args.watch is not None, **options)
+        num_failed = sum(error is not None for error in errors)
+        if reported or args.watch is None:
+            print("{} profiles converted, {} up to date, {} failed".format(
+                len(reported) - num_failed, len(profiles) - len(reported), num_failed))
+        return num_failed
+
+    if args.watch is not None:
+        watch(convert, args.watch)
+    elif convert():
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
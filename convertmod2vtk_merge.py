@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+import argparse
+import sys
+from src.batch import expand_profiles, read_manifest
+from src.merge import merge_profiles
+from src.DigitalElevationModel import INTERPOLATION_MODES
+from src.DEMMosaic import DEFAULT_CACHE_BYTES
+from src.DEMCache import DEMCache
+from src.geometry import TOPOGRAPHY_MODES
+from src.io.write import VTU_ENCODINGS
+
+
+def main():
+    epilog_string = """\
+    The manifest lists the profiles as for convertmod2vtk_batch.py, its output column is not used.
+
+    Example calls:
+        convertmod2vtk_merge.py campaign.csv site.vtm
+        Write every profile to the directory site and the multiblock file site.vtm referencing them.
+
+    convertmod2vtk_merge.py campaign.csv site.vtk -f binary
+        Write all profiles into a single unstructured grid with a profile_id cell array."""
+
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description="Merges many profiles into one dataset of a whole site.",
+                                     epilog=epilog_string)
+    parser.add_argument("manifest", help="CSV or JSON file listing the profiles, see convertmod2vtk_batch.py.")
+    parser.add_argument("output", help="Filepath of a .vtm multiblock file or of a .vtk file with a single grid.")
+    parser.add_argument("-f", "--output_format", choices=('ascii', 'binary'), default='ascii', help="Format of a single .vtk file. Blocks of a .vtm file are always .vtu or .vts files.")
+    parser.add_argument("--vtu_encoding", choices=VTU_ENCODINGS, default='raw', help="Encoding of the appended data of the blocks of a .vtm file.")
+    parser.add_argument("--compress", action='store_true', help="Compress the data of the blocks of a .vtm file with zlib.")
+    parser.add_argument("--structured", action='store_true', help="Write blocks of a .vtm file as structured grids where possible, see convertmod2vtk.py.")
+    parser.add_argument("--interpolation", choices=INTERPOLATION_MODES, default='ball', help="How elevation is interpolated from a dem model, see convertmod2vtk.py.")
+    parser.add_argument("--topography_mode", choices=TOPOGRAPHY_MODES, default='nearest', help="How elevation is interpolated between the topography points of an ohm file, see convertmod2vtk.py.")
+    parser.add_argument("--tile_cache_bytes", type=int, default=DEFAULT_CACHE_BYTES, help="Size limit in bytes of the cache of decoded tiles if a dem model is a directory or .vrt file of tiles.")
+    parser.add_argument("--cache", action='store_true', help="Cache whole dem models between runs in $GEOELECTRICAL_CACHE_DIR or ~/.cache/geoelectricalSurveyTools. Without a cache only the corridors of the profiles are read from the dem files.")
+    parser.add_argument("--cache_dir", help="Directory in which dem models are cached between runs, enables the cache.")
+    if len(sys.argv) < 2:
+        # if no options were used, print help.
+        parser.print_help()
+        sys.exit(1)
+    args = parser.parse_args()
+    profiles = expand_profiles(read_manifest(args.manifest))
+    dem_cache = DEMCache(args.cache_dir) if args.cache or args.cache_dir is not None else None
+
+    def report(index, error):
+        if error is None:
+            print("merged {}".format(profiles[index]['mod']))
+        else:
+            print("FAILED {}: {}".format(profiles[index]['mod'], error), file=sys.stderr)
+
+    errors = merge_profiles(args.output, profiles, args.output_format, args.vtu_encoding, args.compress,
+                            args.interpolation, args.structured, args.topography_mode, args.tile_cache_bytes,
+                            dem_cache, report)
+    num_failed = sum(error is not None for error in errors)
+    print("{} of {} profiles merged into {}, {} failed".format(len(profiles) - num_failed, len(profiles),
+                                                              args.output, num_failed))
+    if num_failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
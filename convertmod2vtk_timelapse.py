@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import argparse
+import sys
+from src.timelapse import convert_time_series
+from src.DigitalElevationModel import INTERPOLATION_MODES
+from src.geometry import TOPOGRAPHY_MODES
+from src.io.write import OUTPUT_FORMATS, VTU_ENCODINGS
+
+
+def main():
+    epilog_string = """\
+    Example calls:
+        convertmod2vtk_timelapse.py Profil1.pvd Profil1_day1.mod Profil1_day2.mod Profil1_day3.mod -s 378455 5701392 -e 378555 5701392 -t DEM.tif
+        Write Profil1_000.vtu, Profil1_001.vtu and Profil1_002.vtu with rho, coverage and the change of rho
+        relative to the first epoch in percent, and the collection Profil1.pvd that ParaView opens as time series.
+
+    convertmod2vtk_timelapse.py Profil1_all.vtk Profil1_day*.mod -s 378455 5701392 -e 378555 5701392 -t DEM.tif
+        Write a single file with the arrays rho_000, coverage_000, rho_change_000, rho_001, ... of all epochs."""
+
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     description="Converts a time-lapse series of .mod files of the same profile, building the mesh once.",
+                                     epilog=epilog_string)
+    parser.add_argument("output", help="Filepath of a .pvd collection with one file per epoch or of a single file with the arrays of all epochs.")
+    parser.add_argument("input_mod", nargs='+', help="Filepaths of the .mod files in the order of the epochs. All must have the same cells.")
+    parser.add_argument("-t", "--input_topo", nargs='?', help="Filepath/filename of dem model or ohm file used for elevation, see convertmod2vtk.py.")
+    parser.add_argument("-s", "--start_point", nargs=2, type=float, help="UTM north east coordinate of start point of array.")
+    parser.add_argument("-e", "--end_point", nargs=2, type=float, help="UTM north east coordinate of end point of array")
+    parser.add_argument("-v", "--via_point", nargs=2, type=float, action='append', help="UTM north east coordinate of a bend of the array, see convertmod2vtk.py.")
+    parser.add_argument("--times", nargs='+', type=float, help="Time of every epoch in the .pvd collection. Defaults to the number of the epoch.")
+    parser.add_argument("--reference_epoch", type=int, default=0, help="Number of the epoch, starting at 0, relative to which the change of rho is computed.")
+    parser.add_argument("--interpolation", choices=INTERPOLATION_MODES, default='ball', help="How elevation is interpolated from a dem model, see convertmod2vtk.py.")
+    parser.add_argument("--topography_mode", choices=TOPOGRAPHY_MODES, default='nearest', help="How elevation is interpolated between the topography points of an ohm file, see convertmod2vtk.py.")
+    parser.add_argument("-f", "--output_format", choices=OUTPUT_FORMATS, default='ascii', help="Format of a single output file. Files of a .pvd collection are always .vtu or .vts files.")
+    parser.add_argument("--vtu_encoding", choices=VTU_ENCODINGS, default='raw', help="Encoding of the appended data of .vtu files.")
+    parser.add_argument("--compress", action='store_true', help="Compress the data of .vtu files with zlib.")
+    parser.add_argument("--structured", action='store_true', help="Write structured grids where possible, see convertmod2vtk.py.")
+    if len(sys.argv) < 2:
+        # if no options were used, print help.
+        parser.print_help()
+        sys.exit(1)
+    args = parser.parse_args()
+    convert_time_series(args.output, args.input_mod, args.start_point, args.end_point, args.input_topo,
+                        args.interpolation, args.via_point, args.times, args.reference_epoch, args.output_format,
+                        args.vtu_encoding, args.compress, args.structured, args.topography_mode)
+
+
+if __name__ == '__main__':
+    main()
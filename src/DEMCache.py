@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
+from geoelectricalSurveyTools.src.utils import sampled_content_hash
+
+"""
+The DEMCache class keeps the raster band and geotransform of digital elevation
+models in a cache directory. Every entry is a .npy file that is memory mapped
+when the model is opened again, so only the pixels that are actually queried
+are read from disk. A model opened for 'box' interpolation also stores its
+summed-area tables and pyramid in the entry, so processes sharing the cache
+compute them once. Entries are keyed by the path, modification time, size and
+a hash of the content of the source file. Once the cache exceeds its size
+limit the least recently used entries are deleted.
+"""
+
+# directory of the cache if neither a directory nor the environment variable is given
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'geoelectricalSurveyTools')
+CACHE_DIR_ENVIRONMENT_VARIABLE = 'GEOELECTRICAL_CACHE_DIR'
+DEFAULT_MAX_BYTES = 4 * 2 ** 30
+# number of raster rows copied into the cache at once
+_ROWS_PER_READ = 1024
+
+
+class DEMCache:
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param cache_dir: directory of the cache, created if it does not exist.
+        Defaults to $GEOELECTRICAL_CACHE_DIR or ~/.cache/geoelectricalSurveyTools
+        :type cache_dir: str
+        :param max_bytes: size limit of the cache in bytes
+        :type max_bytes: int
+        """
+        if cache_dir is None:
+            cache_dir = os.environ.get(CACHE_DIR_ENVIRONMENT_VARIABLE, DEFAULT_CACHE_DIR)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, filepath):
+        """
+        Return key of the cache entry of a raster file. Hashing the whole file
+        would take as long as reading it, so only its start and end are hashed
+        in addition to its path, modification time and size.
+        :rtype: str
+        """
+        stat = os.stat(filepath)
+        description = json.dumps([os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size,
+                                  sampled_content_hash(filepath)])
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def open(self, filepath, interpolation='ball', pyramid_levels=0):
+        """
+        Return the model of a raster file from the cache, add it to the cache
+        first if it is missing
+        :param filepath: filepath of the raster file
+        :param interpolation: see DEM.__init__
+        :param pyramid_levels: see DEM.__init__
+        :rtype: DEM
+        """
+        entry = os.path.join(self.cache_dir, self.key(filepath))
+        if not os.path.isdir(entry):
+            self._store(filepath, entry)
+            self._evict()
+        with open(os.path.join(entry, 'meta.json')) as meta_file:
+            meta = json.load(meta_file)
+        # mark entry as recently used
+        os.utime(entry)
+        data = np.load(os.path.join(entry, 'data.npy'), mmap_mode='r')
+        dem = DEM.from_array(data, meta['geotransform'], interpolation, pyramid_levels)
+        if interpolation == 'box':
+            self._load_box_tables(entry, dem)
+        return dem
+
+    def _store(self, filepath, entry):
+        """Copy the raster band into a new cache entry strip by strip"""
+        import gdal
+        dataset = gdal.Open(filepath)
+        band = dataset.GetRasterBand(1)
+        cols = dataset.RasterXSize
+        rows = dataset.RasterYSize
+        dtype = band.ReadAsArray(0, 0, 1, 1).dtype
+        # write into a temporary directory first so that no other process sees a partial entry
+        temporary_entry = tempfile.mkdtemp(dir=self.cache_dir, prefix='.tmp-')
+        try:
+            data = np.lib.format.open_memmap(os.path.join(temporary_entry, 'data.npy'), mode='w+',
+                                             dtype=dtype, shape=(rows, cols))
+            for row_start in range(0, rows, _ROWS_PER_READ):
+                num_rows = min(_ROWS_PER_READ, rows - row_start)
+                data[row_start:row_start + num_rows] = band.ReadAsArray(0, row_start, cols, num_rows)
+            data.flush()
+            del data
+            with open(os.path.join(temporary_entry, 'meta.json'), 'w') as meta_file:
+                json.dump({'source': os.path.abspath(filepath),
+                           'geotransform': list(dataset.GetGeoTransform())}, meta_file)
+            os.rename(temporary_entry, entry)
+        except OSError:
+            shutil.rmtree(temporary_entry, ignore_errors=True)
+            if not os.path.isdir(entry):
+                raise
+
+    def _load_box_tables(self, entry, dem):
+        """
+        Memory map the summed-area tables of a model and its pyramid levels
+        from the cache entry, compute and add them to the entry first if they
+        are missing
+        """
+        tables_file = os.path.join(entry, 'box_tables_{}.json'.format(dem._pyramid_levels))
+        if not os.path.isfile(tables_file):
+            self._store_box_tables(entry, dem, tables_file)
+            self._evict()
+        with open(tables_file) as tables:
+            levels = json.load(tables)
+        dem._pyramid = [DEM.from_array(np.load(os.path.join(entry, level['data']), mmap_mode='r'),
+                                       level['geotransform'], interpolation='box')
+                        for level in levels[1:]]
+        for level, meta in zip([dem] + dem._pyramid, levels):
+            level._summed_area_table = np.load(os.path.join(entry, meta['summed_area_table']), mmap_mode='r')
+            level._summed_area_offset = meta['summed_area_offset']
+
+    def _store_box_tables(self, entry, dem, tables_file):
+        """
+        Compute the pyramid and summed-area tables of a model and write them
+        into its cache entry. A level of the pyramid does not depend on the
+        number of levels, so its files are shared by models of any number of levels.
+        """
+        dem._build_pyramid()
+        levels = []
+        for index, level in enumerate([dem] + dem._pyramid):
+            level._build_summed_area_table()
+            meta = {'geotransform': list(level._transform), 'summed_area_offset': float(level._summed_area_offset),
+                    'summed_area_table': 'summed_area_table_{}.npy'.format(index)}
+            _write_file(os.path.join(entry, meta['summed_area_table']),
+                        lambda file, table=level._summed_area_table: np.save(file, table))
+            if index > 0:
+                meta['data'] = 'pyramid_{}.npy'.format(index)
+                _write_file(os.path.join(entry, meta['data']), lambda file, data=level._data: np.save(file, data))
+            levels.append(meta)
+        _write_file(tables_file, lambda file: file.write(json.dumps(levels).encode()))
+
+    def entries(self):
+        """Return paths of all cache entries, least recently used first"""
+        entries = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                   if not name.startswith('.')]
+        return sorted((entry for entry in entries if os.path.isdir(entry)), key=os.path.getmtime)
+
+    def size(self):
+        """Return size of all cache entries in bytes"""
+        return sum(_entry_size(entry) for entry in self.entries())
+
+    def _evict(self):
+        """Delete least recently used entries until the cache is within its size limit"""
+        entries = self.entries()
+        sizes = [_entry_size(entry) for entry in entries]
+        cache_size = sum(sizes)
+        # always keep the most recently used entry
+        for entry, size in zip(entries[:-1], sizes[:-1]):
+            if cache_size <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            cache_size -= size
+
+    def clear(self):
+        """Delete all entries of the cache"""
+        for name in os.listdir(self.cache_dir):
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+
+def _write_file(filepath, write):
+    """Write a file through a temporary file so that no other process sees it partially written"""
+    handle, temporary_file = tempfile.mkstemp(dir=os.path.dirname(filepath), prefix='.tmp-')
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            write(file)
+        os.replace(temporary_file, filepath)
+    except OSError:
+        os.remove(temporary_file)
+        raise
+
+
+def _entry_size(entry):
+    return sum(os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry))
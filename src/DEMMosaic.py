@@ -0,0 +1,212 @@
+import glob
+import os
+from collections import OrderedDict
+import numpy as np
+from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
+from geoelectricalSurveyTools.src.utils import get_file_ending
+
+"""
+The DEMMosaic class deals with a Digital Elevation Model that is split into
+many Geotif tiles. Only the footprints of the tiles are read up front and put
+into a grid index. A height query opens only the tiles it touches and keeps
+them in a cache of decoded tiles, from which the least recently used tiles are
+dropped once the cache exceeds its size limit.
+open_dem returns a DEM or DEMMosaic depending on the given source.
+"""
+
+# file endings of single rasters that can be used as digital elevation model
+DEM_FILE_ENDINGS = ('tif', 'tiff', 'vrt')
+# file endings of tiles searched for in a directory
+TILE_FILE_ENDINGS = ('tif', 'tiff')
+# default size limit of the cache of decoded tiles
+DEFAULT_CACHE_BYTES = 512 * 2 ** 20
+
+
+class DEMMosaic:
+
+    def __init__(self, source, interpolation='ball', pyramid_levels=0, cache_bytes=DEFAULT_CACHE_BYTES,
+                 dem_cache=None):
+        """
+        Read the footprints of all tiles of the mosaic and build a grid index
+        of them
+        :param source: directory containing the tiles, list of filepaths of the
+        tiles or filepath of a GDAL .vrt file referencing the tiles
+        :type source: str or list of str
+        :param interpolation: interpolation mode of the tiles, see DEM.__init__
+        :param pyramid_levels: see DEM.__init__
+        :param cache_bytes: size limit of the cache of decoded tiles in bytes
+        :type cache_bytes: int
+        :param dem_cache: on-disk cache from which tiles are memory mapped
+        :type dem_cache: DEMCache
+        """
+        self._dem_cache = dem_cache
+        self._interpolation = interpolation
+        self._pyramid_levels = pyramid_levels
+        self._cache_bytes = cache_bytes
+        self._cache = OrderedDict()  # filepath of tile -> DEM of tile, least recently used first
+        self._tiles = _tile_filepaths(source)
+        if not self._tiles:
+            raise ValueError("No DEM tiles found in {}".format(source))
+        # footprint of every tile as (x_min, y_min, x_max, y_max)
+        self._footprints = np.array([_footprint(tile) for tile in self._tiles])
+        # size of the cells of the grid index is the median tile size
+        self._cell_size = max(np.median(self._footprints[:, 2:] - self._footprints[:, :2]), 1e-6)
+        self._grid = {}  # (column, row) of grid cell -> indices of tiles overlapping the cell
+        for index, (col_start, row_start, col_stop, row_stop) in enumerate(self._grid_cells(self._footprints)):
+            for col in range(col_start, col_stop + 1):
+                for row in range(row_start, row_stop + 1):
+                    self._grid.setdefault((col, row), []).append(index)
+
+    def _grid_cells(self, boxes):
+        """Return first and last (column, row) of the grid cells overlapped by every bounding box"""
+        return np.floor(boxes / self._cell_size).astype(np.int64)
+
+    def _tiles_in_box(self, box):
+        """Return indices of the tiles whose footprint intersects the bounding box (x_min, y_min, x_max, y_max)"""
+        col_start, row_start, col_stop, row_stop = self._grid_cells(np.asarray(box))
+        candidates = set()
+        if (col_stop - col_start + 1) * (row_stop - row_start + 1) > len(self._grid):
+            # box is larger than the mosaic, skip the index
+            candidates.update(range(len(self._tiles)))
+        else:
+            for col in range(col_start, col_stop + 1):
+                for row in range(row_start, row_stop + 1):
+                    candidates.update(self._grid.get((col, row), ()))
+        x_min, y_min, x_max, y_max = box
+        return [index for index in sorted(candidates)
+                if (self._footprints[index, 0] <= x_max and x_min <= self._footprints[index, 2]
+                    and self._footprints[index, 1] <= y_max and y_min <= self._footprints[index, 3])]
+
+    def _tile(self, index):
+        """Return decoded tile, read it if it is not in the cache"""
+        filepath = self._tiles[index]
+        if filepath in self._cache:
+            self._cache.move_to_end(filepath)
+            return self._cache[filepath]
+        if self._dem_cache is not None:
+            tile = self._dem_cache.open(filepath, self._interpolation, self._pyramid_levels)
+        else:
+            tile = DEM(filepath, self._interpolation, self._pyramid_levels)
+        self._cache[filepath] = tile
+        return tile
+
+    def _evict(self):
+        """Drop least recently used tiles until the cache is within its size limit"""
+        cache_size = sum(tile.nbytes for tile in self._cache.values())
+        # always keep the most recently used tile
+        while cache_size > self._cache_bytes and len(self._cache) > 1:
+            _, tile = self._cache.popitem(last=False)
+            cache_size -= tile.nbytes
+
+    @property
+    def num_pixels(self):
+        """Number of pixels of the decoded tiles in the cache"""
+        return sum(tile.num_pixels for tile in self._cache.values())
+
+    def get_elevation_sums(self, utm_coordinates, interpolation_distance, workers=-1):
+        """
+        Get sum and number of the elevations that are averaged around every
+        coordinate, summed over all tiles, see DEM.get_elevation_sums
+        :rtype: tuple of two arrays of shape (N,)
+        """
+        utm_coordinates = np.asarray(utm_coordinates, dtype=np.float64).reshape(-1, 2)
+        sums = np.zeros(len(utm_coordinates))
+        counts = np.zeros(len(utm_coordinates), dtype=np.int64)
+        if len(utm_coordinates) == 0:
+            return sums, counts
+        query_boxes = np.hstack((utm_coordinates - interpolation_distance, utm_coordinates + interpolation_distance))
+        for index in self._tiles_in_box((*query_boxes[:, :2].min(axis=0), *query_boxes[:, 2:].max(axis=0))):
+            x_min, y_min, x_max, y_max = self._footprints[index]
+            touching = ((query_boxes[:, 0] <= x_max) & (x_min <= query_boxes[:, 2])
+                        & (query_boxes[:, 1] <= y_max) & (y_min <= query_boxes[:, 3]))
+            if not touching.any():
+                continue
+            tile_sums, tile_counts = self._tile(index).get_elevation_sums(
+                utm_coordinates[touching], interpolation_distance, workers)
+            sums[touching] += tile_sums
+            counts[touching] += tile_counts
+            self._evict()
+        return sums, counts
+
+    def get_heights(self, utm_coordinates, interpolation_distance, workers=-1):
+        """
+        Get the average elevation around many coordinates at once. Points
+        of all tiles around a coordinate are averaged, see DEM.get_heights
+        :rtype: numpy.ndarray
+        """
+        sums, counts = self.get_elevation_sums(utm_coordinates, interpolation_distance, workers)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts
+
+    def get_height(self, utm_coordinate, interpolation_distance):
+        """
+        Get the average elevation around a single coordinate, see DEM.get_height
+        :param utm_coordinate: tuple of utm coordinates (north, east)
+        """
+        return self.get_heights(np.array([utm_coordinate]), interpolation_distance, workers=1)[0]
+
+
+def _tile_filepaths(source):
+    """Return filepaths of all tiles of a directory, list of tiles or .vrt file"""
+    if isinstance(source, (list, tuple)):
+        return list(source)
+    if os.path.isdir(source):
+        return sorted(filepath for filepath in glob.glob(os.path.join(source, '*'))
+                      if get_file_ending(filepath).lower() in TILE_FILE_ENDINGS)
+    import gdal
+    # first file of a virtual raster is the .vrt file itself
+    return [filepath for filepath in gdal.Open(source).GetFileList()
+            if os.path.abspath(filepath) != os.path.abspath(source)]
+
+
+def _footprint(filepath):
+    """Return bounding box (x_min, y_min, x_max, y_max) of a raster in UTM coordinates"""
+    import gdal
+    dataset = gdal.Open(filepath)
+    x_origin, pixel_width, row_rotation, y_origin, column_rotation, pixel_height = dataset.GetGeoTransform()
+    cols = np.array([0, dataset.RasterXSize, 0, dataset.RasterXSize])
+    rows = np.array([0, 0, dataset.RasterYSize, dataset.RasterYSize])
+    x_coords = x_origin + pixel_width * cols + row_rotation * rows
+    y_coords = y_origin + column_rotation * cols + pixel_height * rows
+    return x_coords.min(), y_coords.min(), x_coords.max(), y_coords.max()
+
+
+def is_dem_source(source):
+    """
+    Return True if source can be opened with open_dem: an elevation model, a
+    directory or list of tiles or a raster file
+    """
+    if hasattr(source, 'get_heights') or isinstance(source, (list, tuple)):
+        return True
+    return os.path.isdir(source) or get_file_ending(source).lower() in DEM_FILE_ENDINGS
+
+
+def open_dem(source, line_points=None, buffer=0., interpolation='ball', pyramid_levels=0,
+             cache_bytes=DEFAULT_CACHE_BYTES, dem_cache=None):
+    """
+    Open a digital elevation model from a single raster file or from a mosaic
+    of tiles. An already opened model is returned unchanged.
+    :param source: elevation model, filepath of a raster or .vrt file, directory
+    containing tiles or list of filepaths of tiles
+    :param line_points: UTM coordinates of the points of the profile line. If
+    given, only the part of a single raster around the line is read.
+    :type line_points: array_like of shape (N, 2)
+    :param buffer: distance in m around the line that is read
+    :type buffer: float
+    :param interpolation: see DEM.__init__
+    :param pyramid_levels: see DEM.__init__
+    :param cache_bytes: size limit of the tile cache of a mosaic in bytes
+    :param dem_cache: on-disk cache from which rasters are memory mapped. The
+    whole raster is mapped, so line_points are not needed.
+    :type dem_cache: DEMCache
+    :rtype: DEM or DEMMosaic
+    """
+    if hasattr(source, 'get_heights'):
+        return source
+    if isinstance(source, (list, tuple)) or os.path.isdir(source) or get_file_ending(source).lower() == 'vrt':
+        return DEMMosaic(source, interpolation, pyramid_levels, cache_bytes, dem_cache)
+    if dem_cache is not None:
+        return dem_cache.open(source, interpolation, pyramid_levels)
+    if line_points is not None:
+        return DEM.for_corridor(source, line_points, buffer, interpolation, pyramid_levels)
+    return DEM(source, interpolation, pyramid_levels)
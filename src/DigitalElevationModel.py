@@ -1,49 +1,449 @@
-import gdal
+import os
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from operator import itemgetter
-from scipy import spatial
 
 """
-The DEM class deals with a Geotif Digital Elevation Model. The model 
-is loaded from a filepath and then a KDTree is constructed. This efficient data
-structure allows querying for the closest points in O(log n) time. 
-The function get_height gets the height of a anywhere within the model by interpolating the 
-closest points.
+The DEM class deals with a Geotif Digital Elevation Model. The raster band is
+kept as a single numpy array together with its geotransform, so a UTM coordinate
+can be mapped directly to a pixel index without building any search structure.
+Only irregular data (point clouds or rasters with a degenerate geotransform)
+fall back to a KDTree, which allows querying for the closest points in
+O(log n) time.
+The function get_height gets the height of a anywhere within the model by interpolating the
+closest points. A DEM can be restricted to a bounding box, e.g. the corridor
+around a profile, in which case only the intersecting window of the raster is
+read and further blocks are loaded when a query needs them.
+Two interpolation modes are available: 'ball' averages all
+points within a circle around the coordinate, 'box' averages all pixels within
+a square window. The box average is read from a summed-area table of the raster
+in constant time independent of the window size.
 """
 
+INTERPOLATION_MODES = ('ball', 'box')
+
+# upper limit of raster pixels gathered at once by a batched height query
+_MAX_PIXELS_PER_CHUNK = 2 ** 22
+# a pyramid level is only used for a box query if the window still spans this many of its pixels
+_MIN_PYRAMID_WINDOW_PIXELS = 16
+
+
 class DEM:
 
-    def __init__(self, filepath):
+    # band of the opened raster if only a window of it is loaded
+    _band = None
+
+    def __init__(self, filepath, interpolation='ball', pyramid_levels=0, bounds=None):
         """
-        Open the digital elevation model given at filepath, read the coordinates
-        and build a KDTree of coordinate/height
+        Open the digital elevation model given at filepath and read the raster
+        band and its geotransform
         :param filepath:
+        :param interpolation: 'ball' to average all points within a circle,
+        'box' to average all pixels within a square window around a coordinate
+        :type interpolation: str
+        :param pyramid_levels: number of coarser levels, each halving the
+        resolution, from which box averages over large windows are read
+        :type pyramid_levels: int
+        :param bounds: UTM bounding box (x_min, y_min, x_max, y_max). If given,
+        only the part of the raster within it is read, other parts are read
+        once a query needs them. By default the whole raster is read.
+        :type bounds: tuple of floats
         """
+        # gdal is slow to import and only needed to read rasters, not for .mod or .ohm files
+        import gdal
+        self._set_interpolation(interpolation, pyramid_levels)
         dataset = gdal.Open(filepath)
-        self._coord_ele_data = []
         dataset_band = dataset.GetRasterBand(1)
         cols = dataset.RasterXSize
         rows = dataset.RasterYSize
-        #print(rows, cols)
-        data = dataset_band.ReadAsArray(0, 0, cols, rows)
         transform = dataset.GetGeoTransform()
-        xOrigin_upperleft = transform[0]
-        yOrigin_upperleft = transform[3]
-        pixelXWidth = transform[1]
-        pixelYWidth = transform[2]
-        pixelXHeight = transform[4]
-        pixelYHeight = transform[5]
-        for i in range(0, cols):
-            for j in range(0, rows):
-                x_coord = xOrigin_upperleft + pixelXWidth * i + pixelYWidth * j
-                y_coord = yOrigin_upperleft + pixelXHeight * i + pixelYHeight * j
-                elevation = data[j][i]
-                self._coord_ele_data.append((x_coord, y_coord, elevation))
-
-        self._coord_ele_data.sort(key=itemgetter(0))
-        self._coord_ele_data.sort(key=itemgetter(1))
-        coord_data = [(coord[0], coord[1]) for coord in self._coord_ele_data]
-        self._kdtree = spatial.cKDTree(coord_data)  # create kd-Tree of coordinate data to speed up the search for coordinates
+        if bounds is None or transform[1] * transform[5] == transform[2] * transform[4]:
+            data = dataset_band.ReadAsArray(0, 0, cols, rows)
+            self._init_raster(data, transform)
+            return
+        # keep dataset open, the band is only valid as long as its dataset exists
+        self._dataset = dataset
+        self._band = dataset_band
+        self._raster_shape = (rows, cols)
+        self._raster_transform = tuple(float(value) for value in transform)
+        self._block_size = dataset_band.GetBlockSize()
+        self._init_raster(np.empty((0, 0), dtype=np.float32), transform)
+        self._window = (0, 0, 0, 0)
+        self._load_window(*self._raster_window(bounds))
+
+    @classmethod
+    def for_corridor(cls, filepath, line_points, buffer, interpolation='ball', pyramid_levels=0):
+        """
+        Open the digital elevation model given at filepath, but only read the
+        part of it around a profile line
+        :param line_points: UTM coordinates of the start and end point of the
+        line, or of all its vertices
+        :type line_points: array_like of shape (N, 2)
+        :param buffer: distance in m around the line that is read
+        :type buffer: float
+        :param interpolation: see DEM.__init__
+        :param pyramid_levels: see DEM.__init__
+        :rtype: DEM
+        """
+        line_points = np.asarray(line_points, dtype=np.float64).reshape(-1, 2)
+        x_min, y_min = line_points.min(axis=0) - buffer
+        x_max, y_max = line_points.max(axis=0) + buffer
+        return cls(filepath, interpolation, pyramid_levels, bounds=(x_min, y_min, x_max, y_max))
+
+    @classmethod
+    def from_array(cls, data, geotransform, interpolation='ball', pyramid_levels=0):
+        """
+        Create a DEM from a raster already held in memory
+        :param data: 2D array of elevations, indexed [row, column]
+        :type data: numpy.ndarray
+        :param geotransform: GDAL style geotransform of the raster
+        (x_origin, pixel_width, row_rotation, y_origin, column_rotation, pixel_height)
+        :type geotransform: tuple of floats
+        :param interpolation: see DEM.__init__
+        :param pyramid_levels: see DEM.__init__
+        :rtype: DEM
+        """
+        dem = cls.__new__(cls)
+        dem._set_interpolation(interpolation, pyramid_levels)
+        dem._init_raster(np.asarray(data), geotransform)
+        return dem
+
+    @classmethod
+    def from_points(cls, coordinates, elevations):
+        """
+        Create a DEM from irregularly spaced elevation points. A KDTree is built
+        over the coordinates since they can not be indexed directly.
+        :param coordinates: array of shape (N, 2) of UTM coordinates
+        :param elevations: array of shape (N,) of elevations
+        :rtype: DEM
+        """
+        dem = cls.__new__(cls)
+        dem._set_interpolation('ball', 0)
+        dem._init_points(np.asarray(coordinates, dtype=np.float64),
+                         np.asarray(elevations))
+        return dem
+
+    def _set_interpolation(self, interpolation, pyramid_levels):
+        if interpolation not in INTERPOLATION_MODES:
+            raise ValueError("Unknown interpolation mode {}, use one of {}".format(
+                interpolation, ', '.join(INTERPOLATION_MODES)))
+        self._interpolation = interpolation
+        self._pyramid_levels = pyramid_levels
+        # summed-area table and pyramid are built on the first box query
+        self._summed_area_table = None
+        self._pyramid = None
+
+    def _init_raster(self, data, geotransform):
+        self._data = data
+        self._transform = tuple(float(value) for value in geotransform)
+        x_origin, pixel_width, row_rotation, y_origin, column_rotation, pixel_height = self._transform
+        determinant = pixel_width * pixel_height - row_rotation * column_rotation
+        if determinant == 0:
+            # pixel positions can not be inverted, treat raster as point cloud
+            rows, cols = np.indices(data.shape)
+            x_coords = x_origin + pixel_width * cols + row_rotation * rows
+            y_coords = y_origin + column_rotation * cols + pixel_height * rows
+            self._init_points(np.column_stack((x_coords.ravel(), y_coords.ravel())), data.ravel())
+            return
+        self._kdtree = None
+        # inverse of the linear part of the geotransform, maps offsets from the
+        # origin in UTM coordinates to (column, row) offsets in the raster
+        self._inverse_transform = np.array([[pixel_height, -row_rotation],
+                                            [-column_rotation, pixel_width]]) / determinant
+
+    def _init_points(self, coordinates, elevations):
+        if self._interpolation != 'ball':
+            raise ValueError("Irregular elevation data only supports 'ball' interpolation")
+        from scipy import spatial
+        self._data = None
+        self._elevations = elevations
+        self._kdtree = spatial.cKDTree(coordinates)  # create kd-Tree of coordinate data to speed up the search for coordinates
+
+    def _raster_window(self, bounds):
+        """
+        Return the window (row_start, row_stop, col_start, col_stop) of the
+        opened raster that contains the UTM bounding box, widened to whole blocks
+        """
+        x_min, y_min, x_max, y_max = bounds
+        x_origin, pixel_width, row_rotation, y_origin, column_rotation, pixel_height = self._raster_transform
+        determinant = pixel_width * pixel_height - row_rotation * column_rotation
+        inverse_transform = np.array([[pixel_height, -row_rotation],
+                                      [-column_rotation, pixel_width]]) / determinant
+        corners = np.array([[x_min, y_min], [x_min, y_max], [x_max, y_min], [x_max, y_max]])
+        cols, rows = inverse_transform @ (corners - np.array([x_origin, y_origin])).T
+        block_cols, block_rows = self._block_size
+        num_rows, num_cols = self._raster_shape
+        row_start = int(np.clip(np.floor(rows.min()) - 1, 0, num_rows)) // block_rows * block_rows
+        col_start = int(np.clip(np.floor(cols.min()) - 1, 0, num_cols)) // block_cols * block_cols
+        row_stop = min(-(-int(np.clip(np.ceil(rows.max()) + 2, 0, num_rows)) // block_rows) * block_rows, num_rows)
+        col_stop = min(-(-int(np.clip(np.ceil(cols.max()) + 2, 0, num_cols)) // block_cols) * block_cols, num_cols)
+        return row_start, max(row_start, row_stop), col_start, max(col_start, col_stop)
+
+    def _load_window(self, row_start, row_stop, col_start, col_stop):
+        """Read the given window of the opened raster and use it as the model"""
+        if row_start == row_stop or col_start == col_stop:
+            return
+        data = self._band.ReadAsArray(col_start, row_start, col_stop - col_start, row_stop - row_start)
+        x_origin, pixel_width, row_rotation, y_origin, column_rotation, pixel_height = self._raster_transform
+        window_transform = (x_origin + pixel_width * col_start + row_rotation * row_start, pixel_width, row_rotation,
+                            y_origin + column_rotation * col_start + pixel_height * row_start, column_rotation,
+                            pixel_height)
+        self._window = (row_start, row_stop, col_start, col_stop)
+        # tables of the previous window are no longer valid
+        self._summed_area_table = None
+        self._pyramid = None
+        self._init_raster(data, window_transform)
+
+    @property
+    def num_pixels(self):
+        """Number of pixels, or points of irregular data, held in memory"""
+        if self._kdtree is not None:
+            return len(self._elevations)
+        return self._data.size
+
+    @property
+    def nbytes(self):
+        """Number of bytes held by the elevation data and the tables built from it"""
+        if self._kdtree is not None:
+            return self._elevations.nbytes + self._kdtree.size * 16
+        size = self._data.nbytes
+        if self._summed_area_table is not None:
+            size += self._summed_area_table.nbytes
+        if self._pyramid is not None:
+            size += sum(level.nbytes for level in self._pyramid)
+        return size
+
+    def _ensure_loaded(self, utm_coordinates, interpolation_distance):
+        """Extend the loaded window of the raster to all pixels needed by a query"""
+        if self._band is None or len(utm_coordinates) == 0:
+            return
+        x_min, y_min = utm_coordinates.min(axis=0) - interpolation_distance
+        x_max, y_max = utm_coordinates.max(axis=0) + interpolation_distance
+        row_start, row_stop, col_start, col_stop = self._raster_window((x_min, y_min, x_max, y_max))
+        if row_start == row_stop or col_start == col_stop:
+            # query is outside of the raster
+            return
+        loaded_row_start, loaded_row_stop, loaded_col_start, loaded_col_stop = self._window
+        if (loaded_row_start < loaded_row_stop and loaded_row_start <= row_start and row_stop <= loaded_row_stop
+                and loaded_col_start <= col_start and col_stop <= loaded_col_stop):
+            return
+        if loaded_row_start < loaded_row_stop:
+            row_start, row_stop = min(row_start, loaded_row_start), max(row_stop, loaded_row_stop)
+            col_start, col_stop = min(col_start, loaded_col_start), max(col_stop, loaded_col_stop)
+        self._load_window(row_start, row_stop, col_start, col_stop)
+
+    def _pixel_coordinates(self, rows, cols):
+        """Return UTM coordinates of the pixels at the given row and column indices"""
+        x_origin, pixel_width, row_rotation, y_origin, column_rotation, pixel_height = self._transform
+        x_coords = x_origin + pixel_width * cols + row_rotation * rows
+        y_coords = y_origin + column_rotation * cols + pixel_height * rows
+        return x_coords, y_coords
+
+    def _window_shape(self, interpolation_distance):
+        """
+        Return the number of rows and columns of a raster window that contains
+        the search circle of radius interpolation_distance around any coordinate
+        """
+        # extent of the bounding box around the search circle in pixels
+        extent = np.abs(self._inverse_transform) @ np.array([2 * interpolation_distance, 2 * interpolation_distance])
+        # widen by one pixel on both sides so that rounding never drops a pixel on the circle
+        num_cols, num_rows = (np.ceil(extent).astype(int) + 3)
+        return num_rows, num_cols
+
+    def _window_origin(self, utm_coordinates, interpolation_distance):
+        """
+        Return row and column index of the upper left pixel of the window around
+        every coordinate, see _window_shape
+        """
+        x_origin, y_origin = self._transform[0], self._transform[3]
+        offsets = utm_coordinates - np.array([x_origin, y_origin])
+        # smallest column and row index of the corners of the bounding box around the search circle
+        box_corners = np.array([[-1, -1], [-1, 1], [1, -1], [1, 1]]) * interpolation_distance
+        indices = np.min([(offsets + corner) @ self._inverse_transform.T for corner in box_corners], axis=0)
+        indices = np.floor(indices).astype(np.int64) - 1
+        return indices[:, 1], indices[:, 0]
+
+    def _ball_sums(self, utm_coordinates, interpolation_distance, workers=1):
+        """
+        Return sum and number of the elevations of all points within
+        interpolation_distance around every coordinate
+        :param utm_coordinates: array of shape (N, 2) of utm coordinates
+        :param workers: number of workers used by the KDTree query
+        :rtype: tuple of two arrays of shape (N,)
+        """
+        if self._kdtree is not None:
+            neighbours = self._kdtree.query_ball_point(utm_coordinates, interpolation_distance, workers=workers)
+            counts = np.array([len(indices) for indices in neighbours], dtype=np.int64)
+            sums = np.zeros(len(neighbours))
+            if counts.sum() > 0:
+                elevations = self._elevations[np.concatenate(neighbours).astype(np.int64)]
+                starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+                sums[counts > 0] = np.add.reduceat(elevations.astype(np.float64), starts[counts > 0])
+            return sums, counts
+        window_rows, window_cols = self._window_shape(interpolation_distance)
+        row_start, col_start = self._window_origin(utm_coordinates, interpolation_distance)
+        # indices of all pixels in the window around every coordinate, shape (N, window_rows, window_cols)
+        rows = row_start[:, None, None] + np.arange(window_rows)[None, :, None]
+        cols = col_start[:, None, None] + np.arange(window_cols)[None, None, :]
+        num_rows, num_cols = self._data.shape
+        inside_raster = (rows >= 0) & (rows < num_rows) & (cols >= 0) & (cols < num_cols)
+        x_coords, y_coords = self._pixel_coordinates(rows, cols)
+        inside = (((x_coords - utm_coordinates[:, 0, None, None]) ** 2
+                   + (y_coords - utm_coordinates[:, 1, None, None]) ** 2 <= interpolation_distance ** 2)
+                  & inside_raster)
+        elevations = self._data[np.clip(rows, 0, num_rows - 1), np.clip(cols, 0, num_cols - 1)]
+        sums = np.where(inside, elevations, 0).sum(axis=(1, 2), dtype=np.float64)
+        counts = inside.sum(axis=(1, 2))
+        return sums, counts
+
+    def _build_summed_area_table(self):
+        """
+        Compute the summed-area table of the raster. Entry [i, j] holds the sum
+        of all pixels above and left of row i and column j, so the sum over any
+        window is read from its four corners.
+        """
+        # subtract mean elevation to keep the sums small and precise
+        self._summed_area_offset = np.mean(self._data, dtype=np.float64)
+        num_rows, num_cols = self._data.shape
+        table = np.zeros((num_rows + 1, num_cols + 1))
+        np.subtract(self._data, self._summed_area_offset, out=table[1:, 1:])
+        table[1:, 1:].cumsum(axis=0, out=table[1:, 1:])
+        table[1:, 1:].cumsum(axis=1, out=table[1:, 1:])
+        self._summed_area_table = table
+
+    def _build_pyramid(self):
+        """Build coarser levels of the raster by averaging blocks of 2x2 pixels"""
+        self._pyramid = []
+        data = self._data
+        transform = self._transform
+        for _ in range(self._pyramid_levels):
+            num_rows, num_cols = data.shape[0] // 2 * 2, data.shape[1] // 2 * 2
+            if num_rows == 0 or num_cols == 0:
+                break
+            data = data[:num_rows, :num_cols].reshape(num_rows // 2, 2, num_cols // 2, 2).mean(axis=(1, 3))
+            transform = (transform[0], transform[1] * 2, transform[2] * 2,
+                         transform[3], transform[4] * 2, transform[5] * 2)
+            self._pyramid.append(DEM.from_array(data, transform, interpolation='box'))
+
+    def _box_level(self, interpolation_distance):
+        """
+        Return the coarsest pyramid level on which a box window of half width
+        interpolation_distance still spans enough pixels, and the number of
+        pixels of this raster along one side of a pixel of that level
+        :rtype: tuple of DEM and int
+        """
+        level = self
+        scale = 1
+        if self._pyramid_levels > 0:
+            if self._pyramid is None:
+                self._build_pyramid()
+            window_rows, window_cols = self._window_shape(interpolation_distance)
+            for coarser_level in self._pyramid:
+                if min(window_rows, window_cols) // (scale * 2) < _MIN_PYRAMID_WINDOW_PIXELS:
+                    break
+                level = coarser_level
+                scale *= 2
+        if level._summed_area_table is None:
+            level._build_summed_area_table()
+        return level, scale
+
+    def _box_sums(self, utm_coordinates, interpolation_distance):
+        """
+        Return sum and number of the elevations of all pixels within a square
+        window of half width interpolation_distance around every coordinate.
+        For rotated rasters the window is the bounding box of that square in
+        raster space.
+        :param utm_coordinates: array of shape (N, 2) of utm coordinates
+        :rtype: tuple of two arrays of shape (N,)
+        """
+        x_origin, y_origin = self._transform[0], self._transform[3]
+        offsets = utm_coordinates - np.array([x_origin, y_origin])
+        box_corners = np.array([[-1, -1], [-1, 1], [1, -1], [1, 1]]) * interpolation_distance
+        indices = np.array([(offsets + corner) @ self._inverse_transform.T for corner in box_corners])
+        # first and one past last column/row of the pixels inside the window
+        num_rows, num_cols = self._data.shape
+        col_start, row_start = np.ceil(indices.min(axis=0)).T
+        col_stop, row_stop = np.floor(indices.max(axis=0)).T + 1
+        col_start, col_stop = (np.clip(col_start, 0, num_cols).astype(np.int64),
+                               np.clip(col_stop, 0, num_cols).astype(np.int64))
+        row_start, row_stop = (np.clip(row_start, 0, num_rows).astype(np.int64),
+                               np.clip(row_stop, 0, num_rows).astype(np.int64))
+        col_stop = np.maximum(col_start, col_stop)
+        row_stop = np.maximum(row_start, row_stop)
+        table = self._summed_area_table
+        counts = (row_stop - row_start) * (col_stop - col_start)
+        sums = (table[row_stop, col_stop] - table[row_start, col_stop]
+                - table[row_stop, col_start] + table[row_start, col_start])
+        return sums + counts * self._summed_area_offset, counts
+
+    def get_elevation_sums(self, utm_coordinates, interpolation_distance, workers=-1):
+        """
+        Get sum and number of the elevations that are averaged around every
+        coordinate by get_heights. Sums and numbers of several models can be
+        added up to average across their borders.
+        :param utm_coordinates: array of shape (N, 2) of utm coordinates (north, east)
+        :param interpolation_distance: distance around every coordinate in m to
+        look for points
+        :param workers: see get_heights
+        :rtype: tuple of two arrays of shape (N,)
+        """
+        utm_coordinates = np.asarray(utm_coordinates, dtype=np.float64).reshape(-1, 2)
+        self._ensure_loaded(utm_coordinates, interpolation_distance)
+        if self._kdtree is None and self._data.size == 0:
+            # no part of the raster was needed so far
+            return np.zeros(len(utm_coordinates)), np.zeros(len(utm_coordinates), dtype=np.int64)
+        if self._kdtree is not None:
+            # the KDTree distributes the queries to its workers itself
+            chunks = [utm_coordinates]
+            query = lambda chunk: self._ball_sums(chunk, interpolation_distance, workers)
+        elif self._interpolation == 'box':
+            # every coordinate costs four lookups in the summed-area table
+            level, scale = self._box_level(interpolation_distance)
+            chunks = [utm_coordinates[start:start + _MAX_PIXELS_PER_CHUNK]
+                      for start in range(0, len(utm_coordinates), _MAX_PIXELS_PER_CHUNK)]
+            # weight every pixel of a coarser level by the number of pixels it averages
+            query = lambda chunk: tuple(result * scale ** 2 for result in
+                                        level._box_sums(chunk, interpolation_distance))
+        else:
+            # limit the number of gathered pixels per chunk to keep memory bounded
+            window_rows, window_cols = self._window_shape(interpolation_distance)
+            chunk_size = max(1, _MAX_PIXELS_PER_CHUNK // (window_rows * window_cols))
+            chunks = [utm_coordinates[start:start + chunk_size]
+                      for start in range(0, len(utm_coordinates), chunk_size)]
+            query = lambda chunk: self._ball_sums(chunk, interpolation_distance)
+        if workers == -1:
+            workers = os.cpu_count() or 1
+        if len(chunks) > 1 and workers > 1:
+            # numpy releases the GIL, so the chunks are processed in parallel
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(query, chunks))
+        else:
+            results = [query(chunk) for chunk in chunks]
+        if not results:
+            return np.zeros(0), np.zeros(0, dtype=np.int64)
+        sums = np.concatenate([result[0] for result in results])
+        counts = np.concatenate([result[1] for result in results])
+        return sums, counts
+
+    def get_heights(self, utm_coordinates, interpolation_distance, workers=-1):
+        """
+        Get the average elevation around many coordinates at once. This is the
+        batched version of get_height. Depending on the interpolation mode of
+        the model all points within a circle or a square window are averaged.
+        :param utm_coordinates: array of shape (N, 2) of utm coordinates (north, east)
+        :type utm_coordinates: numpy.ndarray
+        :param interpolation_distance: distance around every coordinate in m to
+        look for points
+        :type interpolation_distance: float
+        :param workers: number of threads the coordinates are distributed to,
+        -1 uses all cpu cores
+        :type workers: int
+        :return: array of shape (N,) of average elevation of points around the
+        coordinates, nan where no point was found
+        :rtype: numpy.ndarray
+        """
+        sums, counts = self.get_elevation_sums(utm_coordinates, interpolation_distance, workers)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return sums / counts
 
     def get_height(self, utm_coordinate, interpolation_distance):
         """
@@ -55,8 +455,4 @@ class DEM:
         look for points
         :return: average elevation of points around the given coordinate
         """
-        indices = self._kdtree.query_ball_point(utm_coordinate, interpolation_distance)
-        close_points = [self._coord_ele_data[index] for index in indices]
-        elevations = [point[2] for point in close_points]
-        return np.average(elevations)
-
+        return self.get_heights(np.array([utm_coordinate]), interpolation_distance, workers=1)[0]
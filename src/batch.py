@@ -0,0 +1,230 @@
+import csv
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from geoelectricalSurveyTools.src.conversion import convertmod2vtk
+from geoelectricalSurveyTools.src.DEMCache import DEMCache
+from geoelectricalSurveyTools.src.DEMMosaic import DEFAULT_CACHE_BYTES, DEMMosaic, is_dem_source
+from geoelectricalSurveyTools.src.incremental import conversion_key, output_manifest
+
+"""
+Conversion of many .mod files listed in a manifest on a pool of processes.
+With a DEMCache every DEM raster is copied into the cache once by the main
+process. The workers memory map it from there instead of reading the raster
+again or receiving a pickled copy with every task, so all workers share the
+pages of the raster through the page cache. With 'box' interpolation the
+summed-area table of the raster is computed once as well and shared the same
+way. Without a cache nothing is copied, every profile reads only the corridor
+of its line from the raster.
+
+A manifest is a CSV file with the columns
+    output, mod, start_north, start_east, end_north, end_east, topo, via
+or a JSON file with a list of objects with the keys
+    output, mod, start, end, topo, via
+topo and via are optional. via holds the bends of the line between start and
+end point, in a CSV file as 'north east' pairs separated by ';'. Relative
+filepaths are relative to the directory of the manifest. mod may be a glob
+pattern, then output is formatted with the name of every matching .mod file
+without its ending as stem, such as 'vtk/{stem}.vtk'.
+"""
+
+# model of every DEM source opened by the current worker process
+_worker_dems = {}
+# cache and size of tile cache used by the current worker process, set by _init_worker
+_worker_dem_cache = None
+_worker_tile_cache_bytes = DEFAULT_CACHE_BYTES
+
+
+def _coordinate(value):
+    """Return a coordinate pair from a list or a 'north east' string, None for an empty value"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.split()
+    return [float(coordinate) for coordinate in value]
+
+
+def _manifest_path(path, directory):
+    if path is None or path == '':
+        return None
+    return os.path.join(directory, path)
+
+
+def read_manifest(manifest_file):
+    """
+    Read the profiles to convert from a CSV or JSON manifest
+    :param manifest_file: filepath of the manifest, JSON if it ends with .json
+    :type manifest_file: str
+    :return: one dict per profile with the keys output, mod, start, end, topo and via
+    :rtype: list of dict
+    """
+    directory = os.path.dirname(os.path.abspath(manifest_file))
+    with open(manifest_file, newline='') as manifest:
+        if manifest_file.lower().endswith('.json'):
+            rows = json.load(manifest)
+        else:
+            rows = []
+            for row in csv.DictReader(manifest):
+                row['start'] = [row.pop('start_north', None), row.pop('start_east', None)]
+                row['end'] = [row.pop('end_north', None), row.pop('end_east', None)]
+                if None in row['start'] or '' in row['start']:
+                    row['start'] = None
+                if None in row['end'] or '' in row['end']:
+                    row['end'] = None
+                row['via'] = [pair for pair in (row.get('via') or '').split(';') if pair.strip()]
+                rows.append(row)
+    return [{'output': _manifest_path(row['output'], directory),
+             'mod': _manifest_path(row['mod'], directory),
+             'start': _coordinate(row.get('start')),
+             'end': _coordinate(row.get('end')),
+             'topo': _manifest_path(row.get('topo'), directory),
+             'via': [_coordinate(pair) for pair in row.get('via') or []]}
+            for row in rows]
+
+
+def expand_profiles(profiles):
+    """
+    Replace every profile whose mod file is a glob pattern by a profile for
+    every matching .mod file, see read_manifest
+    :rtype: list of dict
+    """
+    expanded = []
+    for profile in profiles:
+        if not glob.has_magic(profile['mod']):
+            expanded.append(profile)
+            continue
+        for mod_file in sorted(glob.glob(profile['mod'])):
+            stem = os.path.splitext(os.path.basename(mod_file))[0]
+            expanded.append(dict(profile, mod=mod_file, output=profile['output'].format(stem=stem)))
+    return expanded
+
+
+def _init_worker(cache_dir, max_bytes, tile_cache_bytes):
+    global _worker_dem_cache, _worker_tile_cache_bytes
+    _worker_dem_cache = DEMCache(cache_dir, max_bytes) if cache_dir is not None else None
+    _worker_tile_cache_bytes = tile_cache_bytes
+    _worker_dems.clear()
+
+
+def _open_shared_dem(source, interpolation):
+    """
+    Return the model of a DEM source, memory mapped from the cache and opened
+    once per process. Without a cache a single raster is returned unchanged,
+    so that only the corridor of the profile is read from it.
+    """
+    if source not in _worker_dems:
+        if os.path.isdir(source) or source.lower().endswith('.vrt'):
+            _worker_dems[source] = DEMMosaic(source, interpolation, cache_bytes=_worker_tile_cache_bytes,
+                                             dem_cache=_worker_dem_cache)
+        elif _worker_dem_cache is not None:
+            _worker_dems[source] = _worker_dem_cache.open(source, interpolation)
+        else:
+            return source
+    return _worker_dems[source]
+
+
+def _convert_profile(profile, options):
+    """
+    Convert a single profile of a manifest
+    :return: None on success, otherwise the error message
+    :rtype: str
+    """
+    try:
+        topo = profile['topo']
+        if topo is not None and is_dem_source(topo):
+            topo = _open_shared_dem(topo, options.get('interpolation', 'ball'))
+        convertmod2vtk(profile['output'], profile['mod'], profile['start'], profile['end'], topo,
+                       via_points=profile['via'], **options)
+    except Exception as error:
+        return '{}: {}'.format(type(error).__name__, error)
+    return None
+
+
+def convert_batch(profiles, workers=None, dem_cache=None, tile_cache_bytes=DEFAULT_CACHE_BYTES, progress=None,
+                  incremental=False, **options):
+    """
+    Convert many profiles on a pool of processes. A failing profile does not
+    abort the batch, its error is returned instead.
+    :param profiles: profiles to convert, see read_manifest
+    :type profiles: list of dict
+    :param workers: number of processes, defaults to the number of CPUs. With
+    one worker the profiles are converted in the current process.
+    :type workers: int
+    :param dem_cache: cache through which DEM rasters are shared with the
+    workers. If None, every profile reads the corridor of its line from the
+    raster, which avoids copying the whole raster for a few profiles.
+    :type dem_cache: DEMCache
+    :param tile_cache_bytes: size limit of the cache of decoded tiles of a mosaic per worker
+    :param progress: called with the index of a profile and its error or None once it is converted
+    :type progress: callable
+    :param incremental: skip profiles whose output is up to date according to
+    the manifest in its directory and record the converted profiles there, see
+    src.incremental. progress is not called for skipped profiles.
+    :type incremental: bool
+    :param options: further arguments of convertmod2vtk such as output_format
+    :return: error message of every profile, None for converted profiles
+    :rtype: list
+    """
+    errors = [None] * len(profiles)
+    keys = {}
+    if incremental:
+        for index, profile in enumerate(profiles):
+            try:
+                key = conversion_key(profile['mod'], profile['start'], profile['end'], profile['topo'],
+                                     profile['via'], **options)
+            except OSError as error:
+                errors[index] = '{}: {}'.format(type(error).__name__, error)
+                if progress is not None:
+                    progress(index, errors[index])
+                continue
+            if not output_manifest(profile['output']).is_up_to_date(profile['output'], key):
+                keys[index] = key
+        pending = sorted(keys)
+    else:
+        pending = list(range(len(profiles)))
+    if not pending:
+        return errors
+    initargs = (None, None, tile_cache_bytes)
+    if dem_cache is not None:
+        # copy every single raster and its box tables into the cache once, before any worker needs them
+        for source in {profiles[index]['topo'] for index in pending if profiles[index]['topo'] is not None}:
+            if is_dem_source(source) and os.path.isfile(source) and not source.lower().endswith('.vrt'):
+                try:
+                    dem_cache.open(source, options.get('interpolation', 'ball'))
+                except Exception:
+                    # reported by the profiles using the raster
+                    pass
+        initargs = (dem_cache.cache_dir, dem_cache.max_bytes, tile_cache_bytes)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(*initargs)
+        for index in pending:
+            errors[index] = _convert_profile(profiles[index], options)
+            if progress is not None:
+                progress(index, errors[index])
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as executor:
+            futures = {executor.submit(_convert_profile, profiles[index], options): index for index in pending}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    errors[index] = future.result()
+                except Exception as error:
+                    # worker process died
+                    errors[index] = '{}: {}'.format(type(error).__name__, error)
+                if progress is not None:
+                    progress(index, errors[index])
+    if incremental:
+        # manifests are only written by this process, workers would overwrite each other's records
+        manifests = {}
+        for index in pending:
+            if errors[index] is None:
+                output = profiles[index]['output']
+                directory = os.path.dirname(os.path.abspath(output))
+                if directory not in manifests:
+                    manifests[directory] = output_manifest(output)
+                manifests[directory].record(output, keys[index])
+        for manifest in manifests.values():
+            manifest.save()
+    return errors
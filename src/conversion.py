@@ -1,11 +1,14 @@
-import itertools
 import os
-from math import atan2, cos, sin
+import numpy as np
 from geoelectricalSurveyTools.src.io.read import read_mod_file
-from geoelectricalSurveyTools.src.io.write import write_vtk_file
+from geoelectricalSurveyTools.src.io.write import write_mesh_file, write_structured_mesh_file
 from geoelectricalSurveyTools.src.utils import get_file_ending
 from geoelectricalSurveyTools.src.point import Point3D
-from geoelectricalSurveyTools.src.geometry import topography_from_dem, topography_from_ohm, create_geometry
+from geoelectricalSurveyTools.src.mesh import Mesh
+from geoelectricalSurveyTools.src.projection import ProfileLine
+from geoelectricalSurveyTools.src.geometry import Topography, topography_from_dem, topography_from_ohm, create_geometry
+from geoelectricalSurveyTools.src.DEMMosaic import is_dem_source
+from geoelectricalSurveyTools.src.profiling import NULL_PROFILER
 
 
 def convert_relative_to_utm(startpoint, endpoint, relative_distance):
@@ -17,21 +20,22 @@ def convert_relative_to_utm(startpoint, endpoint, relative_distance):
     :param endpoint: UTM coordinate (m) of end point
     :type endpoint: Point3D
     :param relative_distance: Spacing from start point along the line to endpoint at which a new UTM coordinate
-    should be calculated
-    :type relative_distance: float
+    should be calculated. If an array of spacings is given, all of them are converted at once.
+    :type relative_distance: float or numpy.ndarray
     :return: UTM coordinate Point which is at the distance relative_distance from startpoint. New UTM coordinate is
-    interpolated.
-    :rtype: Point3D
+    interpolated. For an array of spacings an array of shape (N, 3) of UTM coordinates is returned.
+    :rtype: Point3D or numpy.ndarray
     """
-    # TODO benutze Geradengleichung
-    connecting_vector = endpoint - startpoint
-    angle_radians = atan2(connecting_vector.y, connecting_vector.x)
-    dx = cos(angle_radians) * relative_distance
-    dy = sin(angle_radians) * relative_distance
-    return Point3D(startpoint.x + dx, startpoint.y + dy, startpoint.z)
+    line = ProfileLine([startpoint.get_horizontal_coordinate_pair(), endpoint.get_horizontal_coordinate_pair()])
+    utm_coordinates = line.to_utm(relative_distance)
+    if isinstance(relative_distance, np.ndarray):
+        return np.column_stack((utm_coordinates, np.full(len(utm_coordinates), startpoint.z)))
+    return Point3D(*utm_coordinates[0].tolist(), startpoint.z)
 
 
-def convertmod2vtk(out_file, inp_file, start_point, end_point, topo_file=None):
+def convertmod2vtk(out_file, inp_file, start_point, end_point, topo_file=None, interpolation='ball',
+                   via_points=None, output_format='ascii', vtu_encoding='raw', compress=False, structured=False,
+                   topography_mode='nearest', profiler=None):
     """
 
     :param out_file: Filepath/filename of vtk file to write
@@ -43,40 +47,124 @@ def convertmod2vtk(out_file, inp_file, start_point, end_point, topo_file=None):
     :param start_point: coordinates of start point in UTM
     :type start_point: list of two values, x and y/north and east coordinate
     :param topo_file: File from which topography should be read. Either a .tif
-    containing a dem model or an ohm file with topography
+    containing a dem model, a directory, list or .vrt of dem tiles, an already
+    opened dem model, an ohm file with topography or its Topography
     :type topo_file: str
+    :param interpolation: How elevation is interpolated from a dem model, 'ball'
+    averages all points within a circle, 'box' all pixels within a square around a point
+    :type interpolation: str
+    :param via_points: coordinates in UTM of bends of the line between start and end point
+    :type via_points: list of lists of two values, x and y/north and east coordinate
+    :param output_format: 'ascii' or 'binary' legacy vtk file or 'vtu' for a XML vtk file
+    :type output_format: str
+    :param vtu_encoding: 'raw' or 'base64' encoding of the data in a .vtu file
+    :type vtu_encoding: str
+    :param compress: compress the data in a .vtu file with zlib
+    :type compress: bool
+    :param structured: write a structured grid if the cells of the .mod file
+    form a rectilinear grid, a .vts file instead of a .vtu file for output
+    format 'vtu'. Other meshes are written as unstructured grid.
+    :type structured: bool
+    :param topography_mode: how the height is interpolated between the topography
+    points of an ohm file, 'nearest', 'linear' or 'pchip'
+    :type topography_mode: str
+    :param profiler: records time and memory of every stage of the conversion
+    and the numbers of points, cells and DEM pixels, see src.profiling
+    :type profiler: Profiler
     """
-    x_coordinate_pair, z_coordinate_pair, rho, coverage = read_mod_file(inp_file)
+    profiler = profiler or NULL_PROFILER
+    mesh = convertmod2mesh(inp_file, start_point, end_point, topo_file, interpolation, via_points, structured,
+                           topography_mode, profiler)
+    with profiler.stage('write'):
+        write_converted_mesh(out_file, os.path.split(inp_file)[1], mesh, output_format, vtu_encoding, compress)
 
-    # create list of grid cells from grid points
-    points, cells = create_geometry(x_coordinate_pair, z_coordinate_pair)
 
-    # convert coordinates from list to Point3D object
+def convertmod2mesh(mod, start_point=None, end_point=None, topo_file=None, interpolation='ball', via_points=None,
+                    structured=False, topography_mode='nearest', profiler=None):
+    """
+    Convert a .mod model in memory without writing a file. Opened topography
+    can be passed to convert many models without reading it again.
+    :param mod: filepath of a .mod file, an opened text stream of one or the
+    arrays x, z, rho, coverage as returned by read_mod_file
+    :type mod: str or file or tuple of numpy.ndarray
+    :param topo_file: topography source as for convertmod2vtk, or a Topography
+    read from an ohm file, see src.geometry
+    For the other arguments see convertmod2vtk.
+    :return: mesh with cell data rho and coverage, see Mesh.to_vtk to hand it
+    to VTK without a file
+    :rtype: Mesh
+    """
+    profiler = profiler or NULL_PROFILER
+    if isinstance(mod, tuple):
+        x_coordinate_pair, z_coordinate_pair, rho, coverage = (np.asarray(values, dtype=np.float64) for values in mod)
+    else:
+        with profiler.stage('read_mod_file'):
+            x_coordinate_pair, z_coordinate_pair, rho, coverage = read_mod_file(mod)
+    mesh = build_mesh(x_coordinate_pair, z_coordinate_pair, start_point, end_point, topo_file, interpolation,
+                      via_points, structured, topography_mode, profiler)
+    mesh.cell_data = {'rho': rho, 'coverage': coverage}
+    return mesh
+
+
+def build_mesh(x_coordinate_pair, z_coordinate_pair, start_point, end_point, topo_file=None, interpolation='ball',
+               via_points=None, structured=False, topography_mode='nearest', profiler=None):
+    """
+    Create the mesh of the cells of a .mod file and add topography, see
+    convertmod2vtk for the arguments
+    :param x_coordinate_pair: array of shape (N, 2) of x1, x2 coordinate pairs of every cell
+    :param z_coordinate_pair: array of shape (N, 2) of z1, z2 coordinate pairs of every cell
+    :return: mesh without cell data, in UTM coordinates if topography was added
+    :rtype: Mesh
+    """
+    profiler = profiler or NULL_PROFILER
+    # create array of grid cells from grid points
+    with profiler.stage('create_geometry'):
+        mesh = Mesh(*create_geometry(x_coordinate_pair, z_coordinate_pair))
+    profiler.count('points', mesh.num_points)
+    profiler.count('cells', mesh.num_cells)
+    points = mesh.points
+    if structured:
+        # layout has to be found from the relative coordinates
+        with profiler.stage('grid_layout'):
+            mesh.find_grid_layout()
+
     if start_point is None or end_point is None:
         start_point = [x_coordinate_pair[0][1], 0.]
         end_point = [x_coordinate_pair[-1][0], 0.]
-    # set height zo zero
-    start_point.append(0.0)
-    end_point.append(0.0)
-    startpoint = Point3D(*start_point)
-    endpoint = Point3D(*end_point)
+        via_points = None
+    # direction of all segments of the line is computed once for all points
+    line = ProfileLine([start_point] + list(via_points or []) + [end_point])
 
     # read elevation from dem model or ohm file and set points z coordinate
     if topo_file is not None:
-        if get_file_ending(topo_file) == "tif":
+        if not isinstance(topo_file, Topography) and is_dem_source(topo_file):
             # tif file needs coordinates in utm, convert first
             # convert relative coordinates to UTM
-            for point in points:
-                point.x, point.y, _ = convert_relative_to_utm(startpoint, endpoint, point.x)
-                # update elevation
-            points = topography_from_dem(topo_file, points)
-        elif get_file_ending(topo_file) == "ohm":
+            with profiler.stage('projection'):
+                points[:, :2] = line.to_utm(points[:, 0])
+            # update elevation
+            topography_from_dem(topo_file, points, interpolation, profiler)
+        elif isinstance(topo_file, Topography) or get_file_ending(topo_file) == "ohm":
             # ohm file has elevation in relative coordinates, read topography first, then convert to UTM
-            points = topography_from_ohm(topo_file, points)
+            with profiler.stage('topography'):
+                topography_from_ohm(topo_file, points, topography_mode)
             # convert relative coordinates to UTM
-            for point in points:
-                point.x, point.y, _ = convert_relative_to_utm(startpoint, endpoint, point.x)
+            with profiler.stage('projection'):
+                points[:, :2] = line.to_utm(points[:, 0])
         else:
             raise Exception("Wrong topography file given!")
+    return mesh
+
 
-    write_vtk_file(out_file, os.path.split(inp_file)[1], points, cells, rho, coverage)
\ No newline at end of file
+def write_converted_mesh(out_file, title, mesh, output_format='ascii', vtu_encoding='raw', compress=False):
+    """
+    Write a mesh and its cell data, as structured grid if its grid layout is
+    known, see convertmod2vtk for the arguments
+    :type mesh: Mesh
+    """
+    if mesh.grid_layout is not None:
+        write_structured_mesh_file(out_file, title, mesh.structured_points(), mesh.grid_layout.dimensions,
+                                   mesh.structured_cell_data(), output_format, vtu_encoding, compress)
+    else:
+        write_mesh_file(out_file, title, mesh.points, mesh.cells, mesh.cell_data, output_format, vtu_encoding,
+                        compress)
@@ -1,60 +1,160 @@
-import itertools
-from geoelectricalSurveyTools.src.point import Point3D
-from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
-from geoelectricalSurveyTools.src.utils import distance
+import numpy as np
+from geoelectricalSurveyTools.src.DEMMosaic import open_dem
+from geoelectricalSurveyTools.src.profiling import NULL_PROFILER
+from geoelectricalSurveyTools.src.utils import node_spacing
 from geoelectricalSurveyTools.src.io.read import read_ohm_file
 
+# modes of interpolating the topography of an ohm file
+TOPOGRAPHY_MODES = ('nearest', 'linear', 'pchip')
+
 
 def create_geometry(x_coordinate_pair, z_coordinate_pair):
     """
-    Create list of unique points and list of cells from those points
+    Create array of unique points and array of cells from those points.
+    Points are numbered in the order in which they first appear as corner of a
+    cell, duplicates are merged by sorting instead of searching the list of
+    points for every corner.
     :param x_coordinate_pair: list of x1,x2 coordinate pairs
     :type x_coordinate_pair: list of floats
     :param z_coordinate_pair: list of z1,z2 coordinate pairs
     :type z_coordinate_pair: list of floats
     :return:
-    points: list of unique points built from all four combinations
-    cells: list of cells built by these points. A cell is a list that saves the indices of its edges in the points list.
-    """
-    points = []  # list of all unique points read from vtk file
-    cells = []  # list of lists, every sublists contains indices of points of a cell in points list
-    for x_pair, z_pair in zip(x_coordinate_pair, z_coordinate_pair):
-        cell = []  # list that holds the index of corner points of the cell
-        # loop over all x,z combinations
-        for x, z in itertools.product(x_pair, z_pair):
-            # second coordinate is y, which is the horizontal deviation perpendicular to the the straight profile
-            point = Point3D(x, 0.0, z)
-            try:
-                # successful if created point is already in list of points
-                index = points.index(point)
-            except ValueError:
-                # point is not in list of points, append it
-                index = len(points)
-                points.append(point)
-            cell.append(index)
-        # swap content of cell 2/3    WHY???
-        cell[2], cell[3] = cell[3], cell[2]
-        cells.append(cell)
+    points: array of shape (N, 3) of unique points built from all four combinations
+    cells: array of shape (M, 4) of cells built by these points. A cell holds the indices of its edges in the points array.
+    """
+    x_coordinate_pair = np.asarray(x_coordinate_pair, dtype=np.float64).reshape(-1, 2)
+    z_coordinate_pair = np.asarray(z_coordinate_pair, dtype=np.float64).reshape(-1, 2)
+    # x, z of all corners of every cell in the order of itertools.product(x_pair, z_pair)
+    corner_x = np.repeat(x_coordinate_pair, 2, axis=1).ravel()
+    corner_z = np.tile(z_coordinate_pair, 2).ravel()
+    # stable sort keeps equal corners in the order in which they appear
+    order = np.lexsort((corner_z, corner_x))
+    sorted_x = corner_x[order]
+    sorted_z = corner_z[order]
+    first_of_group = np.ones(len(order), dtype=bool)
+    first_of_group[1:] = (sorted_x[1:] != sorted_x[:-1]) | (sorted_z[1:] != sorted_z[:-1])
+    group = np.cumsum(first_of_group) - 1
+    # index of the first appearance of every unique corner
+    first_corner = order[first_of_group]
+    # number unique corners by their first appearance
+    point_index_of_group = np.empty(len(first_corner), dtype=np.int64)
+    point_index_of_group[np.argsort(first_corner)] = np.arange(len(first_corner))
+    corner_point_index = np.empty(len(order), dtype=np.int64)
+    corner_point_index[order] = point_index_of_group[group]
+    first_corner.sort()
+    # second coordinate is y, which is the horizontal deviation perpendicular to the the straight profile
+    points = np.column_stack((corner_x[first_corner], np.zeros(len(first_corner)), corner_z[first_corner]))
+    # swap content of cell 2/3    WHY???
+    cells = corner_point_index.reshape(-1, 4)[:, [0, 1, 3, 2]]
     return points, cells
 
 
-def topography_from_dem(dem_file, points):
-    """Read elevation from model and modify z coordinate of every point"""
-    dem_model = DEM(dem_file)
-    electrode_distance = distance(points[0], points[1])
-    for point in points:
-        point.z = dem_model.get_height((point.x, point.y),
-                                       electrode_distance / 2)
+def topography_from_dem(dem_file, points, interpolation='ball', profiler=None):
+    """
+    Read elevation from model and add it to the z coordinate of every point.
+    Only the part of the model around the points is read.
+    :param dem_file: raster file, directory or list of tiles or an already
+    opened model, see open_dem
+    :param points: array of shape (N, 3) of points in UTM coordinates, changed in place
+    :type points: numpy.ndarray
+    :param interpolation: interpolation mode of the DEM, 'ball' or 'box'
+    :param profiler: records opening the model and reading the heights, see src.profiling
+    :type profiler: Profiler
+    """
+    profiler = profiler or NULL_PROFILER
+    coordinates = points[:, :2]
+    electrode_distance = node_spacing(coordinates)
+    with profiler.stage('dem_construction'):
+        dem_model = open_dem(dem_file, coordinates, electrode_distance / 2, interpolation)
+    with profiler.stage('topography'):
+        points[:, 2] += dem_model.get_heights(coordinates, electrode_distance / 2)
+    profiler.count('dem_pixels', dem_model.num_pixels)
     return points
 
 
-def topography_from_ohm(ohm_file, points):
-    topo = read_ohm_file(ohm_file)
-    for point in points:
-        if point.x in topo:
-            point.z += topo[point.x]
-        else:
-            # use nearest topography point
-            point.z += topo[
-                min(topo.keys(), key=lambda k: abs(k - point.x))]
-    return points
\ No newline at end of file
+def sorted_topography(x_topo, h_topo):
+    """
+    Sort topography points by x. Of points with the same x the last one in the
+    file is kept, as a dict built from the file would do.
+    :param x_topo: relative x coordinates of the topography points
+    :param h_topo: heights of the topography points
+    :return: strictly increasing x coordinates and their heights
+    :rtype: tuple of numpy.ndarray
+    """
+    x_topo = np.asarray(x_topo, dtype=np.float64)
+    h_topo = np.asarray(h_topo, dtype=np.float64)
+    # stable sort keeps points with the same x in the order of the file
+    order = np.argsort(x_topo, kind='stable')
+    x_sorted = x_topo[order]
+    last_of_group = np.ones(len(order), dtype=bool)
+    last_of_group[:-1] = x_sorted[1:] != x_sorted[:-1]
+    return x_sorted[last_of_group], h_topo[order][last_of_group]
+
+
+def interpolate_topography(x_topo, h_topo, x, mode='nearest'):
+    """
+    Interpolate the heights of sorted topography points at many x coordinates at once
+    :param x_topo: strictly increasing x coordinates of the topography points, see sorted_topography
+    :param h_topo: heights of the topography points
+    :param x: x coordinates at which the height is interpolated
+    :type x: numpy.ndarray
+    :param mode: one of TOPOGRAPHY_MODES. 'nearest' takes the height of the
+    nearest topography point, the smaller x if two are equally near. 'linear'
+    interpolates linearly and 'pchip' with a monotone cubic spline that does not
+    overshoot between the points. Outside of the topography points the height
+    of the first or last point is used.
+    :type mode: str
+    :rtype: numpy.ndarray
+    """
+    if mode not in TOPOGRAPHY_MODES:
+        raise ValueError("Unknown topography mode {}, use one of {}".format(mode, ', '.join(TOPOGRAPHY_MODES)))
+    x = np.asarray(x, dtype=np.float64)
+    if len(x_topo) == 1:
+        return np.full(x.shape, h_topo[0])
+    if mode == 'nearest':
+        right = np.clip(np.searchsorted(x_topo, x), 1, len(x_topo) - 1)
+        left = right - 1
+        return h_topo[np.where(x_topo[right] - x < x - x_topo[left], right, left)]
+    if mode == 'linear':
+        return np.interp(x, x_topo, h_topo)
+    from scipy.interpolate import PchipInterpolator
+    return PchipInterpolator(x_topo, h_topo)(np.clip(x, x_topo[0], x_topo[-1]))
+
+
+class Topography:
+
+    def __init__(self, x_topo, h_topo):
+        """
+        Topography points of a profile in relative coordinates, sorted once so
+        that they can be used for any number of conversions
+        :param x_topo: relative x coordinates of the topography points
+        :param h_topo: heights of the topography points
+        """
+        self.x, self.h = sorted_topography(x_topo, h_topo)
+
+    @classmethod
+    def from_ohm_file(cls, ohm_file):
+        """
+        Read the topography of an ohm file
+        :param ohm_file: filepath of the ohm file or an opened text stream
+        :rtype: Topography
+        """
+        return cls(*read_ohm_file(ohm_file))
+
+    def heights(self, x, mode='nearest'):
+        """Interpolate the height at relative x coordinates, see interpolate_topography"""
+        return interpolate_topography(self.x, self.h, x, mode)
+
+
+def topography_from_ohm(ohm_file, points, mode='nearest'):
+    """
+    Read topography from ohm file and add it to the z coordinate of every point
+    :param ohm_file: filepath of the ohm file, an opened text stream or an already read Topography
+    :param points: array of shape (N, 3) of points in relative coordinates, changed in place
+    :type points: numpy.ndarray
+    :param mode: how the height is interpolated between topography points, see interpolate_topography
+    :type mode: str
+    """
+    topography = ohm_file if isinstance(ohm_file, Topography) else Topography.from_ohm_file(ohm_file)
+    points[:, 2] += topography.heights(points[:, 0], mode)
+    return points
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from geoelectricalSurveyTools.src import __version__
+from geoelectricalSurveyTools.src.conversion import convertmod2vtk
+from geoelectricalSurveyTools.src.utils import content_hash, sampled_content_hash
+
+"""
+Incremental conversion: a manifest next to the outputs records a key of
+everything an output was converted from, the content of the .mod file, the
+topography source, the coordinates of the line, the options and the version
+of the tools. An output whose key is unchanged is up to date and not
+converted again.
+"""
+
+# name of the manifest in every output directory
+MANIFEST_FILENAME = '.geoelectrical-manifest.json'
+
+
+def source_fingerprint(source):
+    """
+    Return a fingerprint of a topography source that changes when its content
+    changes. Small files are hashed completely, large rasters by their size,
+    modification time and sampled content and directories of tiles by the
+    fingerprints of all files in them.
+    :param source: filepath of a file or directory or list of filepaths
+    :rtype: str or list
+    """
+    if source is None:
+        return None
+    if isinstance(source, (list, tuple)):
+        return [source_fingerprint(filepath) for filepath in source]
+    if os.path.isdir(source):
+        return [[name, source_fingerprint(os.path.join(source, name))] for name in sorted(os.listdir(source))
+                if os.path.isfile(os.path.join(source, name))]
+    stat = os.stat(source)
+    return [stat.st_size, stat.st_mtime_ns, sampled_content_hash(source)]
+
+
+def conversion_key(inp_file, start_point, end_point, topo_file=None, via_points=None, **options):
+    """
+    Return key of a conversion, see convertmod2vtk for the arguments
+    :rtype: str
+    """
+    description = json.dumps({'version': __version__,
+                              'mod': content_hash(inp_file),
+                              'topo': source_fingerprint(topo_file),
+                              'line': [start_point, end_point, via_points],
+                              'options': options},
+                             sort_keys=True, default=float)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+class ConversionManifest:
+
+    def __init__(self, directory):
+        """
+        Keys of the outputs in a directory, read from the manifest in the directory
+        :param directory: directory of the outputs
+        :type directory: str
+        """
+        self.filepath = os.path.join(directory, MANIFEST_FILENAME)
+        try:
+            with open(self.filepath) as manifest:
+                self.keys = json.load(manifest)
+        except (OSError, ValueError):
+            self.keys = {}
+
+    def is_up_to_date(self, output, key):
+        """Return True if output exists and was converted with the given key"""
+        return os.path.isfile(output) and self.keys.get(os.path.basename(output)) == key
+
+    def record(self, output, key):
+        """Record that output was converted with the given key, call save to write the manifest"""
+        self.keys[os.path.basename(output)] = key
+
+    def save(self):
+        """Write the manifest to a temporary file that replaces the manifest once it is complete"""
+        directory = os.path.dirname(self.filepath)
+        file_descriptor, temporary_file = tempfile.mkstemp(dir=directory, prefix=MANIFEST_FILENAME, suffix='.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'w') as manifest:
+                json.dump(self.keys, manifest, indent=1, sort_keys=True)
+            os.replace(temporary_file, self.filepath)
+        except BaseException:
+            os.remove(temporary_file)
+            raise
+
+
+def output_manifest(output):
+    """Return the manifest of the directory of an output"""
+    return ConversionManifest(os.path.dirname(os.path.abspath(output)))
+
+
+def convert_if_changed(out_file, inp_file, start_point, end_point, topo_file=None, via_points=None,
+                       open_dem_model=None, profiler=None, **options):
+    """
+    Convert a .mod file with convertmod2vtk unless its output is up to date
+    :param topo_file: filepath of the topography source, which is part of the key
+    :param open_dem_model: function without arguments returning the opened
+    model of topo_file used for the conversion. It is only called if the output
+    is not up to date, so a changed raster is opened again instead of
+    converting with a stale model.
+    :type open_dem_model: callable
+    :param profiler: records the stages of the conversion, not part of the key
+    :param options: further arguments of convertmod2vtk
+    :return: True if the file was converted
+    :rtype: bool
+    """
+    key = conversion_key(inp_file, start_point, end_point, topo_file, via_points, **options)
+    manifest = output_manifest(out_file)
+    if manifest.is_up_to_date(out_file, key):
+        return False
+    topo = topo_file if open_dem_model is None else open_dem_model()
+    convertmod2vtk(out_file, inp_file, start_point, end_point, topo, via_points=via_points, profiler=profiler,
+                   **options)
+    manifest.record(out_file, key)
+    manifest.save()
+    return True
+
+
+def watch(convert, interval):
+    """
+    Poll for new or changed inputs by calling convert every interval seconds,
+    until interrupted with Ctrl+C. An error, such as reading an inversion that
+    is still being written, is reported and retried on the next poll.
+    :param convert: function converting all inputs that changed since the last call
+    :type convert: callable
+    :param interval: seconds between two calls
+    :type interval: float
+    """
+    try:
+        while True:
+            try:
+                convert()
+            except Exception as error:
+                print('{}: {}'.format(type(error).__name__, error), file=sys.stderr)
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
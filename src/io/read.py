@@ -1,41 +1,116 @@
 """Functions for reading data from files"""
 
-from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
-from geoelectricalSurveyTools.src.utils import distance
-
-
-def read_mod_file(mod_filename):
-    # read mod file
-    inp = open(mod_filename, 'r')
-    lines = inp.readlines()
-    inp.close()
-    del lines[0]  # delete header line (#x1/m	x2/m	z1/m	z2/m	rho/Ohmm coverage)
-
-    # convert list of strings to list of lists of float
-    lines = [[float(number) for number in line.split()] for line in lines]
-    # x holds x1 x2 pair of coordinates
-    x = [[line[0], line[1]] for line in lines]
-    # z holds z1 z2 pair of coordinates
-    z = [[-line[2], -line[3]] for line in lines]
-    # measured specific resistivity
-    rho = [line[4] for line in lines]
-    # coverage is how often a block was targeted during measurement. Higher coverage -> more confident result
-    coverage = [line[5] for line in lines]
-    return x, z, rho, coverage
-
-
-def read_ohm_file(ohm_filename):
-    # read ohm file
-    ohm = open(ohm_filename, 'r')
-    lines = ohm.readlines()
-    ohm.close()
-    # remove file all lines without data
-    index = lines.index('# x h for each topo point\n')
-    lines = lines[index + 1:]
-    # num_topopoints = int(lines[index-1].split('#')[0])
-    # convert list of strings to list of lists of float
-    lines = [[float(number) for number in line.split()] for line in lines]
-    x_topo = [line[0] for line in lines]
-    z_topo = [line[1] for line in lines]
-    topo = dict(zip(x_topo, z_topo))
-    return topo
+from contextlib import contextmanager
+from itertools import islice
+import numpy as np
+
+# number of lines parsed at once when streaming a file
+DEFAULT_CHUNK_ROWS = 2 ** 16
+# header line of the topography block of an ohm file
+OHM_TOPO_HEADER = '# x h for each topo point'
+
+
+@contextmanager
+def _text_input(source):
+    """
+    Open source for reading text. source is a filename or an already opened
+    text stream such as sys.stdin or io.StringIO, which is left open.
+    """
+    if hasattr(source, 'read'):
+        yield source
+    else:
+        with open(source, 'r') as inp:
+            yield inp
+
+
+def _source_name(source):
+    """Return name of a file or stream for error messages"""
+    return getattr(source, 'name', source)
+
+
+def _parse_rows(lines, num_columns, filename):
+    """
+    Parse whitespace separated numbers of lines into an array of shape
+    (N, num_columns). Blank lines are skipped.
+    """
+    fields = [line_fields for line_fields in (line.split() for line in lines) if line_fields]
+    for line_fields in fields:
+        if len(line_fields) != num_columns:
+            raise ValueError("Expected {} numbers per line in {}, got line '{}'".format(
+                num_columns, filename, ' '.join(line_fields)))
+    # every line has num_columns columns, parse them at once
+    values = np.fromstring(''.join(lines), sep=' ')
+    if values.size == len(fields) * num_columns:
+        return values.reshape(-1, num_columns)
+    # a column is not a number
+    return np.array(fields, dtype=np.float64).reshape(-1, num_columns)
+
+
+def iter_mod_file(mod_filename, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Read a .mod file in chunks of at most chunk_rows cells, so that files too
+    large to hold as text can be processed
+    :param mod_filename: Filename/filepath of .mod file or an opened text stream
+    :param chunk_rows: number of lines read at once
+    :type chunk_rows: int
+    :return: iterator of x, z, rho, coverage of the cells of every chunk, see read_mod_file
+    :rtype: iterator of tuples of numpy.ndarray
+    """
+    with _text_input(mod_filename) as inp:
+        next(inp, None)  # skip header line (#x1/m	x2/m	z1/m	z2/m	rho/Ohmm coverage)
+        while True:
+            lines = list(islice(inp, chunk_rows))
+            if not lines:
+                break
+            columns = _parse_rows(lines, 6, _source_name(mod_filename))
+            # x holds x1 x2 pair of coordinates, z holds z1 z2 pair of coordinates
+            # rho is the specific resistivity, coverage is how often a block was targeted during measurement
+            yield columns[:, 0:2], -columns[:, 2:4], columns[:, 4], columns[:, 5]
+
+
+def read_mod_file(mod_filename, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Read the cells of a .mod file
+    :param mod_filename: Filename/filepath of .mod file or an opened text stream
+    :param chunk_rows: number of lines parsed at once
+    :type chunk_rows: int
+    :return:
+    x: array of shape (N, 2) of x1, x2 coordinate pairs of every cell
+    z: array of shape (N, 2) of z1, z2 coordinate pairs, the negative depths of every cell
+    rho: array of shape (N,) of the specific resistivity of every cell
+    coverage: array of shape (N,) of how often a cell was targeted during measurement.
+    Higher coverage -> more confident result
+    :rtype: tuple of numpy.ndarray
+    """
+    chunks = list(iter_mod_file(mod_filename, chunk_rows))
+    if not chunks:
+        return np.empty((0, 2)), np.empty((0, 2)), np.empty(0), np.empty(0)
+    return tuple(np.concatenate(columns) for columns in zip(*chunks))
+
+
+def read_ohm_file(ohm_filename, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Read the topography of an ohm file. Lines are skipped until the header of
+    the topography block without keeping them.
+    :param ohm_filename: Filename/filepath of ohm file or an opened text stream
+    :param chunk_rows: number of lines parsed at once
+    :type chunk_rows: int
+    :return:
+    x: array of shape (N,) of relative x coordinates of the topography points
+    h: array of shape (N,) of the heights of the topography points
+    :rtype: tuple of numpy.ndarray
+    """
+    with _text_input(ohm_filename) as ohm:
+        for line in ohm:
+            if line.strip() == OHM_TOPO_HEADER:
+                break
+        else:
+            raise ValueError("No topography found in {}".format(_source_name(ohm_filename)))
+        chunks = [np.empty((0, 2))]
+        while True:
+            lines = list(islice(ohm, chunk_rows))
+            if not lines:
+                break
+            chunks.append(_parse_rows(lines, 2, _source_name(ohm_filename)))
+    topo = np.concatenate(chunks)
+    return topo[:, 0], topo[:, 1]
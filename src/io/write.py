@@ -1,50 +1,109 @@
 """Functions for writing data to files"""
 
+import base64
+import io
+import shutil
+import tempfile
+import zlib
+from contextlib import contextmanager
+import numpy as np
 
-def write_vtk_file(vtk_filename, input_filename, points, cells, rho, coverage):
+OUTPUT_FORMATS = ('ascii', 'binary', 'vtu')
+VTU_ENCODINGS = ('raw', 'base64')
+# vtk cell type of a quadrilateral
+VTK_QUAD = 9
+# size of the blocks that are compressed separately in a .vtu file
+_VTU_BLOCK_SIZE = 2 ** 15
+# number of rows of an array that are formatted and written at once to an ASCII file
+_ASCII_CHUNK_ROWS = 2 ** 16
+
+
+@contextmanager
+def _binary_output(target):
+    """
+    Open target for writing bytes. target is a filename or an already opened
+    stream such as sys.stdout, a pipe or io.BytesIO, which is left open.
+    :raises TypeError: if target is a text stream without a binary buffer
+    underneath, such as io.StringIO
+    """
+    if isinstance(target, io.TextIOBase):
+        if not hasattr(target, 'buffer'):
+            raise TypeError("Files are written as bytes, a binary stream such as io.BytesIO is required, "
+                            "got {}".format(type(target).__name__))
+        # write bytes to the buffer underneath a text stream
+        target.flush()
+        yield target.buffer
+    elif hasattr(target, 'write'):
+        yield target
+    else:
+        with open(target, 'wb') as out:
+            yield out
+
+
+def _write_rows(out, row_format, array):
+    """
+    Write every row of array formatted with row_format. Many rows are formatted
+    by a single % operation and written as one block.
+    """
+    for start in range(0, len(array), _ASCII_CHUNK_ROWS):
+        chunk = array[start:start + _ASCII_CHUNK_ROWS]
+        out.write((row_format * len(chunk) % tuple(chunk.ravel().tolist())).encode())
+
+
+def _write_ascii_unstructured_grid(vtk_file, title, points, cells, values, value_descriptors):
+    """Write an unstructured grid of quadrilaterals to a legacy vtk file with ASCII data"""
+    points = np.asarray(points, dtype=np.float64)
+    cells = np.asarray(cells, dtype=np.int64)
     num_points = len(points)
     num_cells = len(cells)
-    # write VTK file
-    with open(vtk_filename, 'w', newline='\n') as out:
+    with _binary_output(vtk_file) as out:
         # write header
-        out.write('# vtk DataFile Version 3.0\n')
-        out.write(input_filename + '\n')
-        out.write('ASCII\n')
-
-        out.write('DATASET UNSTRUCTURED_GRID\n')
-        out.write('POINTS {0:d} float\n'.format(num_points))
-        # write data
-        for point in points:
-            out.write(' '.join(str(x) for x in point) + '\n')
-        out.write('CELLS {0:d} {1:d}\n'.format(num_cells, num_cells * 5))
-        for cell in cells:
-            out.write('4 ' + ' '.join(str(i) for i in cell) + '\n')
-        out.write('CELL_TYPES {0:d}\n'.format(num_cells))
-        for cell in cells:
-            out.write('9\n')
-        out.write('\n')
-        out.write('CELL_DATA ' + str(num_cells) + '\n')
-        out.write('SCALARS rho float 1\n')
-        out.write('LOOKUP_TABLE default\n')
-        for value in rho:
-            out.write('{0}\n'.format(value))
-        out.write('SCALARS coverage float 1\n')
-        out.write('LOOKUP_TABLE default\n')
-        for value in coverage:
-            out.write('{0}\n'.format(value))
+        out.write('# vtk DataFile Version 3.0\n{}\nASCII\n'.format(title).encode())
+        out.write('DATASET UNSTRUCTURED_GRID\nPOINTS {0:d} float\n'.format(num_points).encode())
+        # write data, str of a float is the shortest representation that reads back to the same float
+        _write_rows(out, '%s %s %s\n', points)
+        out.write('CELLS {0:d} {1:d}\n'.format(num_cells, num_cells * 5).encode())
+        _write_rows(out, '4 %s %s %s %s\n', cells)
+        out.write('CELL_TYPES {0:d}\n'.format(num_cells).encode())
+        for start in range(0, num_cells, _ASCII_CHUNK_ROWS):
+            out.write('{}\n'.format(VTK_QUAD).encode() * min(_ASCII_CHUNK_ROWS, num_cells - start))
+        out.write(b'\n')
+        _write_ascii_cell_data(out, num_cells, values, value_descriptors)
+
+
+def _write_ascii_cell_data(out, num_cells, values, value_descriptors):
+    """Write the cell data section of a legacy vtk file with ASCII data"""
+    out.write('CELL_DATA {0:d}\n'.format(num_cells).encode())
+    for value_set, value_set_description in zip(values, value_descriptors):
+        out.write('SCALARS {} 1\nLOOKUP_TABLE default\n'.format(value_set_description).encode())
+        _write_rows(out, '%s\n', np.asarray(value_set))
+
+
+def write_vtk_file(vtk_filename, input_filename, points, cells, rho, coverage):
+    """
+    Write converted .mod file to a vtk file
+    :param vtk_filename: Filename with which to save .vtk file or a binary stream to write to
+    :type vtk_filename: str or file-like
+    :param points: array of shape (N, 3) of points
+    :param cells: array of shape (M, 4) of indices of the corners of every cell
+    :param rho: specific resistivity of every cell
+    :param coverage: coverage of every cell
+    """
+    _write_ascii_unstructured_grid(vtk_filename, input_filename, points, cells, [rho, coverage],
+                                   ['rho float', 'coverage float'])
 
 
 def write_vtk_file_general(vtk_filename, title, points, cells, values, value_descriptors):
     """
     General method to write an unstructured grid to a vtk file
-    :param vtk_filename: Filename with which to save .vtk file
-    :type vtk_filename: str
+    :param vtk_filename: Filename with which to save .vtk file or a binary stream to write to
+    :type vtk_filename: str or file-like
     :param title: Title of vtk file, 256 characters maximum
-    :param points: list of points to save in vtk file
-    :type points: list
-    :param cells: list of cells to save in vtk file. A cell is defined by the indices of its
-    four vertices in the list of points
-    :type cells: list
+    :param points: array of shape (N, 3) of points to save in vtk file
+    :type points: numpy.ndarray
+    :param cells: array of shape (M, 4) of cells to save in vtk file. A cell is defined by the indices of its
+    four vertices in the array of points
+    :type cells: numpy.ndarray
     :param values: list of lists of data. All lists will be save as their own data set
     :type values: list
     :param value_descriptors: list of data descriptors accompanying values such as 'rho float'.
@@ -52,31 +111,367 @@ def write_vtk_file_general(vtk_filename, title, points, cells, values, value_des
     :type value_descriptors: list of strings
     :rtype: None
     """
-    num_points = len(points)
+    _write_ascii_unstructured_grid(vtk_filename, title, points, cells, values, value_descriptors)
+
+
+def write_vtk_file_binary(vtk_filename, title, points, cells, cell_data):
+    """
+    Write an unstructured grid of quadrilaterals to a legacy vtk file with
+    BINARY data. Arrays are written as raw big-endian numbers, points in double
+    precision to keep UTM coordinates exact.
+    :param vtk_filename: Filename with which to save .vtk file or a binary stream to write to
+    :type vtk_filename: str or file-like
+    :param title: Title of vtk file, 256 characters maximum
+    :param points: array of shape (N, 3) of points
+    :param cells: array of shape (M, 4) of indices of the corners of every cell
+    :param cell_data: names and arrays of shape (M,) of values of every cell, such as {'rho': rho}
+    :type cell_data: dict
+    """
+    points = np.asarray(points, dtype='>f8')
+    cells = np.asarray(cells)
     num_cells = len(cells)
-    # write VTK file
-    with open(vtk_filename, 'w', newline='\n') as out:
-        # write header
-        out.write('# vtk DataFile Version 3.0\n')
-        out.write(title + '\n')
-        out.write('ASCII\n')
-
-        out.write('DATASET UNSTRUCTURED_GRID\n')
-        out.write('POINTS {0:d} float\n'.format(num_points))
-        # write data
-        for point in points:
-            out.write(' '.join(str(x) for x in point) + '\n')
-        out.write('CELLS {0:d} {1:d}\n'.format(num_cells, num_cells * 5))
-        for cell in cells:
-            out.write('4 ' + ' '.join(str(i) for i in cell) + '\n')
-        out.write('CELL_TYPES {0:d}\n'.format(num_cells))
-        for cell in cells:
-            out.write('9\n')
-        out.write('\n')
-        out.write('CELL_DATA ' + str(num_cells) + '\n')
-        for value_set, value_set_description in zip(values, value_descriptors):
-
-            out.write('SCALARS {} 1\n'.format(value_set_description))
-            out.write('LOOKUP_TABLE default\n')
-            for value in value_set:
-                out.write('{0}\n'.format(value))
+    # every cell is preceded by its number of corners
+    cell_list = np.empty((num_cells, 5), dtype='>i4')
+    cell_list[:, 0] = 4
+    cell_list[:, 1:] = cells
+    with _binary_output(vtk_filename) as out:
+        out.write('# vtk DataFile Version 3.0\n{}\nBINARY\n'.format(title).encode())
+        out.write(b'DATASET UNSTRUCTURED_GRID\n')
+        out.write('POINTS {0:d} double\n'.format(len(points)).encode())
+        out.write(points.tobytes())
+        out.write('\nCELLS {0:d} {1:d}\n'.format(num_cells, num_cells * 5).encode())
+        out.write(cell_list.tobytes())
+        out.write('\nCELL_TYPES {0:d}\n'.format(num_cells).encode())
+        out.write(np.full(num_cells, VTK_QUAD, dtype='>i4').tobytes())
+        out.write(b'\n\n')
+        _write_binary_cell_data(out, num_cells, cell_data)
+
+
+def _write_binary_cell_data(out, num_cells, cell_data):
+    """Write the cell data section of a legacy vtk file with BINARY data"""
+    out.write('CELL_DATA {0:d}\n'.format(num_cells).encode())
+    for name, values in cell_data.items():
+        out.write('SCALARS {} float 1\nLOOKUP_TABLE default\n'.format(name).encode())
+        out.write(np.asarray(values, dtype='>f4').tobytes())
+        out.write(b'\n')
+
+
+def write_vtk_structured_grid(vtk_filename, title, points, dimensions, cell_data, binary=False):
+    """
+    Write a structured grid to a legacy vtk file. Connectivity of a structured
+    grid is implicit, points and cells are numbered along the first dimension
+    first, then along the second and third.
+    :param vtk_filename: Filename with which to save .vtk file or a binary stream to write to
+    :type vtk_filename: str or file-like
+    :param title: Title of vtk file, 256 characters maximum
+    :param points: array of shape (N, 3) of points in the order of the grid
+    :param dimensions: number of points along every dimension of the grid
+    :type dimensions: tuple of three ints
+    :param cell_data: names and arrays of values of every cell in the order of the grid, such as {'rho': rho}
+    :type cell_data: dict
+    :param binary: write BINARY instead of ASCII data
+    :type binary: bool
+    """
+    points = np.asarray(points, dtype=np.float64)
+    num_cells = int(np.prod([max(dimension - 1, 1) for dimension in dimensions]))
+    with _binary_output(vtk_filename) as out:
+        out.write('# vtk DataFile Version 3.0\n{}\n{}\n'.format(title, 'BINARY' if binary else 'ASCII').encode())
+        out.write('DATASET STRUCTURED_GRID\nDIMENSIONS {0:d} {1:d} {2:d}\n'.format(*dimensions).encode())
+        if binary:
+            out.write('POINTS {0:d} double\n'.format(len(points)).encode())
+            out.write(points.astype('>f8').tobytes())
+            out.write(b'\n\n')
+            _write_binary_cell_data(out, num_cells, cell_data)
+        else:
+            out.write('POINTS {0:d} float\n'.format(len(points)).encode())
+            _write_rows(out, '%s %s %s\n', points)
+            out.write(b'\n')
+            _write_ascii_cell_data(out, num_cells, list(cell_data.values()),
+                                   ['{} float'.format(name) for name in cell_data])
+
+
+class UnstructuredGridStream:
+
+    def __init__(self, vtk_filename, title, binary=False):
+        """
+        Write many meshes one after another into a single unstructured grid in
+        a legacy vtk file, without holding more than one mesh in memory. A
+        legacy file needs the number of points and cells before each section,
+        so every section is spooled to a temporary file while meshes are
+        appended and the sections are copied together on close.
+        Use as context manager or call close.
+        :param vtk_filename: Filename with which to save .vtk file or a binary stream to write to
+        :type vtk_filename: str or file-like
+        :param title: Title of vtk file, 256 characters maximum
+        :param binary: write BINARY instead of ASCII data, see write_vtk_file_binary
+        :type binary: bool
+        """
+        self._vtk_filename = vtk_filename
+        self._title = title
+        self._binary = binary
+        self.num_points = 0
+        self.num_cells = 0
+        self._points = tempfile.TemporaryFile()
+        self._cells = tempfile.TemporaryFile()
+        self._cell_data = {}  # name of cell data -> temporary file
+
+    def append(self, points, cells, cell_data):
+        """
+        Append a mesh. Every mesh needs the same names of cell data.
+        :param points: array of shape (N, 3) of points of the mesh
+        :param cells: array of shape (M, 4) of indices of the corners of every cell in points of this mesh
+        :param cell_data: names and arrays of shape (M,) of values of every cell, such as {'rho': rho}
+        :type cell_data: dict
+        """
+        points = np.asarray(points, dtype=np.float64)
+        cells = np.asarray(cells, dtype=np.int64) + self.num_points
+        if self.num_cells == 0 and not self._cell_data:
+            self._cell_data = {name: tempfile.TemporaryFile() for name in cell_data}
+        elif set(cell_data) != set(self._cell_data):
+            raise ValueError("Expected cell data {}, got {}".format(', '.join(self._cell_data), ', '.join(cell_data)))
+        if self._binary:
+            self._points.write(points.astype('>f8').tobytes())
+            cell_list = np.empty((len(cells), 5), dtype='>i4')
+            cell_list[:, 0] = 4
+            cell_list[:, 1:] = cells
+            self._cells.write(cell_list.tobytes())
+            for name, spool in self._cell_data.items():
+                spool.write(np.asarray(cell_data[name], dtype='>f4').tobytes())
+        else:
+            _write_rows(self._points, '%s %s %s\n', points)
+            _write_rows(self._cells, '4 %s %s %s %s\n', cells)
+            for name, spool in self._cell_data.items():
+                _write_rows(spool, '%s\n', np.asarray(cell_data[name]))
+        self.num_points += len(points)
+        self.num_cells += len(cells)
+
+    def close(self):
+        """Write the vtk file from the spooled sections"""
+        separator = b'\n' if self._binary else b''
+        with _binary_output(self._vtk_filename) as out:
+            out.write('# vtk DataFile Version 3.0\n{}\n{}\n'.format(
+                self._title, 'BINARY' if self._binary else 'ASCII').encode())
+            out.write('DATASET UNSTRUCTURED_GRID\nPOINTS {0:d} {1}\n'.format(
+                self.num_points, 'double' if self._binary else 'float').encode())
+            _copy_spool(self._points, out)
+            out.write(separator + 'CELLS {0:d} {1:d}\n'.format(self.num_cells, self.num_cells * 5).encode())
+            _copy_spool(self._cells, out)
+            out.write(separator + 'CELL_TYPES {0:d}\n'.format(self.num_cells).encode())
+            for start in range(0, self.num_cells, _ASCII_CHUNK_ROWS):
+                num_types = min(_ASCII_CHUNK_ROWS, self.num_cells - start)
+                if self._binary:
+                    out.write(np.full(num_types, VTK_QUAD, dtype='>i4').tobytes())
+                else:
+                    out.write('{}\n'.format(VTK_QUAD).encode() * num_types)
+            out.write(separator + '\nCELL_DATA {0:d}\n'.format(self.num_cells).encode())
+            for name, spool in self._cell_data.items():
+                out.write('SCALARS {} float 1\nLOOKUP_TABLE default\n'.format(name).encode())
+                _copy_spool(spool, out)
+                out.write(separator)
+        self.discard()
+
+    def discard(self):
+        """Delete the spooled sections without writing the vtk file"""
+        for spool in [self._points, self._cells] + list(self._cell_data.values()):
+            spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def _copy_spool(spool, out):
+    """Copy the content of a temporary file to out"""
+    spool.seek(0)
+    shutil.copyfileobj(spool, out, _VTU_BLOCK_SIZE * 32)
+
+
+def _encode_vtu_array(array, encoding, compress):
+    """
+    Encode an array for the appended data section of a .vtu file. The data is
+    preceded by a header giving its size, compressed data is split into blocks
+    and the header lists the compressed size of every block.
+    :rtype: bytes
+    """
+    data = np.ascontiguousarray(array).tobytes()
+    if not compress:
+        header = np.array([len(data)], dtype='<u8').tobytes()
+        if encoding == 'raw':
+            return header + data
+        return base64.b64encode(header + data)
+    blocks = [zlib.compress(data[start:start + _VTU_BLOCK_SIZE])
+              for start in range(0, len(data), _VTU_BLOCK_SIZE)]
+    last_block_size = len(data) % _VTU_BLOCK_SIZE
+    header = np.array([len(blocks), _VTU_BLOCK_SIZE, last_block_size] + [len(block) for block in blocks],
+                      dtype='<u8').tobytes()
+    if encoding == 'raw':
+        return header + b''.join(blocks)
+    # header and blocks are encoded separately
+    return base64.b64encode(header) + base64.b64encode(b''.join(blocks))
+
+
+def _write_xml_file(filename, vtk_type, piece, arrays, encoding, compress):
+    """
+    Write a VTK XML file with all arrays in the appended data section
+    :param vtk_type: type of the dataset such as 'UnstructuredGrid'
+    :param piece: function returning the lines of the dataset, it is passed a
+    function returning the DataArray element of an array given its index
+    :param arrays: names and arrays in the order of the appended data section
+    :type arrays: list of tuples
+    """
+    if encoding not in VTU_ENCODINGS:
+        raise ValueError("Unknown encoding {}, use one of {}".format(encoding, ', '.join(VTU_ENCODINGS)))
+    encoded_arrays = [_encode_vtu_array(array, encoding, compress) for _, array in arrays]
+    offsets = np.concatenate(([0], np.cumsum([len(encoded) for encoded in encoded_arrays])))
+    types = {'<f8': 'Float64', '<i8': 'Int64', '|u1': 'UInt8'}
+
+    def data_array(index, extra=''):
+        name, array = arrays[index]
+        return '<DataArray type="{}" Name="{}"{} format="appended" offset="{}"/>'.format(
+            types[array.dtype.str], name, extra, offsets[index])
+
+    compressor = ' compressor="vtkZLibDataCompressor"' if compress else ''
+    lines = ['<?xml version="1.0"?>',
+             '<VTKFile type="{}" version="1.0" byte_order="LittleEndian" '
+             'header_type="UInt64"{}>'.format(vtk_type, compressor)]
+    lines += piece(data_array)
+    lines += ['  <AppendedData encoding="{}">'.format(encoding)]
+    with _binary_output(filename) as out:
+        out.write(('\n'.join(lines) + '\n   _').encode())
+        for encoded in encoded_arrays:
+            out.write(encoded)
+        out.write(b'\n  </AppendedData>\n</VTKFile>\n')
+
+
+def write_vtu_file(vtu_filename, points, cells, cell_data, encoding='raw', compress=False):
+    """
+    Write an unstructured grid of quadrilaterals to a VTK XML .vtu file. All
+    arrays are stored in the appended data section.
+    :param vtu_filename: Filename with which to save .vtu file or a binary stream to write to
+    :type vtu_filename: str or file-like
+    :param points: array of shape (N, 3) of points
+    :param cells: array of shape (M, 4) of indices of the corners of every cell
+    :param cell_data: names and arrays of shape (M,) of values of every cell, such as {'rho': rho}
+    :type cell_data: dict
+    :param encoding: 'raw' to append the binary data as is, 'base64' to encode it as text
+    :type encoding: str
+    :param compress: compress the arrays with zlib
+    :type compress: bool
+    """
+    points = np.asarray(points, dtype='<f8')
+    cells = np.asarray(cells, dtype='<i8')
+    num_cells = len(cells)
+    arrays = [('Points', points),
+              ('connectivity', cells),
+              ('offsets', np.arange(4, 4 * num_cells + 1, 4, dtype='<i8')),
+              ('types', np.full(num_cells, VTK_QUAD, dtype='<u1'))]
+    arrays += [(name, np.asarray(values, dtype='<f8')) for name, values in cell_data.items()]
+
+    def piece(data_array):
+        lines = ['  <UnstructuredGrid>',
+                 '    <Piece NumberOfPoints="{}" NumberOfCells="{}">'.format(len(points), num_cells),
+                 '      <Points>',
+                 '        ' + data_array(0, ' NumberOfComponents="3"'),
+                 '      </Points>',
+                 '      <Cells>',
+                 '        ' + data_array(1),
+                 '        ' + data_array(2),
+                 '        ' + data_array(3),
+                 '      </Cells>',
+                 '      <CellData>']
+        lines += ['        ' + data_array(index) for index in range(4, len(arrays))]
+        return lines + ['      </CellData>',
+                        '    </Piece>',
+                        '  </UnstructuredGrid>']
+
+    _write_xml_file(vtu_filename, 'UnstructuredGrid', piece, arrays, encoding, compress)
+
+
+def write_vts_file(vts_filename, points, dimensions, cell_data, encoding='raw', compress=False):
+    """
+    Write a structured grid to a VTK XML .vts file. All arrays are stored in
+    the appended data section.
+    :param vts_filename: Filename with which to save .vts file or a binary stream to write to
+    :type vts_filename: str or file-like
+    :param points: array of shape (N, 3) of points in the order of the grid
+    :param dimensions: number of points along every dimension of the grid
+    :type dimensions: tuple of three ints
+    :param cell_data: names and arrays of values of every cell in the order of the grid, such as {'rho': rho}
+    :type cell_data: dict
+    :param encoding: 'raw' to append the binary data as is, 'base64' to encode it as text
+    :type encoding: str
+    :param compress: compress the arrays with zlib
+    :type compress: bool
+    """
+    arrays = [('Points', np.asarray(points, dtype='<f8'))]
+    arrays += [(name, np.asarray(values, dtype='<f8')) for name, values in cell_data.items()]
+    extent = ' '.join('0 {}'.format(dimension - 1) for dimension in dimensions)
+
+    def piece(data_array):
+        lines = ['  <StructuredGrid WholeExtent="{}">'.format(extent),
+                 '    <Piece Extent="{}">'.format(extent),
+                 '      <Points>',
+                 '        ' + data_array(0, ' NumberOfComponents="3"'),
+                 '      </Points>',
+                 '      <CellData>']
+        lines += ['        ' + data_array(index) for index in range(1, len(arrays))]
+        return lines + ['      </CellData>',
+                        '    </Piece>',
+                        '  </StructuredGrid>']
+
+    _write_xml_file(vts_filename, 'StructuredGrid', piece, arrays, encoding, compress)
+
+
+def write_mesh_file(filename, title, points, cells, cell_data, output_format='ascii', vtu_encoding='raw',
+                    compress=False):
+    """
+    Write an unstructured grid of quadrilaterals in one of the OUTPUT_FORMATS:
+    'ascii' and 'binary' legacy .vtk files or a XML .vtu file
+    :param filename: Filename with which to save the file or a binary stream to write to
+    :param title: Title of a legacy vtk file, not used for .vtu files
+    :param points: array of shape (N, 3) of points
+    :param cells: array of shape (M, 4) of indices of the corners of every cell
+    :param cell_data: names and arrays of shape (M,) of values of every cell, such as {'rho': rho}
+    :type cell_data: dict
+    :param output_format: one of OUTPUT_FORMATS
+    :param vtu_encoding: encoding of a .vtu file, see write_vtu_file
+    :param compress: compress a .vtu file, see write_vtu_file
+    """
+    if output_format == 'ascii':
+        write_vtk_file_general(filename, title, points, cells, list(cell_data.values()),
+                               ['{} float'.format(name) for name in cell_data])
+    elif output_format == 'binary':
+        write_vtk_file_binary(filename, title, points, cells, cell_data)
+    elif output_format == 'vtu':
+        write_vtu_file(filename, points, cells, cell_data, vtu_encoding, compress)
+    else:
+        raise ValueError("Unknown output format {}, use one of {}".format(output_format, ', '.join(OUTPUT_FORMATS)))
+
+
+def write_structured_mesh_file(filename, title, points, dimensions, cell_data, output_format='ascii',
+                               vtu_encoding='raw', compress=False):
+    """
+    Write a structured grid in one of the OUTPUT_FORMATS: 'ascii' and 'binary'
+    legacy .vtk files or, for 'vtu', a XML .vts file
+    :param filename: Filename with which to save the file or a binary stream to write to
+    :param title: Title of a legacy vtk file, not used for .vts files
+    :param points: array of shape (N, 3) of points in the order of the grid
+    :param dimensions: number of points along every dimension of the grid
+    :type dimensions: tuple of three ints
+    :param cell_data: names and arrays of values of every cell in the order of the grid, such as {'rho': rho}
+    :type cell_data: dict
+    :param output_format: one of OUTPUT_FORMATS
+    :param vtu_encoding: encoding of a .vts file, see write_vts_file
+    :param compress: compress a .vts file, see write_vts_file
+    """
+    if output_format in ('ascii', 'binary'):
+        write_vtk_structured_grid(filename, title, points, dimensions, cell_data, output_format == 'binary')
+    elif output_format == 'vtu':
+        write_vts_file(filename, points, dimensions, cell_data, vtu_encoding, compress)
+    else:
+        raise ValueError("Unknown output format {}, use one of {}".format(output_format, ', '.join(OUTPUT_FORMATS)))
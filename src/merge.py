@@ -0,0 +1,130 @@
+import os
+from xml.sax.saxutils import quoteattr
+import numpy as np
+from geoelectricalSurveyTools.src.conversion import build_mesh, write_converted_mesh
+from geoelectricalSurveyTools.src.DEMMosaic import DEFAULT_CACHE_BYTES, is_dem_source, open_dem
+from geoelectricalSurveyTools.src.io.read import read_mod_file
+from geoelectricalSurveyTools.src.io.write import UnstructuredGridStream
+from geoelectricalSurveyTools.src.utils import get_file_ending
+
+"""
+Merging of many profiles into one dataset for a whole site. Profiles are
+converted one after another and every profile is written to disk before the
+next one is read, so memory holds about one profile at a time. The dataset is
+either a .vtm multiblock file referencing one .vtu or .vts file per profile
+or a single legacy .vtk file with one unstructured grid of all profiles and a
+profile_id cell array.
+"""
+
+
+def write_vtm_file(vtm_filename, names, filenames):
+    """
+    Write a multiblock file referencing the files of all blocks
+    :param vtm_filename: Filename with which to save .vtm file
+    :param names: name of every block
+    :param filenames: filepath of every block, relative to the .vtm file
+    """
+    lines = ['<?xml version="1.0"?>',
+             '<VTKFile type="vtkMultiBlockDataSet" version="1.0" byte_order="LittleEndian" header_type="UInt64">',
+             '  <vtkMultiBlockDataSet>']
+    lines += ['    <DataSet index="{}" name={} file={}/>'.format(index, quoteattr(name), quoteattr(filename))
+              for index, (name, filename) in enumerate(zip(names, filenames))]
+    lines += ['  </vtkMultiBlockDataSet>',
+              '</VTKFile>']
+    with open(vtm_filename, 'w', newline='\n') as vtm:
+        vtm.write('\n'.join(lines) + '\n')
+
+
+def _shared_topography(source, dem_models, interpolation, cache_bytes, dem_cache):
+    """
+    Return the model of a DEM source that is shared by the profiles, opened
+    once when the first profile needs it: mosaics, whose tiles are read when a
+    profile needs them, and rasters of the cache. A single raster without
+    cache is returned unchanged and opened for every profile, reading only the
+    corridor of its line, so profiles spread over a region do not read one box
+    around all of them.
+    :param dem_models: model or error of every shared source opened so far, updated
+    :type dem_models: dict
+    :raises Exception: error of opening the source, for every profile using it
+    """
+    if source is None or not is_dem_source(source):
+        return source
+    if dem_cache is None and not os.path.isdir(source) and get_file_ending(source).lower() != 'vrt':
+        return source
+    if source not in dem_models:
+        try:
+            dem_models[source] = open_dem(source, interpolation=interpolation, cache_bytes=cache_bytes,
+                                          dem_cache=dem_cache)
+        except Exception as error:
+            dem_models[source] = error
+    if isinstance(dem_models[source], Exception):
+        raise dem_models[source]
+    return dem_models[source]
+
+
+def merge_profiles(out_file, profiles, output_format='ascii', vtu_encoding='raw', compress=False,
+                   interpolation='ball', structured=False, topography_mode='nearest',
+                   cache_bytes=DEFAULT_CACHE_BYTES, dem_cache=None, progress=None):
+    """
+    Convert many profiles into one dataset. A profile that fails is left out
+    and its error returned, the other profiles are still merged.
+    :param out_file: Filepath of a .vtm file, then the file of every profile is
+    written into a directory named after the .vtm file, or of a legacy .vtk
+    file holding a single unstructured grid of all profiles
+    :type out_file: str
+    :param profiles: profiles to merge, see src.batch.read_manifest. Their
+    outputs are not used.
+    :type profiles: list of dict
+    :param output_format: 'ascii' or 'binary' for a single .vtk file. Blocks of a
+    .vtm file are always XML files.
+    :param cache_bytes: size limit of the tile cache of a mosaic
+    :param dem_cache: on-disk cache of DEM models
+    :type dem_cache: DEMCache
+    :param progress: called with the index of a profile and its error or None once it is merged
+    :type progress: callable
+    For the other arguments see convertmod2vtk.
+    :return: error message of every profile, None for merged profiles
+    :rtype: list
+    """
+    multiblock = out_file.lower().endswith('.vtm')
+    if not multiblock and output_format not in ('ascii', 'binary'):
+        raise ValueError("A single merged grid is written as legacy vtk file, use output format ascii or binary "
+                         "or a .vtm file")
+    dem_models = {}
+    errors = [None] * len(profiles)
+    names = []
+    filenames = []
+    block_dir = os.path.splitext(out_file)[0]
+    stream = None if multiblock else UnstructuredGridStream(out_file, 'merged profiles', output_format == 'binary')
+    try:
+        for index, profile in enumerate(profiles):
+            try:
+                x_coordinate_pair, z_coordinate_pair, rho, coverage = read_mod_file(profile['mod'])
+                topo = _shared_topography(profile['topo'], dem_models, interpolation, cache_bytes, dem_cache)
+                mesh = build_mesh(x_coordinate_pair, z_coordinate_pair, profile['start'], profile['end'], topo,
+                                  interpolation, profile['via'], structured and multiblock, topography_mode)
+                mesh.cell_data = {'rho': rho, 'coverage': coverage,
+                                  'profile_id': np.full(len(rho), index, dtype=np.float64)}
+                name = os.path.splitext(os.path.basename(profile['mod']))[0]
+                if multiblock:
+                    filename = '{:03d}_{}.{}'.format(index, name, 'vts' if mesh.grid_layout is not None else 'vtu')
+                    os.makedirs(block_dir, exist_ok=True)
+                    write_converted_mesh(os.path.join(block_dir, filename), name, mesh, 'vtu', vtu_encoding,
+                                         compress)
+                    names.append(name)
+                    filenames.append(os.path.join(os.path.basename(block_dir), filename))
+                else:
+                    stream.append(mesh.points, mesh.cells, mesh.cell_data)
+            except Exception as error:
+                errors[index] = '{}: {}'.format(type(error).__name__, error)
+            if progress is not None:
+                progress(index, errors[index])
+        if multiblock:
+            write_vtm_file(out_file, names, filenames)
+        else:
+            stream.close()
+    except BaseException:
+        if stream is not None:
+            stream.discard()
+        raise
+    return errors
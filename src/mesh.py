@@ -0,0 +1,157 @@
+"""Mesh class holding the points and cells of a converted model in arrays"""
+
+import numpy as np
+from geoelectricalSurveyTools.src.point import Point3DView
+
+
+class Mesh:
+
+    def __init__(self, points, cells, cell_data=None):
+        """
+        :param points: x, y, z coordinates of all points
+        :type points: array_like of shape (N, 3)
+        :param cells: indices of the four corner points of every cell
+        :type cells: array_like of shape (M, 4)
+        :param cell_data: named arrays of shape (M,) with one value per cell
+        :type cell_data: dict
+        """
+        self.points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 3)
+        self.cells = np.ascontiguousarray(cells, dtype=np.int64).reshape(-1, 4)
+        self.cell_data = {} if cell_data is None else {name: np.asarray(values)
+                                                       for name, values in cell_data.items()}
+        # GridLayout if the cells form a rectilinear grid, see find_grid_layout
+        self.grid_layout = None
+
+    @property
+    def num_points(self):
+        return len(self.points)
+
+    @property
+    def num_cells(self):
+        return len(self.cells)
+
+    def point(self, index):
+        """
+        Return view on a single point, changing its coordinates changes the mesh
+        :rtype: Point3DView
+        """
+        return Point3DView(self.points, index)
+
+    def iter_points(self):
+        """Iterate over views on all points, see point"""
+        return (Point3DView(self.points, index) for index in range(self.num_points))
+
+    @property
+    def horizontal_coordinates(self):
+        """Array of shape (N, 2) of x, y coordinates of all points, a view on points"""
+        return self.points[:, :2]
+
+    def find_grid_layout(self):
+        """
+        Detect whether the cells form a rectilinear grid of columns and layers.
+        The layout only depends on the connectivity, so it stays valid once
+        topography is added and the grid becomes curvilinear, but it has to be
+        found while the points are still in relative coordinates.
+        :return: True if the cells form a rectilinear grid
+        :rtype: bool
+        """
+        self.grid_layout = grid_layout(self.points, self.cells)
+        return self.grid_layout is not None
+
+    def structured_points(self):
+        """Array of shape (N, 3) of the points in the order of a structured grid, see GridLayout"""
+        return self.points[self.grid_layout.point_order]
+
+    def structured_cell_data(self):
+        """Cell data with the values in the order of the cells of a structured grid, see GridLayout"""
+        return {name: np.asarray(values)[self.grid_layout.cell_order] for name, values in self.cell_data.items()}
+
+    def to_vtk(self):
+        """
+        Return the mesh and its cell data as VTK data set that can be handed to
+        VTK or ParaView without writing a file. Needs the vtk package.
+        :return: structured grid if the grid layout is known, otherwise
+        unstructured grid of quads
+        :rtype: vtk.vtkStructuredGrid or vtk.vtkUnstructuredGrid
+        """
+        import vtk
+        from vtk.util.numpy_support import numpy_to_vtk, numpy_to_vtkIdTypeArray
+        vtk_points = vtk.vtkPoints()
+        if self.grid_layout is not None:
+            grid = vtk.vtkStructuredGrid()
+            grid.SetDimensions(*self.grid_layout.dimensions)
+            vtk_points.SetData(numpy_to_vtk(self.structured_points(), deep=True))
+            cell_data = self.structured_cell_data()
+        else:
+            grid = vtk.vtkUnstructuredGrid()
+            vtk_points.SetData(numpy_to_vtk(self.points, deep=True))
+            id_dtype = 'int{}'.format(8 * vtk.vtkIdTypeArray().GetDataTypeSize())
+            # every cell starts at a multiple of 4 in the point indices of all cells
+            offsets = np.arange(0, 4 * self.num_cells + 1, 4, dtype=id_dtype)
+            vtk_cells = vtk.vtkCellArray()
+            vtk_cells.SetData(numpy_to_vtkIdTypeArray(offsets, deep=True),
+                              numpy_to_vtkIdTypeArray(self.cells.astype(id_dtype).ravel(), deep=True))
+            grid.SetCells(vtk.VTK_QUAD, vtk_cells)
+            cell_data = self.cell_data
+        grid.SetPoints(vtk_points)
+        for name, values in cell_data.items():
+            array = numpy_to_vtk(np.ascontiguousarray(values, dtype=np.float64), deep=True)
+            array.SetName(name)
+            grid.GetCellData().AddArray(array)
+        return grid
+
+
+class GridLayout:
+
+    def __init__(self, dimensions, point_order, cell_order):
+        """
+        Layout of a mesh whose cells form a grid. Points and cells of a
+        structured grid are ordered along the profile first, then downwards.
+        :param dimensions: number of points along the profile, downwards and
+        perpendicular to the profile, which is always 1
+        :type dimensions: tuple of three ints
+        :param point_order: indices of the points of the mesh in the order of the structured grid
+        :type point_order: numpy.ndarray
+        :param cell_order: indices of the cells of the mesh in the order of the structured grid
+        :type cell_order: numpy.ndarray
+        """
+        self.dimensions = dimensions
+        self.point_order = point_order
+        self.cell_order = cell_order
+
+
+def grid_layout(points, cells):
+    """
+    Find the layout of cells that form a rectilinear grid: every column has the
+    same x coordinates in every layer and every layer has the same depths in
+    every column.
+    :param points: array of shape (N, 3) of points in relative coordinates
+    :param cells: array of shape (M, 4) of indices of the corners of every cell
+    :return: layout of the grid or None if the cells do not form a grid
+    :rtype: GridLayout or None
+    """
+    x_edges = np.unique(points[:, 0])
+    z_edges = np.unique(points[:, 2])
+    num_columns = len(x_edges) - 1
+    num_layers = len(z_edges) - 1
+    if num_columns < 1 or num_layers < 1 or len(cells) != num_columns * num_layers:
+        return None
+    if len(points) != len(x_edges) * len(z_edges):
+        return None
+    # column and row of every point, rows are counted from the surface downwards
+    point_column = np.searchsorted(x_edges, points[:, 0])
+    point_row = num_layers - np.searchsorted(z_edges, points[:, 2])
+    corner_column = point_column[cells]
+    corner_row = point_row[cells]
+    column = corner_column.min(axis=1)
+    row = corner_row.min(axis=1)
+    # the four corners of a cell of the grid are the corners of one column in one layer
+    corner_position = np.sort(2 * (corner_column - column[:, None]) + corner_row - row[:, None], axis=1)
+    if (corner_position != np.arange(4)).any():
+        return None
+    cell_position = row * num_columns + column
+    if (np.bincount(cell_position, minlength=len(cells)) != 1).any():
+        return None
+    return GridLayout((num_columns + 1, num_layers + 1, 1),
+                      np.argsort(point_row * (num_columns + 1) + point_column),
+                      np.argsort(cell_position))
@@ -34,4 +34,69 @@ class Point3D:
         return Point3D(self.x - other.x, self.y - other.y, self.z - other.z)
 
     def __repr__(self):
-        return "Point3D({x}, {y}, {z})".format(x=self.x, y=self.y, z=self.z)
\ No newline at end of file
+        return "Point3D({x}, {y}, {z})".format(x=self.x, y=self.y, z=self.z)
+
+
+class Point3DView:
+
+    """
+    Light view on a single row of an array of shape (N, 3) of points. Reading
+    and writing the coordinates reads and writes the array, no coordinates are
+    copied.
+    """
+
+    __slots__ = ('_points', '_index')
+
+    def __init__(self, points, index):
+        """
+        :param points: array of shape (N, 3) of x, y, z coordinates
+        :type points: numpy.ndarray
+        :param index: row of the point in points
+        :type index: int
+        """
+        self._points = points
+        self._index = index
+
+    @property
+    def x(self):
+        return self._points[self._index, 0]
+
+    @x.setter
+    def x(self, value):
+        self._points[self._index, 0] = value
+
+    @property
+    def y(self):
+        return self._points[self._index, 1]
+
+    @y.setter
+    def y(self, value):
+        self._points[self._index, 1] = value
+
+    @property
+    def z(self):
+        return self._points[self._index, 2]
+
+    @z.setter
+    def z(self, value):
+        self._points[self._index, 2] = value
+
+    def get_horizontal_coordinate_pair(self):
+        """
+        Return horizontal coordinate pair as a list for functions that dont work with Point3D classes
+        :return: [x, y] coordinate
+        :rtype: list
+        """
+        return [self.x, self.y]
+
+    def __iter__(self):
+        return iter(self._points[self._index])
+
+    def __eq__(self, other):
+        return self.x == other.x and self.y == other.y and self.z == other.z
+
+    def __sub__(self, other):
+        return Point3D(self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __repr__(self):
+        return "Point3DView({x}, {y}, {z})".format(x=self.x, y=self.y, z=self.z)
@@ -0,0 +1,118 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows
+    resource = None
+
+"""
+Instrumentation of the stages of a conversion. A Profiler records the time,
+the peak of the memory allocated and the resident memory of every stage and
+counts such as the number of points, cells and DEM pixels. Functions take an
+optional profiler and fall back to NULL_PROFILER, which records nothing, so
+instrumented code costs a method call per stage when profiling is disabled.
+"""
+
+
+def max_rss_bytes():
+    """Return the high-water mark of the resident memory of this process, None if unknown"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes elsewhere
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+class Profiler:
+
+    def __init__(self, trace_memory=True, callback=None):
+        """
+        :param trace_memory: measure the peak of the memory allocated during
+        every stage with tracemalloc, which slows down code creating many
+        Python objects
+        :type trace_memory: bool
+        :param callback: called with the record of every stage once it ends,
+        a dict with the keys name, seconds, peak_bytes and max_rss_bytes
+        :type callback: callable
+        """
+        self.trace_memory = trace_memory
+        self.callback = callback
+        self.stages = []
+        self.counts = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measure the code run within the context as stage of the given name.
+        Memory is only traced if tracemalloc is not already running, such as
+        for a stage within another stage, otherwise peak_bytes is None.
+        """
+        trace_memory = self.trace_memory and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak_bytes = None
+            if trace_memory:
+                peak_bytes = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            record = {'name': name, 'seconds': seconds, 'peak_bytes': peak_bytes, 'max_rss_bytes': max_rss_bytes()}
+            self.stages.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    def count(self, name, value):
+        """Add value to the count of the given name, such as 'points' or 'dem_pixels'"""
+        self.counts[name] = self.counts.get(name, 0) + int(value)
+
+    def report(self):
+        """
+        :return: seconds since the profiler was created, records of all stages
+        in the order they ended, all counts and the resident memory of the process
+        :rtype: dict
+        """
+        return {'total_seconds': time.perf_counter() - self._start, 'stages': list(self.stages),
+                'counts': dict(self.counts), 'max_rss_bytes': max_rss_bytes()}
+
+    def write_report(self, filename):
+        """Write the report as JSON to a file, '-' writes it to standard output"""
+        if filename == '-':
+            json.dump(self.report(), sys.stdout, indent=2)
+            sys.stdout.write('\n')
+        else:
+            with open(filename, 'w') as report_file:
+                json.dump(self.report(), report_file, indent=2)
+
+
+class _NullStage:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+class NullProfiler:
+
+    """Profiler that records nothing, used when profiling is disabled"""
+
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def count(self, name, value):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
@@ -0,0 +1,48 @@
+"""Projection of distances along a profile line to UTM coordinates"""
+
+from math import atan2, cos, sin, hypot
+import numpy as np
+
+
+class ProfileLine:
+
+    def __init__(self, vertices):
+        """
+        Compute direction and chainage of every segment of the line once, so
+        that any number of distances can be projected without recomputing them.
+        :param vertices: UTM coordinates (north, east) of start point, bends and
+        end point of the line. A straight line only has a start and end point.
+        :type vertices: array_like of shape (K, 2), K >= 2
+        """
+        self.vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 2)
+        if len(self.vertices) < 2:
+            raise ValueError("A profile line needs at least a start and an end point")
+        start, end = self.vertices[:-1].tolist(), self.vertices[1:].tolist()
+        angles = [atan2(end_y - start_y, end_x - start_x) for (start_x, start_y), (end_x, end_y) in zip(start, end)]
+        self._cos = np.array([cos(angle) for angle in angles])
+        self._sin = np.array([sin(angle) for angle in angles])
+        lengths = [hypot(end_x - start_x, end_y - start_y) for (start_x, start_y), (end_x, end_y) in zip(start, end)]
+        # distance along the line from the start point to every vertex
+        self.chainage = np.concatenate(([0.], np.cumsum(lengths)))
+
+    @property
+    def length(self):
+        return self.chainage[-1]
+
+    def to_utm(self, relative_distances):
+        """
+        Convert distances along the line, measured from the start point, to UTM
+        coordinates. Distances before the start or after the end of the line
+        are extrapolated along the first or last segment.
+        :param relative_distances: distances along the line in m
+        :type relative_distances: float or array_like of shape (N,)
+        :return: array of shape (N, 2) of UTM coordinates
+        :rtype: numpy.ndarray
+        """
+        relative_distances = np.asarray(relative_distances, dtype=np.float64).reshape(-1)
+        # index of the segment every distance falls onto
+        segments = np.searchsorted(self.chainage[1:-1], relative_distances, side='right')
+        along_segment = relative_distances - self.chainage[segments]
+        x_coords = self.vertices[segments, 0] + self._cos[segments] * along_segment
+        y_coords = self.vertices[segments, 1] + self._sin[segments] * along_segment
+        return np.column_stack((x_coords, y_coords))
@@ -0,0 +1,162 @@
+import glob
+import os
+from itertools import islice
+import numpy as np
+
+"""
+Conversion of RES2DINV data files from the index-based format of Wenner,
+dipole-dipole and Schlumberger arrays to the general array format, see
+http://www.landviser.net/content/formatting-array-input-data-file-res2dinv-surface-electrodes-any-geometry
+The electrode positions C1, C2, P1 and P2 are computed for whole columns of
+readings at once. Readings are streamed in chunks, so files of any size can be
+converted.
+"""
+
+# array types of the index-based format
+WENNER = 1
+DIPOLE_DIPOLE = 3
+SCHLUMBERGER = 7
+ARRAY_TYPES = (WENNER, DIPOLE_DIPOLE, SCHLUMBERGER)
+# array type of the general array format
+GENERAL_ARRAY = 11
+# type of x-location of the index-based format if it is the mid-point of the array
+MID_POINT = 1
+# number of readings converted at once
+DEFAULT_CHUNK_ROWS = 2 ** 16
+
+
+def electrode_positions(array_type, x, a, n=None):
+    """
+    Compute the positions of the electrodes of many readings at once
+    :param array_type: WENNER, DIPOLE_DIPOLE or SCHLUMBERGER
+    :type array_type: int
+    :param x: position of the first electrode of every reading
+    :type x: numpy.ndarray
+    :param a: electrode spacing of every reading
+    :type a: numpy.ndarray
+    :param n: spacing factor of every reading, not used for WENNER
+    :type n: numpy.ndarray
+    :return: positions of C1, C2, P1 and P2 as array of shape (N, 4)
+    :rtype: numpy.ndarray
+    """
+    if array_type == WENNER:
+        return np.column_stack((x, x + 3 * a, x + a, x + 2 * a))
+    if array_type == DIPOLE_DIPOLE:
+        return np.column_stack((x, x + a, x + a * (n + 1), x + a * (n + 2)))
+    if array_type == SCHLUMBERGER:
+        return np.column_stack((x, x + a * (2 * n + 1), x + a * n, x + a * (n + 1)))
+    raise ValueError("Unknown array type {}, use one of {}".format(array_type, ', '.join(map(str, ARRAY_TYPES))))
+
+
+def _parse_readings(lines, num_columns):
+    """
+    Parse the first num_columns numbers of every line into an array of shape
+    (N, num_columns). Further columns such as I.P. data are not converted.
+    """
+    fields = [line.split() for line in lines]
+    line_columns = {len(line_fields) for line_fields in fields}
+    if min(line_columns) < num_columns:
+        raise ValueError("Reading has {} columns, expected at least {}".format(min(line_columns), num_columns))
+    if len(line_columns) == 1:
+        # all lines have the same number of columns, parse them at once
+        values = np.fromstring(''.join(lines), sep=' ')
+        if values.size == len(lines) * min(line_columns):
+            return values.reshape(len(lines), -1)[:, :num_columns]
+    # lines have different numbers of columns or a column is not a number
+    return np.array([line_fields[:num_columns] for line_fields in fields], dtype=np.float64)
+
+
+def _general_array_lines(array_type, readings):
+    """Format readings of the index-based format as lines of the general array format"""
+    x = readings[:, 0]
+    a = readings[:, 1]
+    if array_type == WENNER:
+        n = None
+        resistivity = readings[:, 2]
+    else:
+        n = readings[:, 2]
+        resistivity = readings[:, 3]
+    columns = np.column_stack((electrode_positions(array_type, x, a, n), resistivity))
+    row_format = '4 %.4f 0.0000 %.4f 0.0000 %.4f 0.0000 %.4f 0.0000 %.4f\r\n'
+    return row_format * len(columns) % tuple(columns.ravel().tolist())
+
+
+def convert_to_general_array(inp_file, out_file, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Convert a RES2DINV data file from the index-based to the general array
+    format. Lines of the header that are copied keep their line endings, new
+    lines end with CRLF.
+    :param inp_file: filepath of the index-based data file
+    :type inp_file: str
+    :param out_file: filepath of the general array data file to write
+    :type out_file: str
+    :param chunk_rows: number of readings converted at once
+    :type chunk_rows: int
+    """
+    with open(inp_file, 'r', newline='') as inp, open(out_file, 'w', newline='') as out:
+        # Name of survey line
+        out.write(inp.readline())
+        # Unit electrode spacing
+        out.write(inp.readline().lstrip())
+        # Array type, 1-Wenner, 3-Dipole-Dipole, 7-Schlumberger
+        array_type = int(inp.readline())
+        if array_type not in ARRAY_TYPES:
+            raise ValueError("Array type {} of {} can not be converted, use one of {}".format(
+                array_type, inp_file, ', '.join(map(str, ARRAY_TYPES))))
+        out.write('{}\r\n'.format(GENERAL_ARRAY))
+        # Array type, 0 non-specific
+        out.write('0\r\n')
+        # Header
+        out.write('Type of measurement (0=app. resistivity,1=resistance)\r\n')
+        out.write('0\r\n')  # to indicate app. resistivity
+        # Number of data points
+        num_data_line = inp.readline()
+        out.write(num_data_line.lstrip())
+        num_data = int(num_data_line)
+        # Type of x-location for data points, electrode positions are computed from the first electrode
+        if int(inp.readline()) == MID_POINT:
+            raise ValueError("x-location of the data points of {} is the mid-point of the array, only the first "
+                             "electrode is supported".format(inp_file))
+        out.write('2\r\n')  # 0-no topography, 1-true horizontal distance, 2-ground distance
+        # Flag for I.P. data, 0 for none (1 if present)
+        out.write(inp.readline())
+
+        # Data Points
+        num_columns = 3 if array_type == WENNER else 4
+        num_read = 0
+        while num_read < num_data:
+            lines = list(islice(inp, min(chunk_rows, num_data - num_read)))
+            if not lines:
+                raise ValueError("{} has {} data points, expected {}".format(inp_file, num_read, num_data))
+            readings = _parse_readings(lines, num_columns)
+            out.write(_general_array_lines(array_type, readings))
+            num_read += len(lines)
+
+        out.write('0\r\n' * 5)
+
+
+def convert_directory(inp_dir, out_dir, pattern='*.dat', chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Convert all index-based data files in a directory. A file that fails does
+    not stop the others.
+    :param inp_dir: directory of the index-based data files
+    :param out_dir: directory of the general array data files, created if it
+    does not exist. Files keep their names.
+    :param pattern: glob pattern of the data files in inp_dir
+    :param chunk_rows: number of readings converted at once
+    :return: filepath and error of every file that failed
+    :rtype: list of tuples
+    :raises ValueError: if out_dir is inp_dir, converted files would replace
+    the files they are read from
+    """
+    if os.path.realpath(out_dir) == os.path.realpath(inp_dir):
+        raise ValueError("Output directory {} is the input directory, converted files would replace the data "
+                         "files".format(out_dir))
+    os.makedirs(out_dir, exist_ok=True)
+    errors = []
+    for inp_file in sorted(glob.glob(os.path.join(inp_dir, pattern))):
+        try:
+            convert_to_general_array(inp_file, os.path.join(out_dir, os.path.basename(inp_file)), chunk_rows)
+        except (OSError, ValueError) as error:
+            errors.append((inp_file, error))
+    return errors
@@ -0,0 +1,124 @@
+import os
+from xml.sax.saxutils import quoteattr
+import numpy as np
+from geoelectricalSurveyTools.src.conversion import build_mesh, write_converted_mesh
+from geoelectricalSurveyTools.src.io.read import read_mod_file
+
+"""
+Conversion of a time-lapse series of .mod files, repeated inversions of the
+same profile that differ only in rho and coverage. The mesh is built and
+georeferenced once for all epochs. The series is written either as a ParaView
+.pvd collection of one file per epoch or as a single file with the arrays of
+all epochs.
+"""
+
+
+def read_epochs(mod_files):
+    """
+    Read the .mod files of all epochs and check that their cells are the same
+    :param mod_files: filepaths of the .mod files in the order of the epochs
+    :type mod_files: list of str
+    :return:
+    x: array of shape (M, 2) of x1, x2 coordinate pairs of every cell
+    z: array of shape (M, 2) of z1, z2 coordinate pairs of every cell
+    rho: array of shape (E, M) of the specific resistivity of every cell in every epoch
+    coverage: array of shape (E, M) of the coverage of every cell in every epoch
+    :rtype: tuple of numpy.ndarray
+    """
+    if not mod_files:
+        raise ValueError("No .mod files given")
+    x, z, first_rho, first_coverage = read_mod_file(mod_files[0])
+    rho = np.empty((len(mod_files), len(first_rho)))
+    coverage = np.empty((len(mod_files), len(first_coverage)))
+    rho[0] = first_rho
+    coverage[0] = first_coverage
+    for epoch, mod_file in enumerate(mod_files[1:], start=1):
+        epoch_x, epoch_z, rho_epoch, coverage_epoch = read_mod_file(mod_file)
+        if not (np.array_equal(epoch_x, x) and np.array_equal(epoch_z, z)):
+            raise ValueError("Cells of {} differ from cells of {}".format(mod_file, mod_files[0]))
+        rho[epoch] = rho_epoch
+        coverage[epoch] = coverage_epoch
+    return x, z, rho, coverage
+
+
+def percent_change(values, reference_epoch=0):
+    """
+    Return change of the values of every epoch relative to a reference epoch in percent
+    :param values: array of shape (E, M) of the values of every cell in every epoch
+    :type values: numpy.ndarray
+    :param reference_epoch: index of the reference epoch
+    :type reference_epoch: int
+    :return: array of shape (E, M), nan or inf where the reference value is 0
+    :rtype: numpy.ndarray
+    """
+    reference = values[reference_epoch]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (values - reference) / reference * 100.
+
+
+def write_pvd_file(pvd_filename, filenames, times):
+    """
+    Write a ParaView collection of the files of all epochs
+    :param pvd_filename: Filename with which to save .pvd file
+    :param filenames: filepaths of the files of all epochs, relative to the .pvd file
+    :param times: time of every epoch
+    """
+    lines = ['<?xml version="1.0"?>',
+             '<VTKFile type="Collection" version="0.1" byte_order="LittleEndian">',
+             '  <Collection>']
+    lines += ['    <DataSet timestep="{}" group="" part="0" file={}/>'.format(time, quoteattr(filename))
+              for time, filename in zip(times, filenames)]
+    lines += ['  </Collection>',
+              '</VTKFile>']
+    with open(pvd_filename, 'w', newline='\n') as pvd:
+        pvd.write('\n'.join(lines) + '\n')
+
+
+def convert_time_series(out_file, mod_files, start_point, end_point, topo_file=None, interpolation='ball',
+                        via_points=None, times=None, reference_epoch=0, output_format='ascii', vtu_encoding='raw',
+                        compress=False, structured=False, topography_mode='nearest'):
+    """
+    Convert a time-lapse series of .mod files of the same profile. Besides rho
+    and coverage the change of rho relative to the reference epoch in percent
+    is written as rho_change.
+    :param out_file: Filepath of a .pvd file to write a collection of one .vtu
+    file per epoch next to it, named after the .pvd file with the number of the
+    epoch appended, or of a single file holding the arrays of all epochs with
+    the number of the epoch appended to their names
+    :type out_file: str
+    :param mod_files: filepaths of the .mod files in the order of the epochs
+    :type mod_files: list of str
+    :param times: time of every epoch in the .pvd collection, defaults to the number of the epoch
+    :type times: list of floats
+    :param reference_epoch: index of the epoch relative to which the change of rho is computed
+    :type reference_epoch: int
+    :param output_format: format of a single file, see convertmod2vtk. Files
+    of a .pvd collection are always XML files.
+    For the other arguments see convertmod2vtk.
+    """
+    x_coordinate_pair, z_coordinate_pair, rho, coverage = read_epochs(mod_files)
+    if times is None:
+        times = range(len(mod_files))
+    elif len(times) != len(mod_files):
+        raise ValueError("Expected one time per epoch, got {} times for {} epochs".format(len(times), len(mod_files)))
+    rho_change = percent_change(rho, reference_epoch)
+    # geometry and topography are the same for all epochs
+    mesh = build_mesh(x_coordinate_pair, z_coordinate_pair, start_point, end_point, topo_file, interpolation,
+                      via_points, structured, topography_mode)
+    if out_file.lower().endswith('.pvd'):
+        directory, pvd_name = os.path.split(out_file)
+        ending = 'vts' if mesh.grid_layout is not None else 'vtu'
+        filenames = ['{}_{:03d}.{}'.format(os.path.splitext(pvd_name)[0], epoch, ending)
+                     for epoch in range(len(mod_files))]
+        for epoch, filename in enumerate(filenames):
+            mesh.cell_data = {'rho': rho[epoch], 'coverage': coverage[epoch], 'rho_change': rho_change[epoch]}
+            write_converted_mesh(os.path.join(directory, filename), os.path.split(mod_files[epoch])[1], mesh,
+                                 'vtu', vtu_encoding, compress)
+        write_pvd_file(out_file, filenames, times)
+    else:
+        mesh.cell_data = {}
+        for epoch in range(len(mod_files)):
+            mesh.cell_data['rho_{:03d}'.format(epoch)] = rho[epoch]
+            mesh.cell_data['coverage_{:03d}'.format(epoch)] = coverage[epoch]
+            mesh.cell_data['rho_change_{:03d}'.format(epoch)] = rho_change[epoch]
+        write_converted_mesh(out_file, os.path.split(mod_files[0])[1], mesh, output_format, vtu_encoding, compress)
@@ -1,6 +1,12 @@
 "Small utility functions"
 
+import hashlib
+import os
 from math import hypot
+import numpy as np
+
+# number of bytes at start and end of a file included in its sampled content hash
+SAMPLED_HASH_BYTES = 2 ** 20
 
 
 def get_file_ending(filepath):
@@ -23,4 +29,51 @@ def distance(point1, point2):
     :rtype: float
     """
     connecting_vector = point1 - point2
-    return hypot(connecting_vector.x, connecting_vector.y)
\ No newline at end of file
+    return hypot(connecting_vector.x, connecting_vector.y)
+
+
+def node_spacing(coordinates):
+    """
+    Return smallest nonzero distance between consecutive coordinates in xy
+    plane, which is the electrode spacing for nodes of a .mod mesh
+    :param coordinates: array of shape (N, 2) of x, y coordinates
+    :type coordinates: numpy.ndarray
+    :rtype: float
+    :raises ValueError: if all coordinates are the same point, such as for a
+    profile whose start and end point are equal
+    """
+    distances = np.hypot(*np.diff(coordinates, axis=0).T)
+    distances = distances[distances > 0]
+    if distances.size == 0:
+        raise ValueError("Node spacing is undefined, all {} coordinates are at the same point, "
+                         "check start and end point of the profile".format(len(coordinates)))
+    return distances.min()
+
+
+def content_hash(filepath):
+    """
+    Return sha256 hex digest of the whole content of a file
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(SAMPLED_HASH_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sampled_content_hash(filepath):
+    """
+    Return sha256 hex digest of the start and end of a file. Hashing a large
+    raster would take as long as reading it, so only SAMPLED_HASH_BYTES at its
+    start and end are hashed, which is all of a small file.
+    :rtype: str
+    """
+    size = os.path.getsize(filepath)
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        digest.update(file.read(SAMPLED_HASH_BYTES))
+        if size > SAMPLED_HASH_BYTES:
+            file.seek(max(size - SAMPLED_HASH_BYTES, SAMPLED_HASH_BYTES))
+            digest.update(file.read(SAMPLED_HASH_BYTES))
+    return digest.hexdigest()
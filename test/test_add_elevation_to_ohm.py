@@ -0,0 +1,89 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from geoelectricalSurveyTools.add_elevation_to_ohm import (append_height_to_ohm, append_heights_to_ohm_files,
+                                                           corridor_model_opener, expand_ohm_patterns,
+                                                           read_ohm_manifest, write_ohm_topography)
+from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
+from geoelectricalSurveyTools.src.io.read import read_ohm_file
+
+OHM_TEXT = '3 # Number of electrodes\n# x z\n0\t0\n4\t0\n8\t0\n1 # Number of data\n# a b m n rhoa\n1\t2\t3\t4\t1.5\n'
+
+
+class TestAddElevationToOhm(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        # flat model of height 100 around the line from (1000, 2000) to (1008, 2000)
+        self.dem = DEM.from_array(np.full((100, 200), 100., dtype=np.float32), (990., 0.5, 0., 2010., 0., -0.5))
+
+    def write_ohm(self, name):
+        ohm_file = os.path.join(self.directory, name)
+        with open(ohm_file, 'w') as ohm:
+            ohm.write(OHM_TEXT)
+        return ohm_file
+
+    def test_failed_write_leaves_file_untouched(self):
+        ohm_file = self.write_ohm('a.ohm')
+        with mock.patch('os.replace', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                write_ohm_topography(ohm_file, OHM_TEXT.splitlines(True), [0., 4., 8.], [1., 2., 3.])
+        with open(ohm_file) as ohm:
+            self.assertEqual(ohm.read(), OHM_TEXT)
+        self.assertEqual(os.listdir(self.directory), ['a.ohm'])
+
+    def test_bad_file_does_not_stop_others(self):
+        good_files = [self.write_ohm('a.ohm'), self.write_ohm('b.ohm')]
+        missing_file = os.path.join(self.directory, 'missing.ohm')
+        ohm_arrays = [(good_files[0], [1000., 2000.], [1008., 2000.]),
+                      (missing_file, [1000., 2000.], [1008., 2000.]),
+                      (good_files[1], [1000., 2000.], [1008., 2000.])]
+        errors = append_heights_to_ohm_files(ohm_arrays, self.dem, workers=2)
+        self.assertIsNone(errors[0])
+        self.assertIsInstance(errors[1], OSError)
+        self.assertIsNone(errors[2])
+        for ohm_file in good_files:
+            x_topo, h_topo = read_ohm_file(ohm_file)
+            np.testing.assert_array_equal(x_topo, [0., 4., 8.])
+            np.testing.assert_allclose(h_topo, 100.)
+        self.assertFalse(os.path.exists(missing_file))
+
+    def test_corridor_is_opened_once_per_line(self):
+        ohm_files = [self.write_ohm('{}.ohm'.format(name)) for name in 'abcd']
+        ohm_arrays = [(ohm_file, [1000., 2000.], [1008., 2000.]) for ohm_file in ohm_files[:3]]
+        ohm_arrays.append((ohm_files[3], [1000., 2002.], [1008., 2002.]))
+        with mock.patch('geoelectricalSurveyTools.add_elevation_to_ohm.open_dem', return_value=self.dem) as open_dem:
+            with mock.patch.object(self.dem, 'get_heights', wraps=self.dem.get_heights) as get_heights:
+                errors = append_heights_to_ohm_files(ohm_arrays, corridor_model_opener('dem.tif'))
+        self.assertEqual(errors, [None] * 4)
+        self.assertEqual(open_dem.call_count, 2)
+        self.assertEqual(get_heights.call_count, 2)
+        for ohm_file in ohm_files:
+            np.testing.assert_allclose(read_ohm_file(ohm_file)[1], 100.)
+
+    def test_single_file_raises_error(self):
+        with self.assertRaises(OSError):
+            append_height_to_ohm(os.path.join(self.directory, 'missing.ohm'), self.dem, [1000., 2000.],
+                                 [1008., 2000.])
+
+    def test_manifest_patterns_are_expanded(self):
+        os.mkdir(os.path.join(self.directory, 'ohm'))
+        ohm_files = [self.write_ohm(os.path.join('ohm', name)) for name in ('b.ohm', 'a.ohm')]
+        csv_manifest = os.path.join(self.directory, 'manifest.csv')
+        with open(csv_manifest, 'w') as manifest:
+            manifest.write('ohm,start_north,start_east,end_north,end_east\nohm/*.ohm,1000,2000,1008,2000\n')
+        json_manifest = os.path.join(self.directory, 'manifest.json')
+        with open(json_manifest, 'w') as manifest:
+            json.dump([{'ohm': 'ohm/a.ohm', 'start': [1000, 2000], 'end': [1008, 2000]}], manifest)
+        expanded = expand_ohm_patterns(read_ohm_manifest(csv_manifest))
+        self.assertEqual([ohm_file for ohm_file, _, _ in expanded], sorted(ohm_files))
+        self.assertTrue(all(start == [1000., 2000.] and end == [1008., 2000.] for _, start, end in expanded))
+        self.assertEqual(expand_ohm_patterns(read_ohm_manifest(json_manifest)),
+                         [(ohm_files[1], [1000., 2000.], [1008., 2000.])])
+
+
+if __name__ == '__main__':
+    unittest.main()
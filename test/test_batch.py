@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from geoelectricalSurveyTools.src.batch import convert_batch, read_manifest
+from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
+from geoelectricalSurveyTools.src.io.read import read_mod_file
+
+MOD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Profil1.mod')
+
+
+class TestReadManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_csv_and_json_give_same_profiles(self):
+        csv_file = os.path.join(self.directory, 'campaign.csv')
+        with open(csv_file, 'w') as manifest:
+            manifest.write('output,mod,start_north,start_east,end_north,end_east,topo,via\n'
+                           'p1.vtk,p1.mod,356933,5686395,357127,5686380,dem.tif,357000 5686400;357050 5686390\n'
+                           'p2.vtk,p2.mod,,,,,,\n')
+        json_file = os.path.join(self.directory, 'campaign.json')
+        with open(json_file, 'w') as manifest:
+            json.dump([{'output': 'p1.vtk', 'mod': 'p1.mod', 'start': [356933, 5686395], 'end': [357127, 5686380],
+                        'topo': 'dem.tif', 'via': [[357000, 5686400], [357050, 5686390]]},
+                       {'output': 'p2.vtk', 'mod': 'p2.mod'}], manifest)
+        profiles = read_manifest(csv_file)
+        self.assertEqual(profiles, read_manifest(json_file))
+        self.assertEqual(profiles[0]['mod'], os.path.join(self.directory, 'p1.mod'))
+        self.assertEqual(profiles[0]['via'], [[357000., 5686400.], [357050., 5686390.]])
+        self.assertIsNone(profiles[1]['start'])
+        self.assertIsNone(profiles[1]['topo'])
+
+
+class TestConvertBatch(unittest.TestCase):
+
+    def test_failing_profile_does_not_stop_others(self):
+        directory = tempfile.mkdtemp()
+        profiles = [{'output': os.path.join(directory, 'missing.vtk'), 'mod': os.path.join(directory, 'missing.mod'),
+                     'start': None, 'end': None, 'topo': None, 'via': []},
+                    {'output': os.path.join(directory, 'Profil1.vtk'), 'mod': MOD_FILE,
+                     'start': [356933., 5686395.], 'end': [357127., 5686380.], 'topo': None, 'via': []}]
+        reported = []
+        errors = convert_batch(profiles, workers=2, progress=lambda index, error: reported.append(index))
+        self.assertTrue(errors[0].startswith('FileNotFoundError'))
+        self.assertIsNone(errors[1])
+        self.assertEqual(sorted(reported), [0, 1])
+        self.assertFalse(os.path.exists(profiles[0]['output']))
+        with open(profiles[1]['output']) as vtk_file:
+            self.assertIn('CELLS {} '.format(len(read_mod_file(MOD_FILE)[2])), vtk_file.read())
+
+    def test_raster_is_not_copied_without_cache(self):
+        directory = tempfile.mkdtemp()
+        profile = {'output': os.path.join(directory, 'Profil1.vtk'), 'mod': MOD_FILE, 'start': [356933., 5686395.],
+                   'end': [357127., 5686380.], 'topo': os.path.join(directory, 'dem.tif'), 'via': []}
+        dem = DEM.from_array(np.full((100, 300), 150.), (356900., 1., 0., 5686420., 0., -1.))
+        with mock.patch('geoelectricalSurveyTools.src.batch.DEMCache') as dem_cache, \
+                mock.patch('geoelectricalSurveyTools.src.geometry.open_dem', return_value=dem) as open_dem:
+            self.assertEqual(convert_batch([profile], workers=1), [None])
+        dem_cache.assert_not_called()
+        # the raster is opened with the points of the profile, so only its corridor is read
+        source, line_points = open_dem.call_args[0][:2]
+        self.assertEqual(source, profile['topo'])
+        self.assertEqual(len(line_points), 52 * 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
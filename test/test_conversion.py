@@ -0,0 +1,59 @@
+import io
+import os
+import tempfile
+import unittest
+import numpy as np
+from geoelectricalSurveyTools.src.conversion import convertmod2mesh
+from geoelectricalSurveyTools.src.geometry import Topography
+from geoelectricalSurveyTools.src.io.read import read_mod_file
+
+try:
+    import vtk
+except ImportError:
+    vtk = None
+
+MOD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Profil1.mod')
+START = [356933., 5686395.]
+END = [357127., 5686380.]
+OHM_TEXT = '3 # Number of electrodes\n# x z\n0 0\n4 0\n8 0\n0 # Number of data\n# a b m n rhoa\n' \
+           '3 # Number of topo points\n# x h for each topo point\n0 140\n100 150\n200 145\n'
+
+
+class TestConvertmod2mesh(unittest.TestCase):
+
+    def test_mod_sources_give_same_mesh(self):
+        from_file = convertmod2mesh(MOD_FILE, START, END)
+        with open(MOD_FILE) as mod:
+            from_stream = convertmod2mesh(mod, START, END)
+        from_arrays = convertmod2mesh(read_mod_file(MOD_FILE), START, END)
+        for mesh in (from_stream, from_arrays):
+            np.testing.assert_array_equal(mesh.points, from_file.points)
+            np.testing.assert_array_equal(mesh.cells, from_file.cells)
+            np.testing.assert_array_equal(mesh.cell_data['rho'], from_file.cell_data['rho'])
+        self.assertEqual(from_file.num_cells, 561)
+
+    def test_topography_is_reused(self):
+        ohm_file = os.path.join(tempfile.mkdtemp(), 'Profil1.ohm')
+        with open(ohm_file, 'w') as ohm:
+            ohm.write(OHM_TEXT)
+        topography = Topography.from_ohm_file(io.StringIO(OHM_TEXT))
+        expected = convertmod2mesh(MOD_FILE, START, END, ohm_file, topography_mode='linear')
+        for _ in range(2):
+            mesh = convertmod2mesh(MOD_FILE, START, END, topography, topography_mode='linear')
+            np.testing.assert_array_equal(mesh.points, expected.points)
+        os.remove(ohm_file)
+
+    @unittest.skipIf(vtk is None, "vtk is not installed")
+    def test_to_vtk(self):
+        for structured in (False, True):
+            mesh = convertmod2mesh(MOD_FILE, START, END, structured=structured)
+            grid = mesh.to_vtk()
+            self.assertEqual(grid.GetNumberOfPoints(), mesh.num_points)
+            self.assertEqual(grid.GetNumberOfCells(), mesh.num_cells)
+            rho = grid.GetCellData().GetArray('rho')
+            self.assertAlmostEqual(sum(rho.GetValue(index) for index in range(rho.GetNumberOfTuples())),
+                                   mesh.cell_data['rho'].sum())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import sys
+import types
+import unittest
+from unittest import mock
+import numpy as np
+from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
+
+
+class TestDEM(unittest.TestCase):
+
+    """Compare height queries of the DEM against a brute force average over all pixels."""
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = (100 + rng.random((80, 90)) * 10).astype(np.float32)
+        self.transform = (1000.0, 0.5, 0.0, 2000.0, 0.0, -0.5)
+        rows, cols = np.indices(self.data.shape)
+        self.x_coords = self.transform[0] + self.transform[1] * cols
+        self.y_coords = self.transform[3] + self.transform[5] * rows
+        self.coordinates = np.column_stack((1000 + rng.random(50) * 45, 2000 - rng.random(50) * 40))
+
+    def test_ball_average(self):
+        dem = DEM.from_array(self.data, self.transform)
+        heights = dem.get_heights(self.coordinates, 1.5)
+        for (x, y), height in zip(self.coordinates, heights):
+            inside = np.hypot(self.x_coords - x, self.y_coords - y) <= 1.5
+            self.assertAlmostEqual(height, self.data[inside].mean(dtype=np.float64))
+        self.assertAlmostEqual(dem.get_height(tuple(self.coordinates[0]), 1.5), heights[0])
+
+    def test_box_average(self):
+        dem = DEM.from_array(self.data, self.transform, interpolation='box')
+        heights = dem.get_heights(self.coordinates, 2.0)
+        for (x, y), height in zip(self.coordinates, heights):
+            inside = (np.abs(self.x_coords - x) <= 2.0) & (np.abs(self.y_coords - y) <= 2.0)
+            self.assertAlmostEqual(height, self.data[inside].mean(dtype=np.float64))
+
+    def test_box_average_of_pyramid_levels(self):
+        rng = np.random.default_rng(2)
+        rows, cols = np.indices((400, 400))
+        data = (100 + 0.02 * cols + 0.01 * rows + rng.random((400, 400)) * 10).astype(np.float32)
+        x_coords = self.transform[0] + self.transform[1] * cols
+        y_coords = self.transform[3] + self.transform[5] * rows
+        coordinates = np.column_stack((1050 + rng.random(30) * 100, 1950 - rng.random(30) * 100))
+        dem = DEM.from_array(data, self.transform, interpolation='box', pyramid_levels=2)
+        self.assertEqual(dem._box_level(40.)[1], 4)
+        for radius, tolerance in ((2., 1e-6), (40., 0.2)):
+            heights = dem.get_heights(coordinates, radius)
+            expected = [data[(np.abs(x_coords - x) <= radius) & (np.abs(y_coords - y) <= radius)].mean(dtype=np.float64)
+                        for x, y in coordinates]
+            # edges of the window move by less than a 2 m pixel of level 2, which shifts the mean on this slope
+            np.testing.assert_allclose(heights, expected, rtol=0, atol=tolerance)
+
+    def test_irregular_points(self):
+        points = np.column_stack((self.x_coords.ravel(), self.y_coords.ravel()))
+        dem = DEM.from_points(points, self.data.ravel())
+        raster_dem = DEM.from_array(self.data, self.transform)
+        np.testing.assert_allclose(dem.get_heights(self.coordinates, 1.5),
+                                   raster_dem.get_heights(self.coordinates, 1.5))
+
+    def test_rotated_raster(self):
+        # pixels of 0.5 m rotated by 30 degrees
+        angle = np.radians(30.)
+        transform = (1000.0, 0.5 * np.cos(angle), 0.5 * np.sin(angle), 2000.0, 0.5 * np.sin(angle),
+                     -0.5 * np.cos(angle))
+        rows, cols = np.indices(self.data.shape)
+        x_coords = transform[0] + transform[1] * cols + transform[2] * rows
+        y_coords = transform[3] + transform[4] * cols + transform[5] * rows
+        rng = np.random.default_rng(1)
+        inner_cols, inner_rows = 10 + rng.random(20) * 70, 10 + rng.random(20) * 60
+        coordinates = np.column_stack((transform[0] + transform[1] * inner_cols + transform[2] * inner_rows,
+                                       transform[3] + transform[4] * inner_cols + transform[5] * inner_rows))
+        heights = DEM.from_array(self.data, transform).get_heights(coordinates, 1.5)
+        for (x, y), height in zip(coordinates, heights):
+            inside = np.hypot(x_coords - x, y_coords - y) <= 1.5
+            self.assertAlmostEqual(height, self.data[inside].mean(dtype=np.float64))
+
+    def test_degenerate_transform_is_point_cloud(self):
+        # rows and columns run along the same direction, pixels can not be indexed by coordinates
+        transform = (1000.0, 0.5, 0.25, 2000.0, 0.0, 0.0)
+        data = self.data[:4, :10]
+        dem = DEM.from_array(data, transform)
+        self.assertIsNotNone(dem._kdtree)
+        rows, cols = np.indices(data.shape)
+        x_coords = transform[0] + transform[1] * cols + transform[2] * rows
+        for x in (1001.1, 1002.3):
+            inside = np.abs(x_coords - x) <= 0.6
+            self.assertAlmostEqual(dem.get_height((x, 2000.0), 0.6), data[inside].mean(dtype=np.float64), places=5)
+
+    def test_outside_is_nan(self):
+        dem = DEM.from_array(self.data, self.transform)
+        self.assertTrue(np.isnan(dem.get_height((0.0, 0.0), 1.0)))
+
+
+class RecordingBand:
+
+    """Raster band recording the windows that are read"""
+
+    def __init__(self, data):
+        self.data = data
+        self.reads = []
+
+    def GetBlockSize(self):
+        return 16, 16
+
+    def ReadAsArray(self, col_start, row_start, num_cols, num_rows):
+        self.reads.append((col_start, row_start, num_cols, num_rows))
+        return self.data[row_start:row_start + num_rows, col_start:col_start + num_cols].copy()
+
+
+class TestWindowedDEM(unittest.TestCase):
+
+    def setUp(self):
+        rows, cols = np.indices((100, 200))
+        self.data = (100. + 0.1 * cols + np.sin(rows / 7.)).astype(np.float32)
+        self.transform = (1000.0, 1.0, 0.0, 2100.0, 0.0, -1.0)
+        self.band = RecordingBand(self.data)
+        dataset = mock.Mock(RasterXSize=200, RasterYSize=100)
+        dataset.GetGeoTransform.return_value = self.transform
+        dataset.GetRasterBand.return_value = self.band
+        gdal = types.ModuleType('gdal')
+        gdal.Open = lambda filepath: dataset
+        patcher = mock.patch.dict(sys.modules, {'gdal': gdal})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_corridor_is_read_and_grown_on_demand(self):
+        dem = DEM.for_corridor('dem.tif', [[1050., 2050.], [1070., 2050.]], 5.)
+        # corridor from x 1045 to 1075 and y 2045 to 2055, widened to whole blocks of 16 pixels
+        self.assertEqual(self.band.reads, [(32, 32, 48, 32)])
+        whole = DEM.from_array(self.data, self.transform)
+        inside = np.array([[1052.3, 2049.1], [1068.8, 2052.6]])
+        np.testing.assert_allclose(dem.get_heights(inside, 2.), whole.get_heights(inside, 2.))
+        self.assertEqual(len(self.band.reads), 1)
+        outside = np.array([[1150.2, 2020.7], [1060.5, 2050.5]])
+        np.testing.assert_allclose(dem.get_heights(outside, 2.), whole.get_heights(outside, 2.))
+        self.assertEqual(len(self.band.reads), 2)
+        col_start, row_start, num_cols, num_rows = self.band.reads[1]
+        # the grown window keeps the corridor
+        self.assertTrue(col_start <= 32 and 80 <= col_start + num_cols)
+        self.assertTrue(row_start <= 32 and 64 <= row_start + num_rows)
+        self.assertLess(num_cols * num_rows, self.data.size)
+
+
+if __name__ == '__main__':
+    unittest.main()
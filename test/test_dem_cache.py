@@ -0,0 +1,77 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+import numpy as np
+from geoelectricalSurveyTools.src.DEMCache import DEMCache
+from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
+
+try:
+    import gdal
+except ImportError:
+    gdal = None
+
+TRANSFORM = (1000., 0.5, 0., 2000., 0., -0.5)
+
+
+def write_raster(filename, data):
+    dataset = gdal.GetDriverByName('GTiff').Create(filename, data.shape[1], data.shape[0], 1, gdal.GDT_Float32)
+    dataset.SetGeoTransform(TRANSFORM)
+    dataset.GetRasterBand(1).WriteArray(data)
+    dataset.FlushCache()
+    del dataset
+
+
+@unittest.skipIf(gdal is None, "gdal is not installed")
+class TestDEMCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = DEMCache(os.path.join(self.directory, 'cache'))
+        self.raster = os.path.join(self.directory, 'dem.tif')
+        write_raster(self.raster, np.full((40, 50), 100., dtype=np.float32))
+
+    def test_miss_then_hit(self):
+        with mock.patch.object(DEMCache, '_store', autospec=True, side_effect=DEMCache._store) as store:
+            first = self.cache.open(self.raster)
+            second = self.cache.open(self.raster)
+        self.assertEqual(store.call_count, 1)
+        self.assertEqual(len(self.cache.entries()), 1)
+        np.testing.assert_allclose(second.get_heights([[1010., 1990.]], 1.), first.get_heights([[1010., 1990.]], 1.))
+        np.testing.assert_allclose(second.get_heights([[1010., 1990.]], 1.), 100.)
+
+    def test_changed_file_is_invalidated(self):
+        self.cache.open(self.raster)
+        # modification time has to differ even on file systems with coarse timestamps
+        time.sleep(0.01)
+        write_raster(self.raster, np.full((40, 50), 120., dtype=np.float32))
+        np.testing.assert_allclose(self.cache.open(self.raster).get_heights([[1010., 1990.]], 1.), 120.)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        other_raster = os.path.join(self.directory, 'other.tif')
+        write_raster(other_raster, np.full((40, 50), 80., dtype=np.float32))
+        self.cache.open(self.raster)
+        entry = self.cache.entries()[0]
+        self.cache.max_bytes = self.cache.size()
+        self.cache.open(other_raster)
+        entries = self.cache.entries()
+        self.assertEqual(len(entries), 1)
+        self.assertNotEqual(entries[0], entry)
+        np.testing.assert_allclose(self.cache.open(other_raster).get_heights([[1010., 1990.]], 1.), 80.)
+
+    def test_box_tables_are_stored_once(self):
+        data = np.arange(40 * 50, dtype=np.float32).reshape(40, 50)
+        write_raster(self.raster, data)
+        expected = DEM.from_array(data, TRANSFORM, 'box', 1).get_heights([[1010., 1990.], [1012.2, 1985.]], 4.)
+        with mock.patch.object(DEMCache, '_store_box_tables', autospec=True,
+                               side_effect=DEMCache._store_box_tables) as store:
+            for _ in range(2):
+                dem = self.cache.open(self.raster, 'box', 1)
+                self.assertIsInstance(dem._summed_area_table, np.memmap)
+                np.testing.assert_allclose(dem.get_heights([[1010., 1990.], [1012.2, 1985.]], 4.), expected)
+        self.assertEqual(store.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+from geoelectricalSurveyTools.src.DEMMosaic import DEMMosaic, is_dem_source, open_dem
+from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
+
+# 2x2 tiles of 20 m x 20 m with a pixel size of 1 m, A and B in the north, C and D in the south
+ORIGINS = {'A.tif': (1000., 2020.), 'B.tif': (1020., 2020.), 'C.tif': (1000., 2000.), 'D.tif': (1020., 2000.)}
+
+
+class RecordingGrid(dict):
+
+    """Grid index recording the cells that are looked up"""
+
+    def __init__(self, grid):
+        super().__init__(grid)
+        self.lookups = []
+
+    def get(self, cell, default=None):
+        self.lookups.append(cell)
+        return super().get(cell, default)
+
+
+class TestDEMMosaic(unittest.TestCase):
+
+    def setUp(self):
+        # smooth surface, so averages of neighbouring tiles differ from each tile alone
+        rows, cols = np.indices((40, 40))
+        self.data = 100. + 0.5 * cols + 0.25 * rows
+        self.tiles = {}
+        for name, (x_origin, y_origin) in ORIGINS.items():
+            row = int(2020. - y_origin)
+            col = int(x_origin - 1000.)
+            self.tiles[name] = DEM.from_array(self.data[row:row + 20, col:col + 20],
+                                              (x_origin, 1., 0., y_origin, 0., -1.))
+        patchers = [mock.patch('geoelectricalSurveyTools.src.DEMMosaic._footprint', side_effect=self.footprint),
+                    mock.patch('geoelectricalSurveyTools.src.DEMMosaic.DEM', side_effect=self.read_tile)]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.mosaic = DEMMosaic(sorted(ORIGINS))
+
+    @staticmethod
+    def footprint(filepath):
+        x_origin, y_origin = ORIGINS[os.path.basename(filepath)]
+        return x_origin, y_origin - 20., x_origin + 20., y_origin
+
+    def read_tile(self, filepath, interpolation, pyramid_levels):
+        return self.tiles[os.path.basename(filepath)]
+
+    def test_tiles_in_box(self):
+        self.assertEqual(self.mosaic._tiles_in_box((1005., 2005., 1010., 2010.)), [0])
+        self.assertEqual(self.mosaic._tiles_in_box((1025., 1985., 1030., 1990.)), [3])
+        self.assertEqual(self.mosaic._tiles_in_box((1019., 1999., 1021., 2001.)), [0, 1, 2, 3])
+        self.assertEqual(self.mosaic._tiles_in_box((1100., 2100., 1110., 2110.)), [])
+
+    def test_large_box_scans_all_tiles(self):
+        self.mosaic._grid = RecordingGrid(self.mosaic._grid)
+        self.assertEqual(self.mosaic._tiles_in_box((0., 0., 1e6, 1e6)), [0, 1, 2, 3])
+        self.assertEqual(self.mosaic._grid.lookups, [])
+        self.assertEqual(self.mosaic._tiles_in_box((1005., 2005., 1010., 2010.)), [0])
+        self.assertNotEqual(self.mosaic._grid.lookups, [])
+
+    def test_seam_averages_both_tiles(self):
+        whole = DEM.from_array(self.data, (1000., 1., 0., 2020., 0., -1.))
+        coordinates = np.array([[1020., 2010.], [1020., 2000.], [1005.3, 1985.7], [1033., 2012.5]])
+        sums, counts = self.mosaic.get_elevation_sums(coordinates[:1], 2.)
+        tile_counts = [self.tiles[name].get_elevation_sums(coordinates[:1], 2.)[1][0] for name in ('A.tif', 'B.tif')]
+        self.assertTrue(all(count > 0 for count in tile_counts))
+        self.assertEqual(counts[0], sum(tile_counts))
+        np.testing.assert_allclose(self.mosaic.get_heights(coordinates, 2.), whole.get_heights(coordinates, 2.))
+
+    def test_least_recently_used_tile_is_evicted(self):
+        self.mosaic._cache_bytes = 2 * self.tiles['A.tif'].nbytes
+        for coordinate in ([1010., 2010.], [1030., 2010.], [1010., 2010.], [1010., 1990.]):
+            self.mosaic.get_height(coordinate, 1.)
+        self.assertEqual([os.path.basename(filepath) for filepath in self.mosaic._cache], ['A.tif', 'C.tif'])
+
+    def test_open_dem_dispatch(self):
+        directory = tempfile.mkdtemp()
+        for name in list(ORIGINS) + ['notes.txt']:
+            open(os.path.join(directory, name), 'w').close()
+        mosaic = open_dem(directory)
+        self.assertIsInstance(mosaic, DEMMosaic)
+        self.assertEqual([os.path.basename(tile) for tile in mosaic._tiles], sorted(ORIGINS))
+        self.assertIsInstance(open_dem(sorted(ORIGINS)), DEMMosaic)
+        self.assertIs(open_dem(self.tiles['A.tif']), self.tiles['A.tif'])
+        dem_cache = mock.Mock()
+        self.assertIs(open_dem('A.tif', dem_cache=dem_cache, interpolation='box'), dem_cache.open.return_value)
+        dem_cache.open.assert_called_once_with('A.tif', 'box', 0)
+
+    def test_is_dem_source(self):
+        self.assertTrue(is_dem_source('dem.TIF'))
+        self.assertTrue(is_dem_source('dem.vrt'))
+        self.assertTrue(is_dem_source(tempfile.mkdtemp()))
+        self.assertTrue(is_dem_source(sorted(ORIGINS)))
+        self.assertTrue(is_dem_source(self.tiles['A.tif']))
+        self.assertFalse(is_dem_source('profile.ohm'))
+
+
+if __name__ == '__main__':
+    unittest.main()
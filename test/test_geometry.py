@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+from geoelectricalSurveyTools.src.geometry import create_geometry, interpolate_topography, sorted_topography
+from geoelectricalSurveyTools.src.mesh import grid_layout
+from geoelectricalSurveyTools.src.utils import node_spacing
+
+
+class TestCreateGeometry(unittest.TestCase):
+
+    def test_points_numbered_by_first_appearance(self):
+        # two layers of two cells each, corners are shared between neighbouring cells
+        x = [[0., 4.], [4., 8.], [0., 4.], [4., 8.]]
+        z = [[-0., -1.], [-0., -1.], [-1., -2.], [-1., -2.]]
+        points, cells = create_geometry(x, z)
+        np.testing.assert_array_equal(points, [[0., 0., 0.], [0., 0., -1.], [4., 0., 0.], [4., 0., -1.],
+                                               [8., 0., 0.], [8., 0., -1.], [0., 0., -2.], [4., 0., -2.],
+                                               [8., 0., -2.]])
+        np.testing.assert_array_equal(cells, [[0, 1, 3, 2], [2, 3, 5, 4], [1, 6, 7, 3], [3, 7, 8, 5]])
+
+
+class TestNodeSpacing(unittest.TestCase):
+
+    def test_smallest_nonzero_distance(self):
+        self.assertEqual(node_spacing(np.array([[0., 0.], [0., 0.], [3., 4.], [3., 6.]])), 2.)
+
+    def test_coincident_coordinates_raise(self):
+        for coordinates in (np.zeros((3, 2)), np.zeros((1, 2))):
+            with self.assertRaisesRegex(ValueError, 'same point'):
+                node_spacing(coordinates)
+
+
+class TestGridLayout(unittest.TestCase):
+
+    def test_rectilinear_grid(self):
+        x = [[0., 4.], [4., 8.], [0., 4.], [4., 8.]]
+        z = [[-0., -1.], [-0., -1.], [-1., -2.], [-1., -2.]]
+        points, cells = create_geometry(x, z)
+        layout = grid_layout(points, cells)
+        self.assertEqual(layout.dimensions, (3, 3, 1))
+        np.testing.assert_array_equal(points[layout.point_order][:, [0, 2]],
+                                      [[0., 0.], [4., 0.], [8., 0.], [0., -1.], [4., -1.], [8., -1.],
+                                       [0., -2.], [4., -2.], [8., -2.]])
+        np.testing.assert_array_equal(layout.cell_order, [0, 1, 2, 3])
+
+    def test_layers_of_different_depth(self):
+        x = [[0., 4.], [4., 8.], [0., 4.], [4., 8.]]
+        z = [[-0., -1.], [-0., -1.5], [-1., -2.], [-1.5, -2.]]
+        self.assertIsNone(grid_layout(*create_geometry(x, z)))
+
+
+class TestTopography(unittest.TestCase):
+
+    def test_nearest_keeps_last_duplicate_and_smaller_x_on_tie(self):
+        x_topo, h_topo = sorted_topography([4., 0., 8., 4.], [1., 0., 3., 2.])
+        np.testing.assert_array_equal(x_topo, [0., 4., 8.])
+        heights = interpolate_topography(x_topo, h_topo, np.array([-1., 2., 4., 6.5, 9.]))
+        np.testing.assert_array_equal(heights, [0., 0., 2., 3., 3.])
+
+    def test_linear(self):
+        heights = interpolate_topography(np.array([0., 4.]), np.array([0., 2.]), np.array([-1., 1., 5.]), 'linear')
+        np.testing.assert_array_equal(heights, [0., 0.5, 2.])
+
+
+if __name__ == '__main__':
+    unittest.main()
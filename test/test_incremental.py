@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+import unittest
+import numpy as np
+from geoelectricalSurveyTools.src.DigitalElevationModel import DEM
+from geoelectricalSurveyTools.src.incremental import convert_if_changed
+
+MOD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Profil1.mod')
+
+
+class TestConvertIfChanged(unittest.TestCase):
+
+    def test_up_to_date_output_is_skipped(self):
+        output = os.path.join(tempfile.mkdtemp(), 'Profil1.vtk')
+        self.assertTrue(convert_if_changed(output, MOD_FILE, [356933., 5686395.], [357127., 5686380.]))
+        self.assertFalse(convert_if_changed(output, MOD_FILE, [356933., 5686395.], [357127., 5686380.]))
+        # changed coordinates and options need a new conversion
+        self.assertTrue(convert_if_changed(output, MOD_FILE, [356933., 5686395.], [357127., 5686390.]))
+        self.assertTrue(convert_if_changed(output, MOD_FILE, [356933., 5686395.], [357127., 5686390.],
+                                           output_format='binary'))
+        os.remove(output)
+        self.assertTrue(convert_if_changed(output, MOD_FILE, [356933., 5686395.], [357127., 5686390.],
+                                           output_format='binary'))
+
+    def test_changed_raster_is_opened_again(self):
+        directory = tempfile.mkdtemp()
+        output = os.path.join(directory, 'Profil1.vtk')
+        raster = os.path.join(directory, 'dem.tif')
+        heights = [100.]
+        opened = []
+
+        def open_dem_model():
+            opened.append(heights[0])
+            return DEM.from_array(np.full((60, 260), heights[0], dtype=np.float32),
+                                  (356900., 1., 0., 5686420., 0., -1.))
+
+        def convert():
+            return convert_if_changed(output, MOD_FILE, [356933., 5686395.], [357127., 5686380.], raster,
+                                      open_dem_model=open_dem_model)
+
+        with open(raster, 'w') as raster_file:
+            raster_file.write('first')
+        self.assertTrue(convert())
+        self.assertFalse(convert())
+        with open(output, 'rb') as output_file:
+            first_output = output_file.read()
+        # modification time has to differ even on file systems with coarse timestamps
+        time.sleep(0.01)
+        heights[0] = 120.
+        with open(raster, 'w') as raster_file:
+            raster_file.write('second')
+        self.assertTrue(convert())
+        self.assertEqual(opened, [100., 120.])
+        with open(output, 'rb') as output_file:
+            self.assertNotEqual(output_file.read(), first_output)
+
+
+if __name__ == '__main__':
+    unittest.main()
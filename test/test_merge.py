@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+from unittest import mock
+from geoelectricalSurveyTools.src import merge
+from geoelectricalSurveyTools.src.merge import merge_profiles
+
+try:
+    import vtk
+except ImportError:
+    vtk = None
+
+MOD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Profil1.mod')
+
+
+class TestMergeProfiles(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        second_mod = os.path.join(self.directory, 'Profil2.mod')
+        shutil.copyfile(MOD_FILE, second_mod)
+        profile = {'output': None, 'start': [356933., 5686395.], 'end': [357127., 5686380.], 'topo': None, 'via': []}
+        self.profiles = [dict(profile, mod=MOD_FILE),
+                         dict(profile, mod=os.path.join(self.directory, 'missing.mod')),
+                         dict(profile, mod=second_mod)]
+
+    def test_failing_profile_is_left_out(self):
+        reported = []
+        out_file = os.path.join(self.directory, 'site.vtk')
+        errors = merge_profiles(out_file, self.profiles, progress=lambda index, error: reported.append(index))
+        self.assertIsNone(errors[0])
+        self.assertTrue(errors[1].startswith('FileNotFoundError'))
+        self.assertIsNone(errors[2])
+        self.assertEqual(reported, [0, 1, 2])
+        with open(out_file) as vtk_file:
+            self.assertIn('CELLS {} '.format(2 * 561), vtk_file.read())
+
+    def test_bad_dem_fails_only_its_profiles(self):
+        empty_mosaic = os.path.join(self.directory, 'tiles')
+        os.mkdir(empty_mosaic)
+        profiles = [dict(self.profiles[0], topo=empty_mosaic), self.profiles[2],
+                    dict(self.profiles[0], topo=empty_mosaic)]
+        with mock.patch.object(merge, 'open_dem', wraps=merge.open_dem) as open_dem:
+            errors = merge_profiles(os.path.join(self.directory, 'site.vtk'), profiles)
+        self.assertTrue(errors[0].startswith('ValueError: No DEM tiles found'))
+        self.assertIsNone(errors[1])
+        self.assertEqual(errors[2], errors[0])
+        self.assertEqual(open_dem.call_count, 1)
+
+    @unittest.skipIf(vtk is None, "vtk is not installed")
+    def test_vtm_names_are_escaped(self):
+        mod_file = os.path.join(self.directory, 'Profil "A&B".mod')
+        shutil.copyfile(MOD_FILE, mod_file)
+        out_file = os.path.join(self.directory, 'site.vtm')
+        self.assertEqual(merge_profiles(out_file, [dict(self.profiles[0], mod=mod_file)]), [None])
+        dataset = ElementTree.parse(out_file).getroot().find('vtkMultiBlockDataSet/DataSet')
+        self.assertEqual(dataset.get('name'), 'Profil "A&B"')
+        self.assertEqual(dataset.get('file'), os.path.join('site', '000_Profil "A&B".vtu'))
+        reader = vtk.vtkXMLMultiBlockDataReader()
+        reader.SetFileName(out_file)
+        reader.Update()
+        self.assertEqual(reader.GetOutput().GetBlock(0).GetNumberOfCells(), 561)
+
+    @unittest.skipIf(vtk is None, "vtk is not installed")
+    def test_vtm_layout(self):
+        out_file = os.path.join(self.directory, 'site.vtm')
+        errors = merge_profiles(out_file, self.profiles)
+        self.assertIsNotNone(errors[1])
+        datasets = ElementTree.parse(out_file).getroot().findall('vtkMultiBlockDataSet/DataSet')
+        self.assertEqual([dataset.get('name') for dataset in datasets], ['Profil1', 'Profil2'])
+        # block files are written into a directory named after the .vtm file and referenced relative to it
+        self.assertEqual([dataset.get('file') for dataset in datasets],
+                         [os.path.join('site', '000_Profil1.vtu'), os.path.join('site', '002_Profil2.vtu')])
+        self.assertEqual(sorted(os.listdir(os.path.join(self.directory, 'site'))),
+                         ['000_Profil1.vtu', '002_Profil2.vtu'])
+        reader = vtk.vtkXMLMultiBlockDataReader()
+        reader.SetFileName(out_file)
+        reader.Update()
+        blocks = reader.GetOutput()
+        self.assertEqual(blocks.GetNumberOfBlocks(), 2)
+        for index in range(2):
+            self.assertEqual(blocks.GetBlock(index).GetNumberOfCells(), 561)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import os
+import unittest
+import numpy as np
+from geoelectricalSurveyTools.src.geometry import create_geometry
+from geoelectricalSurveyTools.src.io.read import read_mod_file
+from geoelectricalSurveyTools.src.mesh import Mesh
+from geoelectricalSurveyTools.src.point import Point3D
+
+try:
+    import vtk
+except ImportError:
+    vtk = None
+
+MOD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Profil1.mod')
+
+
+class TestMesh(unittest.TestCase):
+
+    def test_grid_layout_of_mod_file(self):
+        x, z, rho, coverage = read_mod_file(MOD_FILE)
+        mesh = Mesh(*create_geometry(x, z), {'rho': rho})
+        self.assertTrue(mesh.find_grid_layout())
+        self.assertEqual(mesh.grid_layout.dimensions, (52, 12, 1))
+        self.assertEqual(mesh.num_cells, 51 * 11)
+        structured_points = mesh.structured_points()
+        # points of the structured grid run along the profile first, then downwards
+        np.testing.assert_array_equal(structured_points[:52, 2], 0.)
+        self.assertTrue((np.diff(structured_points[:52, 0]) > 0).all())
+        structured_rho = mesh.structured_cell_data()['rho']
+        self.assertEqual(sorted(structured_rho.tolist()), sorted(rho.tolist()))
+
+    def test_irregular_cells_stay_unstructured(self):
+        # the right column is split into layers of other depths than the left column
+        x = [[0., 4.], [4., 8.], [0., 4.], [4., 8.]]
+        z = [[-0., -1.], [-0., -1.5], [-1., -2.], [-1.5, -2.]]
+        mesh = Mesh(*create_geometry(x, z), {'rho': np.arange(4.)})
+        self.assertFalse(mesh.find_grid_layout())
+        self.assertIsNone(mesh.grid_layout)
+        if vtk is not None:
+            grid = mesh.to_vtk()
+            self.assertIsInstance(grid, vtk.vtkUnstructuredGrid)
+            self.assertEqual(grid.GetNumberOfCells(), 4)
+            self.assertEqual(grid.GetCellType(0), vtk.VTK_QUAD)
+
+    def test_point_view_writes_through(self):
+        mesh = Mesh([[0., 0., 0.], [4., 0., 0.], [4., 0., -1.], [0., 0., -1.]], [[0, 1, 2, 3]])
+        point = mesh.point(2)
+        point.x += 100.
+        point.y = 200.
+        point.z = 5.
+        np.testing.assert_array_equal(mesh.points[2], [104., 200., 5.])
+        self.assertEqual(list(point), [104., 200., 5.])
+        for view in mesh.iter_points():
+            view.z -= 1.
+        np.testing.assert_array_equal(mesh.points[:, 2], [-1., -1., 4., -2.])
+        difference = point - Point3D(4., 0., 4.)
+        self.assertEqual((difference.x, difference.y, difference.z), (100., 200., 0.))
+        self.assertEqual(mesh.point(0), Point3D(0., 0., -1.))
+
+
+if __name__ == '__main__':
+    unittest.main()
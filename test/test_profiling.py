@@ -0,0 +1,36 @@
+import os
+import tempfile
+import unittest
+from geoelectricalSurveyTools.src.conversion import convertmod2vtk
+from geoelectricalSurveyTools.src.profiling import Profiler
+
+MOD_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Profil1.mod')
+
+
+class TestProfiler(unittest.TestCase):
+
+    def test_conversion_stages_and_counts(self):
+        ended = []
+        profiler = Profiler(callback=lambda record: ended.append(record['name']))
+        output = os.path.join(tempfile.mkdtemp(), 'Profil1.vtk')
+        convertmod2vtk(output, MOD_FILE, None, None, profiler=profiler)
+        report = profiler.report()
+        self.assertEqual(ended, ['read_mod_file', 'create_geometry', 'write'])
+        self.assertEqual([stage['name'] for stage in report['stages']], ended)
+        self.assertTrue(all(stage['seconds'] >= 0 and stage['peak_bytes'] > 0 for stage in report['stages']))
+        self.assertEqual(report['counts']['cells'], 561)
+        self.assertGreater(report['counts']['points'], 561)
+        os.remove(output)
+
+    def test_nested_stage_is_not_traced(self):
+        profiler = Profiler()
+        with profiler.stage('outer'):
+            with profiler.stage('inner'):
+                pass
+        inner, outer = profiler.stages
+        self.assertIsNone(inner['peak_bytes'])
+        self.assertIsNotNone(outer['peak_bytes'])
+
+
+if __name__ == '__main__':
+    unittest.main()
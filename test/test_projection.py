@@ -0,0 +1,47 @@
+import unittest
+from math import atan2, cos, sin
+import numpy as np
+from geoelectricalSurveyTools.src.conversion import convert_relative_to_utm
+from geoelectricalSurveyTools.src.point import Point3D
+from geoelectricalSurveyTools.src.projection import ProfileLine
+
+
+class TestProfileLine(unittest.TestCase):
+
+    def setUp(self):
+        # segments of 50 m and 20 m with a bend at (30, 40)
+        self.line = ProfileLine([[0., 0.], [30., 40.], [30., 60.]])
+
+    def test_chainage(self):
+        np.testing.assert_allclose(self.line.chainage, [0., 50., 70.])
+        self.assertAlmostEqual(self.line.length, 70.)
+
+    def test_both_sides_of_bend(self):
+        np.testing.assert_allclose(self.line.to_utm([25., 49., 50., 51., 60.]),
+                                   [[15., 20.], [29.4, 39.2], [30., 40.], [30., 41.], [30., 50.]])
+
+    def test_extrapolation(self):
+        np.testing.assert_allclose(self.line.to_utm([-10., 80.]), [[-6., -8.], [30., 70.]])
+        np.testing.assert_allclose(self.line.to_utm(-10.), [[-6., -8.]])
+
+    def test_straight_line_matches_convert_relative_to_utm(self):
+        start, end = Point3D(356933., 5686395., 0.), Point3D(357127., 5686380., 0.)
+        distances = np.array([-4., 0., 37.5, 120.25, 250.])
+        utm_coordinates = ProfileLine([[start.x, start.y], [end.x, end.y]]).to_utm(distances)
+        # formula of convert_relative_to_utm before lines could bend
+        angle = atan2(end.y - start.y, end.x - start.x)
+        np.testing.assert_allclose(utm_coordinates, np.column_stack((start.x + np.cos(angle) * distances,
+                                                                     start.y + np.sin(angle) * distances)))
+        point = convert_relative_to_utm(start, end, 37.5)
+        self.assertAlmostEqual(point.x, start.x + cos(angle) * 37.5)
+        self.assertAlmostEqual(point.y, start.y + sin(angle) * 37.5)
+        np.testing.assert_allclose(convert_relative_to_utm(start, end, distances)[:, :2], utm_coordinates)
+
+    def test_single_vertex_is_rejected(self):
+        for vertices in ([[0., 0.]], []):
+            with self.assertRaises(ValueError):
+                ProfileLine(vertices)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from geoelectricalSurveyTools.src.io.read import read_mod_file, read_ohm_file
+
+
+class TestReaders(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def test_mod_file_in_chunks(self):
+        filename = os.path.join(self.directory, 'profile.mod')
+        with open(filename, 'w', newline='\r\n') as mod_file:
+            mod_file.write('#x1/m\tx2/m\tz1/m\tz2/m\trho/Ohmm coverage\n'
+                           '-4.00\t0.00\t0.00\t1.11\t39.23\t2.673\n'
+                           '0.00\t4.00\t0.00\t1.11\t56.28\t8.452\n'
+                           '-4.00\t0.00\t1.11\t2.33\t41.50\t1.250\n')
+        x, z, rho, coverage = read_mod_file(filename, chunk_rows=2)
+        np.testing.assert_array_equal(x, [[-4., 0.], [0., 4.], [-4., 0.]])
+        np.testing.assert_array_equal(z, [[-0., -1.11], [-0., -1.11], [-1.11, -2.33]])
+        np.testing.assert_array_equal(rho, [39.23, 56.28, 41.5])
+        np.testing.assert_array_equal(coverage, [2.673, 8.452, 1.25])
+
+    def test_ragged_mod_file_is_rejected(self):
+        # 18 numbers in total would fill three rows of six
+        filename = os.path.join(self.directory, 'ragged.mod')
+        with open(filename, 'w') as mod_file:
+            mod_file.write('#x1/m\tx2/m\tz1/m\tz2/m\trho/Ohmm coverage\n'
+                           '-4.00\t0.00\t0.00\t1.11\t39.23\t2.673\n'
+                           '0.00\t4.00\t0.00\t1.11\t56.28\t8.452\t1.0\n'
+                           '-4.00\t0.00\t1.11\t2.33\t41.50\n')
+        with self.assertRaises(ValueError):
+            read_mod_file(filename)
+
+    def test_ohm_topography(self):
+        filename = os.path.join(self.directory, 'profile.ohm')
+        with open(filename, 'w') as ohm_file:
+            ohm_file.write('2 # Number of electrodes\n# x z\n0.0\t0\n4.0\t0\n'
+                           '1 # Number of data\n# a b m n rhoa\n1\t2\t3\t4\t50.0\n'
+                           '2 # Number of topo points\n# x h for each topo point\n0.0\t101.5\n4.0\t102.25\n')
+        x, h = read_ohm_file(filename)
+        np.testing.assert_array_equal(x, [0., 4.])
+        np.testing.assert_array_equal(h, [101.5, 102.25])
+
+
+if __name__ == '__main__':
+    unittest.main()
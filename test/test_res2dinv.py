@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+from geoelectricalSurveyTools.src.res2dinv import convert_directory, convert_to_general_array
+
+
+class TestConvertToGeneralArray(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.out_file = os.path.join(self.directory, 'gaf.dat')
+
+    def convert(self, content, chunk_rows=1):
+        inp_file = os.path.join(self.directory, 'index.dat')
+        with open(inp_file, 'w', newline='') as inp:
+            inp.write(content)
+        convert_to_general_array(inp_file, self.out_file, chunk_rows)
+        with open(self.out_file, newline='') as out:
+            return out.read()
+
+    def test_dipole_dipole(self):
+        content = self.convert('Line 1\r\n 2.5\r\n3\r\n 2\r\n0\r\n0\r\n0 2.5 1 45.2\r\n5 2.5 2 47.25\r\n0\r\n')
+        self.assertEqual(content, 'Line 1\r\n2.5\r\n11\r\n0\r\nType of measurement (0=app. resistivity,1=resistance)\r\n'
+                                  '0\r\n2\r\n2\r\n0\r\n'
+                                  '4 0.0000 0.0000 2.5000 0.0000 5.0000 0.0000 7.5000 0.0000 45.2000\r\n'
+                                  '4 5.0000 0.0000 7.5000 0.0000 12.5000 0.0000 15.0000 0.0000 47.2500\r\n'
+                                  '0\r\n0\r\n0\r\n0\r\n0\r\n')
+
+    def test_wenner(self):
+        content = self.convert('Line 1\n2.5\n1\n2\n0\n0\n0 2.5 45.2\n2.5 5 47.25\n')
+        self.assertEqual(content.splitlines()[9:11],
+                         ['4 0.0000 0.0000 7.5000 0.0000 2.5000 0.0000 5.0000 0.0000 45.2000',
+                          '4 2.5000 0.0000 17.5000 0.0000 7.5000 0.0000 12.5000 0.0000 47.2500'])
+
+    def test_schlumberger(self):
+        content = self.convert('Line 1\n2.5\n7\n2\n0\n0\n0 2.5 2 45.2\n5 2.5 1 47.25\n')
+        self.assertEqual(content.splitlines()[9:11],
+                         ['4 0.0000 0.0000 12.5000 0.0000 5.0000 0.0000 7.5000 0.0000 45.2000',
+                          '4 5.0000 0.0000 12.5000 0.0000 7.5000 0.0000 10.0000 0.0000 47.2500'])
+
+    def test_ip_columns_of_different_lengths(self):
+        # the columns of both readings of the chunk add up to two readings of four columns
+        content = self.convert('Line 1\n2.5\n1\n2\n0\n1\n0 2.5 45.2\n2.5 5 47.25 0.5 0.7\n', chunk_rows=2)
+        self.assertEqual(content.splitlines()[9:11],
+                         ['4 0.0000 0.0000 7.5000 0.0000 2.5000 0.0000 5.0000 0.0000 45.2000',
+                          '4 2.5000 0.0000 17.5000 0.0000 7.5000 0.0000 12.5000 0.0000 47.2500'])
+
+    def test_missing_column_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.convert('Line 1\n2.5\n3\n1\n0\n0\n0 2.5 45.2\n')
+
+    def test_directory_is_not_converted_into_itself(self):
+        with self.assertRaises(ValueError):
+            convert_directory(self.directory, os.path.join(self.directory, '.'))
+
+    def test_mid_point_x_location_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.convert('Line 1\n2.5\n1\n1\n1\n0\n0 2.5 45.2\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import subprocess
+import sys
+import unittest
+
+IMPORT_SCRIPT = """\
+import sys
+import geoelectricalSurveyTools.src.batch
+import geoelectricalSurveyTools.src.conversion
+import geoelectricalSurveyTools.src.merge
+import geoelectricalSurveyTools.src.timelapse
+print(' '.join(sorted({name.split('.')[0] for name in sys.modules} & {'gdal', 'osgeo', 'scipy'})))
+"""
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_conversion_does_not_import_heavy_backends(self):
+        output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT], check=True, stdout=subprocess.PIPE,
+                                universal_newlines=True).stdout
+        self.assertEqual(output.split(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
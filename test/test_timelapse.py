@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+import xml.etree.ElementTree as ElementTree
+import numpy as np
+from geoelectricalSurveyTools.src.timelapse import convert_time_series, percent_change, read_epochs, write_pvd_file
+
+try:
+    import vtk
+except ImportError:
+    vtk = None
+
+MOD_HEADER = '#x1/m\tx2/m\tz1/m\tz2/m\trho/Ohmm coverage\n'
+
+
+class TestPercentChange(unittest.TestCase):
+
+    def test_change_relative_to_reference_epoch(self):
+        rho = np.array([[10., 20.], [12., 15.], [5., 20.]])
+        np.testing.assert_allclose(percent_change(rho, reference_epoch=1),
+                                   [[-100. / 6., 100. / 3.], [0., 0.], [-700. / 12., 100. / 3.]])
+
+
+class TestTimeSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def write_mod(self, name, rows):
+        mod_file = os.path.join(self.directory, name)
+        with open(mod_file, 'w') as mod:
+            mod.write(MOD_HEADER + ''.join('\t'.join(map(str, row)) + '\n' for row in rows))
+        return mod_file
+
+    def test_pvd_filenames_are_escaped(self):
+        pvd_file = os.path.join(self.directory, 'series.pvd')
+        write_pvd_file(pvd_file, ['a&b_000.vtu', 'say "x"_001.vtu'], [0, 1])
+        datasets = ElementTree.parse(pvd_file).getroot().findall('Collection/DataSet')
+        self.assertEqual([dataset.get('file') for dataset in datasets], ['a&b_000.vtu', 'say "x"_001.vtu'])
+
+    def test_epochs_with_different_cells_are_rejected(self):
+        first = self.write_mod('e0.mod', [[0, 4, 0, 1, 10, 1], [4, 8, 0, 1, 20, 2]])
+        other_x = self.write_mod('e1.mod', [[0, 4, 0, 1, 10, 1], [4, 9, 0, 1, 20, 2]])
+        other_z = self.write_mod('e2.mod', [[0, 4, 0, 1, 10, 1], [4, 8, 0, 2, 20, 2]])
+        for mod_file in (other_x, other_z):
+            with self.assertRaises(ValueError):
+                read_epochs([first, mod_file])
+
+    @unittest.skipIf(vtk is None, "vtk is not installed")
+    def test_pvd_references_one_file_per_epoch(self):
+        mod_files = [self.write_mod('e{}.mod'.format(epoch), [[0, 4, 0, 1, 10 * (epoch + 1), 1],
+                                                              [4, 8, 0, 1, 20 * (epoch + 1), 2]])
+                     for epoch in range(3)]
+        pvd_file = os.path.join(self.directory, 'series.pvd')
+        convert_time_series(pvd_file, mod_files, None, None, times=[0.5, 1.5, 3.])
+        datasets = ElementTree.parse(pvd_file).getroot().findall('Collection/DataSet')
+        self.assertEqual([float(dataset.get('timestep')) for dataset in datasets], [0.5, 1.5, 3.])
+        self.assertEqual([dataset.get('file') for dataset in datasets],
+                         ['series_000.vtu', 'series_001.vtu', 'series_002.vtu'])
+        for epoch, dataset in enumerate(datasets):
+            reader = vtk.vtkXMLUnstructuredGridReader()
+            reader.SetFileName(os.path.join(self.directory, dataset.get('file')))
+            reader.Update()
+            rho = reader.GetOutput().GetCellData().GetArray('rho')
+            self.assertEqual([rho.GetValue(cell) for cell in range(rho.GetNumberOfTuples())],
+                             [10. * (epoch + 1), 20. * (epoch + 1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import base64
+import io
+import os
+import re
+import tempfile
+import unittest
+import zlib
+import numpy as np
+from geoelectricalSurveyTools.src.io.write import UnstructuredGridStream, write_mesh_file, write_vtk_file_binary, \
+    write_vtk_file_general, write_vtu_file
+
+
+class TestBinaryWriters(unittest.TestCase):
+
+    """Read the arrays back from binary .vtk and .vtu files and compare them to the written arrays."""
+
+    def setUp(self):
+        self.points = np.array([[356933.125, 5686395.5, 144.25], [356937.0, 5686395.0, 143.0],
+                                [356933.125, 5686395.5, 140.5], [356937.0, 5686395.0, 141.0]])
+        self.cells = np.array([[0, 2, 3, 1]])
+        self.rho = np.array([39.25])
+        self.directory = tempfile.mkdtemp()
+
+    def test_legacy_binary(self):
+        filename = os.path.join(self.directory, 'mesh.vtk')
+        write_vtk_file_binary(filename, 'test', self.points, self.cells, {'rho': self.rho})
+        with open(filename, 'rb') as vtk_file:
+            content = vtk_file.read()
+        start = content.index(b'POINTS 4 double\n') + len(b'POINTS 4 double\n')
+        np.testing.assert_array_equal(np.frombuffer(content, '>f8', 12, start).reshape(4, 3), self.points)
+        start = content.index(b'CELLS 1 5\n') + len(b'CELLS 1 5\n')
+        np.testing.assert_array_equal(np.frombuffer(content, '>i4', 5, start), [4, 0, 2, 3, 1])
+
+    def test_vtu_base64_compressed(self):
+        filename = os.path.join(self.directory, 'mesh.vtu')
+        write_vtu_file(filename, self.points, self.cells, {'rho': self.rho}, encoding='base64', compress=True)
+        with open(filename) as vtu_file:
+            content = vtu_file.read()
+        offsets = [int(offset) for offset in re.findall(r'offset="(\d+)"', content)]
+        appended = content.split('\n   _', 1)[1].split('\n')[0]
+        # compressed points are the first array: a base64 encoded header of 4 numbers followed by one block
+        header = np.frombuffer(base64.b64decode(appended[:44]), '<u8')
+        self.assertEqual(header[0], 1)
+        block = base64.b64decode(appended[44:offsets[1]])
+        np.testing.assert_array_equal(np.frombuffer(zlib.decompress(block), '<f8').reshape(4, 3), self.points)
+
+
+class TestAsciiWriter(unittest.TestCase):
+
+    def test_write_to_stream(self):
+        points = np.array([[0., 0., 0.], [0., 0., -1.5], [4.25, 0., 0.], [4.25, 0., -1.5]])
+        out = io.BytesIO()
+        write_vtk_file_general(out, 'test', points, np.array([[0, 1, 3, 2]]), [[39.25], [-1.0]],
+                               ['rho float', 'coverage float'])
+        self.assertEqual(out.getvalue().decode(),
+                         '# vtk DataFile Version 3.0\ntest\nASCII\nDATASET UNSTRUCTURED_GRID\nPOINTS 4 float\n'
+                         '0.0 0.0 0.0\n0.0 0.0 -1.5\n4.25 0.0 0.0\n4.25 0.0 -1.5\nCELLS 1 5\n4 0 1 3 2\n'
+                         'CELL_TYPES 1\n9\n\nCELL_DATA 1\nSCALARS rho float 1\nLOOKUP_TABLE default\n39.25\n'
+                         'SCALARS coverage float 1\nLOOKUP_TABLE default\n-1.0\n')
+
+    def test_text_stream_is_rejected(self):
+        with self.assertRaisesRegex(TypeError, 'binary stream'):
+            write_vtk_file_general(io.StringIO(), 'test', np.zeros((4, 3)), np.array([[0, 1, 3, 2]]), [[39.25]],
+                                   ['rho float'])
+
+
+class TestUnstructuredGridStream(unittest.TestCase):
+
+    def test_appended_meshes_equal_one_mesh(self):
+        # two profiles of one cell each
+        points = np.array([[0., 0., 0.], [0., 0., -1.5], [4.25, 0., 0.], [4.25, 0., -1.5],
+                           [0., 10., 0.], [0., 10., -1.5], [4.25, 10., 0.], [4.25, 10., -1.5]])
+        cells = np.array([[0, 1, 3, 2], [4, 5, 7, 6]])
+        cell_data = {'rho': np.array([39.25, 41.5])}
+        for binary in (False, True):
+            expected = io.BytesIO()
+            write_mesh_file(expected, 'test', points, cells, cell_data, 'binary' if binary else 'ascii')
+            out = io.BytesIO()
+            with UnstructuredGridStream(out, 'test', binary) as stream:
+                stream.append(points[:4], cells[:1], {'rho': cell_data['rho'][:1]})
+                stream.append(points[4:], cells[:1], {'rho': cell_data['rho'][1:]})
+            self.assertEqual(out.getvalue(), expected.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()